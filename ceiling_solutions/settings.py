@@ -79,13 +79,78 @@ WSGI_APPLICATION = 'ceiling_solutions.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE=sqlite (default) or postgresql. PostgreSQL connections are pooled by psycopg
+# (DB_POOL, Django 5.1+): under ASGI persistent connections (CONN_MAX_AGE) are not reused
+# between requests, a pool is. Without the pool DB_CONN_MAX_AGE keeps connections open
+DB_ENGINES = {
+    'sqlite': 'django.db.backends.sqlite3',
+    'postgresql': 'django.db.backends.postgresql',
+}
+DB_ENGINE = config('DB_ENGINE', default='sqlite')
+# SQLite tuning: IMMEDIATE write transactions here and SQLITE_PRAGMAS below; 0 keeps SQLite defaults
+SQLITE_TUNING = config('SQLITE_TUNING', default=True, cast=bool)
+
+
+def database(prefix='DB'):
+    """Connection settings from <prefix>_NAME, _USER, _PASSWORD, _HOST, _PORT; missing ones come from DB_*"""
+    def value(name, default=''):
+        return config(f'{prefix}_{name}', default=config(f'DB_{name}', default=default))
+
+    if DB_ENGINE == 'sqlite':
+        db = {
+            'ENGINE': DB_ENGINES['sqlite'],
+            'NAME': value('NAME', default=str(BASE_DIR / 'db.sqlite3')),
+        }
+        if SQLITE_TUNING:
+            # Запись берёт блокировку сразу: busy_timeout не помогает при повышении уже начатой транзакции
+            db['OPTIONS'] = {'transaction_mode': 'IMMEDIATE'}
+        return db
+    db = {
+        'ENGINE': DB_ENGINES['postgresql'],
+        'NAME': value('NAME', default='ceiling_solutions'),
+        'USER': value('USER', default='postgres'),
+        'PASSWORD': value('PASSWORD'),
+        'HOST': value('HOST', default='localhost'),
+        'PORT': value('PORT', default='5432'),
+        'CONN_HEALTH_CHECKS': True,
     }
+    if config('DB_POOL', default=True, cast=bool):
+        # Пул и постоянные соединения Django несовместимы: CONN_MAX_AGE должен быть 0
+        db['OPTIONS'] = {'pool': {
+            'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+            'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+            'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),
+        }}
+    else:
+        db['CONN_MAX_AGE'] = config('DB_CONN_MAX_AGE', default=60, cast=int)
+    return db
+
+
+DATABASES = {
+    'default': database(),
 }
 
+# Read-only catalog views (main/db_router.read_replica) read from a replica when
+# DB_REPLICA_HOST (PostgreSQL) or DB_REPLICA_NAME (e.g. a second SQLite file) is set
+if config('DB_REPLICA_HOST', default='') or config('DB_REPLICA_NAME', default=''):
+    DATABASES['replica'] = {**database('DB_REPLICA'), 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_ROUTERS = ['main.db_router.ReplicaRouter']
+
+# Seconds after a catalog change during which reads stay on the primary (replication lag)
+DATABASE_REPLICA_LAG = config('DATABASE_REPLICA_LAG', default=5, cast=float)
+
+# Pragmas for every new SQLite connection (apply_sqlite_pragmas in main/apps.py). In WAL mode readers are
+# not blocked by a write in progress; synchronous=NORMAL is durable in WAL except on power
+# loss. cache_size < 0 is in KiB. Empty when SQLITE_TUNING=0
+SQLITE_PRAGMAS = {
+    'busy_timeout': config('SQLITE_BUSY_TIMEOUT', default=5000, cast=int),
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': config('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024, cast=int),
+    'cache_size': config('SQLITE_CACHE_SIZE', default=-32000, cast=int),
+} if SQLITE_TUNING else {}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -150,4 +215,47 @@ MEDIA_ROOT = 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-HOST = config('HOST', default='http://localhost:8000')
\ No newline at end of file
+HOST = config('HOST', default='http://localhost:8000')
+
+# Shared cache behind the per-process tier of main/caching.py. Every process must see the
+# same backend: the catalog version that invalidates all catalog caches lives there
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': config('CACHE_LOCATION', default=''),
+        'TIMEOUT': None,
+    },
+}
+if CACHE_BACKEND != 'redis':
+    # Redis вытесняет ключи сам (maxmemory), остальным нужен предел
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=10000, cast=int)}
+
+# Catalog caching
+CATALOG_CACHE_ALIAS = 'default'
+CATALOG_LOCAL_CACHE_ENTRIES = config('CATALOG_LOCAL_CACHE_ENTRIES', default=256, cast=int)
+CATALOG_VALIDATORS_TIMEOUT = config('CATALOG_VALIDATORS_TIMEOUT', default=60 * 60, cast=int)
+CATALOG_PAGE_CACHE_TIMEOUT = config('CATALOG_PAGE_CACHE_TIMEOUT', default=60 * 60 * 24, cast=int)
+
+# HTTP caching (main/http_cache.py). JSON without CSRF tokens may be stored by a CDN;
+# RELEASE goes into every ETag so a deploy with new templates invalidates browser copies
+CATALOG_HTTP_MAX_AGE = config('CATALOG_HTTP_MAX_AGE', default=60, cast=int)
+CATALOG_HTTP_SHARED_MAX_AGE = config('CATALOG_HTTP_SHARED_MAX_AGE', default=300, cast=int)
+RELEASE = config('RELEASE', default='')
+
+# Catalog search: None picks SQLite FTS5 on SQLite, tsvector + GIN on PostgreSQL and the portable backend elsewhere
+CATALOG_SEARCH_BACKEND = config('CATALOG_SEARCH_BACKEND', default=None)
+CATALOG_SEARCH_LIMIT = 500
+
+# Image ingestion queue (python manage.py process_image_queue)
+IMAGE_INGEST_TIMEOUT = (5, 30)  # connect, read
+IMAGE_INGEST_MAX_ATTEMPTS = 3
+IMAGE_INGEST_LOCK_TIMEOUT = 10 * 60
+IMAGE_FETCH_MAX_BYTES = 20 * 1024 * 1024
+IMAGE_FETCH_DEADLINE = 120  # seconds for the whole download
+IMAGE_FETCH_CONCURRENCY = 4
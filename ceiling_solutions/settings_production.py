@@ -0,0 +1,80 @@
+"""
+Production settings for ceiling_solutions project.
+
+Selected with DJANGO_SETTINGS_MODULE=ceiling_solutions.settings_production.
+Static and media files are served by nginx, not by Django.
+"""
+
+from decouple import Csv, config
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, CACHE_BACKENDS, DATABASES, DB_ENGINE, TEMPLATES
+
+
+SECRET_KEY = config('SECRET_KEY')
+
+DEBUG = False
+
+ALLOWED_HOSTS = config('ALLOWED_HOSTS', default='localhost,127.0.0.1', cast=Csv())
+
+CSRF_TRUSTED_ORIGINS = config('CSRF_TRUSTED_ORIGINS', default='', cast=Csv())
+
+# За nginx: схема и хост приходят в заголовках прокси
+SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
+USE_X_FORWARDED_HOST = True
+
+SESSION_COOKIE_SECURE = config('SECURE_COOKIES', default=True, cast=bool)
+CSRF_COOKIE_SECURE = SESSION_COOKIE_SECURE
+
+# Абсолютные пути: nginx раздаёт эти же каталоги
+STATIC_ROOT = config('STATIC_ROOT', default=str(BASE_DIR / 'static'))
+MEDIA_ROOT = config('MEDIA_ROOT', default=str(BASE_DIR / 'media'))
+
+# В режиме WAL рядом с базой лежат -wal и -shm: web и worker монтируют общий каталог, а не один файл
+if DB_ENGINE == 'sqlite':
+    DATABASES['default']['NAME'] = config('DB_NAME', default='/app/data/db.sqlite3')
+
+# Общий для web и worker кэш на томе: версия каталога видна всем процессам
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[config('CACHE_BACKEND', default='file')],
+        'LOCATION': config('CACHE_LOCATION', default='/app/cache'),
+        'TIMEOUT': None,
+    },
+}
+if CACHES['default']['BACKEND'] != CACHE_BACKENDS['redis']:
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=10000, cast=int)}
+
+# Имена файлов статики с хэшем содержимого (collectstatic пишет manifest): nginx отдаёт их как immutable
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.ManifestStaticFilesStorage'},
+}
+
+# Шаблоны разбираются один раз на процесс
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'debug': False,
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    },
+}]
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': config('LOG_LEVEL', default='WARNING'),
+    },
+}
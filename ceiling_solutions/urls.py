@@ -19,7 +19,7 @@ from django.urls import path, include
 from django.conf.urls.i18n import i18n_patterns
 from django.views.i18n import set_language
 
-from ceiling_solutions import settings
+from django.conf import settings
 from django.conf.urls.static import static
 
 
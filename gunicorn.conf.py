@@ -0,0 +1,37 @@
+"""
+Gunicorn config for the production profile.
+
+    DJANGO_SETTINGS_MODULE=ceiling_solutions.settings_production gunicorn -c gunicorn.conf.py
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# По умолчанию ASGI-воркеры uvicorn; GUNICORN_WORKER_CLASS=gthread — WSGI с потоками
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'uvicorn_worker.UvicornWorker')
+if worker_class in ('sync', 'gthread'):
+    wsgi_app = 'ceiling_solutions.wsgi:application'
+else:
+    wsgi_app = 'ceiling_solutions.asgi:application'
+
+# Процессы и потоки по числу ядер; threads учитываются только воркерами gthread
+cpu_count = multiprocessing.cpu_count()
+workers = int(os.environ.get('WEB_CONCURRENCY', cpu_count * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 2))
+
+# Django загружается в мастере до fork: воркеры делят память (copy-on-write)
+# и не импортируют проект каждый заново
+preload_app = True
+
+# Периодический перезапуск воркеров держит потребление памяти ровным
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = max_requests // 10
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
@@ -1,17 +1,86 @@
+import json
+
+from django.conf import settings
 from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.db.models import Exists, OuterRef, Prefetch
+from django.forms.models import ModelChoiceField, ModelChoiceIterator
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.html import format_html
 from django.utils.safestring import mark_safe
-from urllib3 import fields
 
-from .models import (Product, ContactInquiry, ProductImage, ProductTranslation, ProductType, ProductTypeTranslation,
- ProductCharacteristic, ProductCharacteristicTranslation, ProductCategory, ProductCategoryTranslation)
+from .models import (Product, ContactInquiry, ImageIngestionTask, ProductImage, ProductTranslation, ProductType, ProductTypeTranslation,
+ ProductCharacteristic, ProductCharacteristicTranslation, ProductCategory, ProductCategoryTranslation, Quote, QuoteRoom)
 from django import forms
+from django.core.validators import URLValidator
 
-import requests
-import time
-from ceiling_solutions import settings
-import os
 import nested_admin
-import re 
+from nested_admin.formsets import NestedInlineFormSet
+
+from .caching import TieredCache
+from .images import derivatives
+from .ingestion import enqueue_image, store_upload, uploaded_image_type
+from .product_editor import SECTIONS, EditorError, apply_changes, load_section, product_data
+from .translations import translated_name
+
+# Выпадающие списки админки строятся из кэша, пока каталог не изменился
+admin_choices = TieredCache('admin_choices', 60 * 60, local_entries=16, per_language=False)
+
+
+def named(queryset):
+    """queryset with display_name annotated, so __str__ and get_name need no queries"""
+    return queryset.annotate(display_name=translated_name(queryset.model))
+
+
+class ParentInlineFormSet(NestedInlineFormSet):
+    """Inline formset whose rows know their parent object and come from its prefetch cache when it has one.
+
+    Otherwise every row label that shows the parent (__str__) and every
+    nested inline under a row costs a query.
+    """
+
+    def get_queryset(self):
+        if self.data:
+            return super().get_queryset()
+        if not hasattr(self, '_rows'):
+            accessor = self.fk.remote_field.get_accessor_name()
+            if accessor in getattr(self.instance, '_prefetched_objects_cache', {}):
+                rows = list(getattr(self.instance, accessor).all())
+            else:
+                rows = list(super().get_queryset())
+            for row in rows:
+                setattr(row, self.fk.name, self.instance)
+            self._rows = rows
+        return self._rows
+
+
+def product_type_choices():
+    return admin_choices.get_or_set('product_types', lambda: [
+        (product_type_id, name or 'Без названия')
+        for product_type_id, name in named(ProductType.objects.order_by('id')).values_list('id', 'display_name')
+    ])
+
+
+class CachedChoiceIterator(ModelChoiceIterator):
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        yield from product_type_choices()
+
+    def __len__(self):
+        return len(product_type_choices()) + (self.field.empty_label is not None)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(product_type_choices())
+
+
+class ProductTypeChoiceField(ModelChoiceField):
+    """Product type select rendered from product_type_choices(); the queryset is only used to validate"""
+    iterator = CachedChoiceIterator
 
 
 class ProductCategoryTranslationInline(nested_admin.NestedStackedInline):
@@ -20,58 +89,73 @@ class ProductCategoryTranslationInline(nested_admin.NestedStackedInline):
     fields = ('language', 'name', 'description')
 
 
-class CategoryForm(forms.ModelForm):
+class ImageSourceForm(forms.ModelForm):
+    """Uploaded files are stored right away, image links are queued for process_image_queue"""
     upload = forms.ImageField(required=False, help_text="Выберите изображение для загрузки.")
     image_url = forms.CharField(max_length=255, required=False, help_text="Вставьте ссылку на изображение или загрузите файл.")
 
-    class Meta:
-        model = ProductCategory
-        fields = ['image_url', 'upload']
+    def clean(self):
+        cleaned_data = super().clean()
+        uploaded_file = cleaned_data.get('upload')
+        url = cleaned_data.get('image_url')
+
+        # Тип проверяется по содержимому; ссылку проверит загрузчик очереди
+        if uploaded_file and not uploaded_image_type(uploaded_file):
+            raise forms.ValidationError("Файл должен быть изображением (PNG, JPG, JPEG, GIF).")
+        if not uploaded_file and url and 'image_url' in self.changed_data:
+            URLValidator(schemes=['http', 'https'])(url.strip())
+        return cleaned_data
 
     def save(self, commit=True):
         instance = super().save(commit=False)
 
         uploaded_file = self.cleaned_data.get('upload')
         url = self.cleaned_data.get('image_url')
+        self.pending_url = None
 
-        prefix = str(int(time.time()))
         if uploaded_file:
-            # нормализуем имя файла: пробелы -> _, удаляем опасные символы
-            original_name = uploaded_file.name
-        elif url:
-            original_name = url.split('/')[-1]
-        else:
-            original_name = 'image.jpg'
-
-        safe_name = re.sub(r'\s+', '_', original_name)
-        safe_name = re.sub(r'[^\w.\-]', '', safe_name)
-        filename = f"{prefix}_{safe_name}"
-
-        if not filename.lower().endswith(('.png', '.jpg', '.jpeg', '.gif')):
-            raise forms.ValidationError("Файл должен быть изображением (PNG, JPG, JPEG, GIF).")
+            # Одинаковые файлы хранятся один раз, по хэшу содержимого
+            instance.image_blob = store_upload(uploaded_file)
+            instance.image_url = instance.image_blob.url
+            instance.image_status = 'ready'
+        elif url and 'image_url' in self.changed_data:
+            # Скачивание не блокирует запрос: строка сохраняется сразу,
+            # URL появится после обработки очереди
+            self.pending_url = url.strip()
+            instance.image_url = ''
+            instance.image_blob = None
+            instance.image_status = 'pending'
+        elif 'image_url' in self.changed_data:
+            instance.image_blob = None
 
-        path = f'uploads/{filename}'
-        full_path = f'media/{path}'
-        
-        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        if commit:
+            instance.save()
+            self._save_m2m()
+        return instance
 
-        print(full_path)
+    def _save_m2m(self):
+        super()._save_m2m()
+        if self.pending_url:
+            enqueue_image(self.instance, self.pending_url)
 
-        if uploaded_file:
-            with open(full_path, 'wb+') as f:
-                for chunk in uploaded_file.chunks():
-                    f.write(chunk)
-        elif url:
-            response = requests.get(url.strip())
-            if response.status_code == 200:
-                with open(full_path, 'wb') as f:
-                    f.write(response.content)
 
-        instance.image_url = settings.HOST + '/' + full_path
+class CategoryForm(ImageSourceForm):
+
+    class Meta:
+        model = ProductCategory
+        fields = ['image_url', 'upload']
+
+
+def image_preview(obj):
+    if obj.image_status != 'ready':
+        return obj.get_image_status_display()
+    if obj.image_url:
+        # Самая маленькая производная вместо полноразмерного оригинала
+        variants = derivatives(obj.image_url)
+        src = variants[0][1] if variants else obj.image_url
+        return mark_safe(f'<img src="{src}" width="100" loading="lazy" />')
+    return "-"
 
-        if commit:
-            instance.save()
-        return instance
 
 class ProductCategoryAdmin(nested_admin.NestedModelAdmin):
     list_display = ('id', 'get_name')
@@ -81,14 +165,15 @@ class ProductCategoryAdmin(nested_admin.NestedModelAdmin):
     readonly_fields = ['preview']
 
     def preview(self, obj):
-        if obj.image_url:
-            return mark_safe(f'<img src="{obj.image_url}" width="100" />')
-        return "-"
-    
+        return image_preview(obj)
+
+    def get_queryset(self, request):
+        return named(super().get_queryset(request))
+
     def get_name(self, obj):
-        translation = obj.translations.first()
-        return translation.name if translation else '(Нет перевода)'
+        return obj.display_name or '(Нет перевода)'
     get_name.short_description = 'Name'
+    get_name.admin_order_field = 'display_name'
     
     inlines = [ProductCategoryTranslationInline]
 
@@ -96,16 +181,22 @@ class ProductCategoryAdmin(nested_admin.NestedModelAdmin):
 # --- Переводы характеристик ---
 class ProductCharacteristicTranslationInline(nested_admin.NestedTabularInline):
     model = ProductCharacteristicTranslation
+    formset = ParentInlineFormSet
     extra = 1
 
 
 # --- Характеристики ---
 class ProductCharacteristicInline(nested_admin.NestedStackedInline):
     model = ProductCharacteristic
+    formset = ParentInlineFormSet
     extra = 1
     show_change_link = True
     inlines = [ProductCharacteristicTranslationInline]
 
+    def get_queryset(self, request):
+        # Переводы всех характеристик одним запросом (см. ParentInlineFormSet)
+        return super().get_queryset(request).prefetch_related('translations')
+
 
 class ProductTypeTranslationInline(nested_admin.NestedTabularInline):
     model = ProductTypeTranslation
@@ -114,8 +205,30 @@ class ProductTypeTranslationInline(nested_admin.NestedTabularInline):
     
 
 class ProductTypeAdmin(nested_admin.NestedModelAdmin):
+    list_display = ('id', 'get_name', 'get_category')
+    list_display_links = ('id', 'get_name')
     inlines = [ProductTypeTranslationInline]
 
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'category':
+            kwargs['queryset'] = named(ProductCategory.objects.all())
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_queryset(self, request):
+        return named(super().get_queryset(request)).annotate(
+            category_name=translated_name(ProductCategory, outer='category_id')
+        )
+
+    def get_name(self, obj):
+        return obj.display_name or '(Нет перевода)'
+    get_name.short_description = 'Name'
+    get_name.admin_order_field = 'display_name'
+
+    def get_category(self, obj):
+        return obj.category_name or '-'
+    get_category.short_description = 'Category'
+    get_category.admin_order_field = 'category_name'
+
 
 
 class ProductTranslationInline(nested_admin.NestedTabularInline):
@@ -124,64 +237,16 @@ class ProductTranslationInline(nested_admin.NestedTabularInline):
     fields = ('language', 'name', 'description')
 
 
-class ImageForm(forms.ModelForm):
-    upload = forms.ImageField(required=False, help_text="Выберите изображение для загрузки.")
-    image_url = forms.CharField(max_length=255, required=False, help_text="Вставьте ссылку на изображение или загрузите файл.")
+class ImageForm(ImageSourceForm):
 
     class Meta:
         model = ProductImage
         fields = ['image_url', 'upload']
 
-    
-    def save(self, commit=True):
-        instance = super().save(commit=False)
-
-        uploaded_file = self.cleaned_data.get('upload')
-        url = self.cleaned_data.get('image_url')
-
-        prefix = str(int(time.time()))
-        if uploaded_file:
-            # нормализуем имя файла: пробелы -> _, удаляем опасные символы
-            original_name = uploaded_file.name
-        elif url:
-            original_name = url.split('/')[-1]
-        else:
-            original_name = 'image.jpg'
-
-        safe_name = re.sub(r'\s+', '_', original_name)
-        safe_name = re.sub(r'[^\w.\-]', '', safe_name)
-        filename = f"{prefix}_{safe_name}"
-
-        if not filename.lower().endswith(('.png', '.jpg', '.jpeg', '.gif')):
-            raise forms.ValidationError("Файл должен быть изображением (PNG, JPG, JPEG, GIF).")
-
-        path = f'uploads/{filename}'
-        full_path = f'media/{path}'
-        
-        os.makedirs(os.path.dirname(full_path), exist_ok=True)
-
-        print(full_path)
-
-        if uploaded_file:
-            with open(full_path, 'wb+') as f:
-                for chunk in uploaded_file.chunks():
-                    f.write(chunk)
-        elif url:
-            response = requests.get(url.strip())
-            if response.status_code == 200:
-                with open(full_path, 'wb') as f:
-                    f.write(response.content)
-
-        instance.image_url = settings.HOST + '/' + full_path
-
-        if commit:
-            instance.save()
-        return instance
-
-
 
 class ProductImageInline(nested_admin.NestedTabularInline):
     model = ProductImage
+    formset = ParentInlineFormSet
     extra = 1
     form = ImageForm
     exclude = []
@@ -189,9 +254,7 @@ class ProductImageInline(nested_admin.NestedTabularInline):
     readonly_fields = ['preview']
 
     def preview(self, obj):
-        if obj.image_url:
-            return mark_safe(f'<img src="{obj.image_url}" width="100" />')
-        return "-"
+        return image_preview(obj)
 
 
 class ProductForm(forms.ModelForm):
@@ -201,19 +264,92 @@ class ProductForm(forms.ModelForm):
         fields = ['product_type', 'price_per_sqm', 'in_stock']
 
 
+class MissingTranslationFilter(admin.SimpleListFilter):
+    """Products without a translation into the chosen language (NOT EXISTS, no join per translation)"""
+    title = 'Нет перевода'
+    parameter_name = 'missing_translation'
+
+    def lookups(self, request, model_admin):
+        return settings.LANGUAGES
+
+    def queryset(self, request, queryset):
+        if self.value():
+            translated = ProductTranslation.objects.filter(product=OuterRef('pk'), language=self.value())
+            return queryset.filter(~Exists(translated))
+        return queryset
+
+
 class ProductAdmin(nested_admin.NestedModelAdmin):
-    list_display = ('id', 'get_name', 'price_per_sqm', 'created_at')
+    list_display = ('id', 'get_name', 'price_per_sqm', 'created_at', 'editor_link')
     list_display_links = ('id', 'get_name', 'price_per_sqm', 'created_at')
 
     search_fields = ('translations__name', 'tags')
-    list_filter = ('translations__language',)
+    list_filter = ('in_stock', MissingTranslationFilter)
     inlines = [ProductImageInline, ProductCharacteristicInline, ProductTranslationInline]
     form = ProductForm
 
+    def get_queryset(self, request):
+        return named(super().get_queryset(request))
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'product_type':
+            kwargs['form_class'] = ProductTypeChoiceField
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
     def get_name(self, obj):
-        translation = obj.translations.first()
-        return translation.name if translation else '(Нет перевода)'
+        return obj.display_name or '(Нет перевода)'
     get_name.short_description = 'Name'
+    get_name.admin_order_field = 'display_name'
+
+    def editor_link(self, obj):
+        return format_html('<a href="{}">Быстрый редактор</a>', reverse('admin:main_product_editor', args=[obj.pk]))
+    editor_link.short_description = 'Editor'
+
+    # --- Быстрый редактор: разделы грузятся по запросу, изменения сохраняются одним POST ---
+
+    def get_urls(self):
+        editor = self.admin_site.admin_view(self.editor_view)
+        section = self.admin_site.admin_view(self.editor_section_view)
+        return [
+            path('<int:product_id>/editor/', editor, name='main_product_editor'),
+            path('<int:product_id>/editor/<str:section>/', section, name='main_product_editor_section'),
+        ] + super().get_urls()
+
+    def _editor_product(self, request, product_id):
+        product = get_object_or_404(self.get_queryset(request), pk=product_id)
+        if not self.has_change_permission(request, product):
+            raise PermissionDenied
+        return product
+
+    def editor_view(self, request, product_id):
+        """GET: editor page with the main fields; POST: JSON changes for apply_changes"""
+        product = self._editor_product(request, product_id)
+        if request.method == 'POST':
+            try:
+                apply_changes(product, json.loads(request.body))
+            except ValueError as e:
+                # EditorError и неверный JSON
+                return JsonResponse({'success': False, 'error': str(e)}, status=400)
+            return JsonResponse({'success': True, 'product': product_data(product)})
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': f'{product} — быстрый редактор',
+            'product': product,
+            'product_json': product_data(product),
+            'product_types': product_type_choices(),
+            'languages': settings.LANGUAGES,
+            'sections': SECTIONS,
+        }
+        return TemplateResponse(request, 'admin/main/product/editor.html', context)
+
+    def editor_section_view(self, request, product_id, section):
+        """Rows of one inline section, loaded when the section is opened"""
+        product = self._editor_product(request, product_id)
+        try:
+            return JsonResponse({'rows': load_section(product, section)})
+        except EditorError as e:
+            return JsonResponse({'error': str(e)}, status=404)
 
     class Meta:
         verbose_name = "Продукт"
@@ -222,16 +358,50 @@ class ProductAdmin(nested_admin.NestedModelAdmin):
 
 
 class ContactInquiryAdmin(nested_admin.NestedModelAdmin):
-    list_display = ['name', 'email', 'phone', 'created_at']
+    list_display = ['name', 'email', 'phone', 'quote', 'created_at']
     list_filter = ['created_at']
     search_fields = ['name', 'email', 'phone']
-    readonly_fields = ['created_at']
+    readonly_fields = ['created_at', 'quote']
+    list_select_related = ['quote']
+
+
+class QuoteRoomInline(admin.TabularInline):
+    model = QuoteRoom
+    extra = 0
+    can_delete = False
+    fields = ('name', 'product', 'product_name', 'width', 'length', 'area', 'price_per_sqm', 'cost')
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def get_queryset(self, request):
+        # Название продукта в ссылке без запроса на каждую комнату
+        return super().get_queryset(request).prefetch_related(
+            Prefetch('product', queryset=named(Product.objects.all()))
+        )
+
+
+class QuoteAdmin(admin.ModelAdmin):
+    list_display = ['id', 'total_area', 'total_cost', 'language', 'created_at']
+    list_filter = ['created_at', 'language']
+    readonly_fields = ['id', 'language', 'total_area', 'total_cost', 'created_at']
+    inlines = [QuoteRoomInline]
+
+
+class ImageIngestionTaskAdmin(admin.ModelAdmin):
+    list_display = ['id', 'source_url', 'status', 'attempts', 'created_at']
+    list_filter = ['status']
+    readonly_fields = ['category', 'product_image', 'source_url', 'attempts', 'error', 'run_after', 'locked_at',
+                       'created_at']
 
 
 admin.site.register(ProductCategory, ProductCategoryAdmin)
 admin.site.register(ProductType, ProductTypeAdmin)
 admin.site.register(Product, ProductAdmin)
 admin.site.register(ContactInquiry, ContactInquiryAdmin)
+admin.site.register(Quote, QuoteAdmin)
+admin.site.register(ImageIngestionTask, ImageIngestionTaskAdmin)
 ############################
 
 
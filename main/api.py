@@ -0,0 +1,187 @@
+import re
+from functools import wraps
+
+import orjson
+from django.db.models import TextField
+from django.db.models.functions import Cast
+from django.http import HttpResponse
+from django.utils import translation
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+from django.views.decorators.http import require_GET
+
+from .db_router import read_replica
+from .http_cache import catalog_state, categories_state, conditional_page, product_state
+from .models import ProductCategory, ProductProjection, ProductType
+from .pagination import InvalidCursor, keyset_page
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+PRODUCT_FIELDS = ('id', 'name', 'type_name', 'description', 'price_per_sqm', 'in_stock', 'image_url', 'image_srcset',
+                  'additional_images', 'tags', 'characteristics')
+CATEGORY_FIELDS = ('id', 'name', 'description', 'image_url', 'image_srcset')
+TYPE_FIELDS = ('id', 'category', 'name')
+
+API_PAGE_SIZE = 24
+API_MAX_PAGE_SIZE = 100
+
+# Короткие ответы сжимать невыгодно
+MIN_COMPRESS_SIZE = 200
+BROTLI_RE = re.compile(r'\bbr\b')
+GZIP_RE = re.compile(r'\bgzip\b')
+
+
+class ApiError(ValueError):
+    pass
+
+
+def parse_fields(request, allowed):
+    """Fields requested with ?fields=a,b (in the given order), or None for all of them"""
+    value = request.GET.get('fields', '').strip()
+    if not value:
+        return None
+    fields = list(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise ApiError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def pick(data, fields):
+    return data if fields is None else {field: data.get(field) for field in fields}
+
+
+def parse_id(request, name):
+    value = request.GET.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ApiError(f'Invalid {name}')
+
+
+def compressed(request, response):
+    """Brotli (when installed) or gzip body, depending on Accept-Encoding"""
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if len(response.content) < MIN_COMPRESS_SIZE:
+        return response
+    accepted = request.headers.get('Accept-Encoding', '')
+    if brotli is not None and BROTLI_RE.search(accepted):
+        content, encoding = brotli.compress(response.content, quality=5), 'br'
+    elif GZIP_RE.search(accepted):
+        content, encoding = compress_string(response.content), 'gzip'
+    else:
+        return response
+    if len(content) < len(response.content):
+        response.content = content
+        response['Content-Encoding'] = encoding
+    return response
+
+
+def json_response(request, content, status=200):
+    """content: bytes already encoded as JSON"""
+    return compressed(request, HttpResponse(content, content_type='application/json', status=status))
+
+
+def api_view(view):
+    """GET-only API view; ApiError becomes a 400 with {"error": ...}"""
+    @require_GET
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except (ApiError, InvalidCursor) as e:
+            return json_response(request, orjson.dumps({'error': str(e)}), status=400)
+
+    return wrapper
+
+
+@api_view
+@read_replica
+@conditional_page(categories_state, public=True)
+def categories(request):
+    """All categories in the current language"""
+    language = translation.get_language()
+    fields = parse_fields(request, CATEGORY_FIELDS)
+    items = []
+    for category in ProductCategory.objects.prefetch_related('translations').order_by('id'):
+        data = category.get_translation_json(language)
+        data['image_url'] = category.image_url
+        items.append(pick(data, fields))
+    return json_response(request, orjson.dumps({'categories': items}))
+
+
+@api_view
+@read_replica
+@conditional_page(catalog_state, public=True)
+def product_types(request):
+    """Product types, optionally of one ?category="""
+    language = translation.get_language()
+    fields = parse_fields(request, TYPE_FIELDS)
+    queryset = ProductType.objects.prefetch_related('translations').order_by('id')
+    category_id = parse_id(request, 'category')
+    if category_id:
+        queryset = queryset.filter(category_id=category_id)
+    items = [
+        pick({**product_type.get_translation_json(language), 'category': product_type.category_id}, fields)
+        for product_type in queryset
+    ]
+    return json_response(request, orjson.dumps({'types': items}))
+
+
+def _projections(language):
+    # JSON проекции читается как текст: без модели и без json.loads на каждую строку
+    return ProductProjection.objects.filter(language=language).values(
+        'in_stock', 'created_at', 'product_id', raw=Cast('data', TextField())
+    )
+
+
+def _encode_product(row, fields):
+    if fields is None:
+        # Готовый JSON из проекции вставляется в ответ как есть
+        return row['raw'].encode()
+    return orjson.dumps(pick(orjson.loads(row['raw']), fields))
+
+
+@api_view
+@read_replica
+@conditional_page(catalog_state, public=True)
+def products(request):
+    """Products in catalog order, filtered by ?category= and ?type=, paged with ?cursor="""
+    language = translation.get_language()
+    fields = parse_fields(request, PRODUCT_FIELDS)
+    queryset = _projections(language)
+    category_id = parse_id(request, 'category')
+    if category_id:
+        queryset = queryset.filter(category_id=category_id)
+    type_id = parse_id(request, 'type')
+    if type_id:
+        queryset = queryset.filter(product_type_id=type_id)
+    page_size = parse_id(request, 'page_size') or API_PAGE_SIZE
+    page_size = min(max(page_size, 1), API_MAX_PAGE_SIZE)
+
+    rows, next_cursor = keyset_page(queryset, request.GET.get('cursor'), page_size)
+    next_url = None
+    if next_cursor:
+        params = request.GET.copy()
+        params['cursor'] = next_cursor
+        next_url = f'{request.path}?{params.urlencode()}'
+    items = b','.join(_encode_product(row, fields) for row in rows)
+    return json_response(request, b'{"products":[' + items + b'],"next_url":' + orjson.dumps(next_url) + b'}')
+
+
+@api_view
+@read_replica
+@conditional_page(product_state, public=True)
+def product(request, product_id):
+    """One product in the current language"""
+    language = translation.get_language()
+    fields = parse_fields(request, PRODUCT_FIELDS)
+    rows = list(_projections(language).filter(product_id=product_id))
+    if not rows:
+        return json_response(request, orjson.dumps({'error': 'Product not found'}), status=404)
+    return json_response(request, _encode_product(rows[0], fields))
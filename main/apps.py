@@ -1,6 +1,37 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.db.backends.signals import connection_created
+from django.db.migrations.loader import MigrationLoader
+from django.db.models.signals import post_migrate
+
+
+def main_migrated(using):
+    """All migrations of main are applied on using, so its tables match the models"""
+    loader = MigrationLoader(connections[using], ignore_no_migrations=True)
+    return set(loader.graph.leaf_nodes('main')) <= loader.applied_migrations.keys()
+
+
+def backfill_projection(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    from .models import ProductProjection
+    from .projection import backfill_missing
+    # migrate auth на пустой базе или откат main: таблиц проекции ещё (уже) нет
+    if router.allow_migrate_model(using, ProductProjection) and main_migrated(using):
+        backfill_missing(using)
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """settings.SQLITE_PRAGMAS on every new SQLite connection"""
+    if connection.vendor == 'sqlite':
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            connection.connection.execute(f'PRAGMA {name} = {value}')
 
 
 class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'main'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        post_migrate.connect(backfill_projection, sender=self)
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid='main.sqlite_pragmas')
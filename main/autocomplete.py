@@ -0,0 +1,155 @@
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.urls import reverse
+from django.utils import translation
+
+from .models import ProductCategory, ProductProjection, ProductType
+from .caching import catalog_version
+from .search import WORD_RE
+from .translations import prefetch_translations
+
+# Порядок типов подсказок при равной релевантности
+KIND_ORDER = {'category': 0, 'type': 1, 'product': 2}
+
+FUZZY_THRESHOLD = 0.4
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def tokens(text):
+    return [word.lower() for word in WORD_RE.findall(text or '')]
+
+
+def trigrams(word):
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b):
+    """Optimal string alignment distance (Levenshtein + adjacent transpositions)"""
+    previous, current = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+    return current[-1]
+
+
+def max_typos(word):
+    return 1 if len(word) <= 5 else 2
+
+
+class SuggestIndex:
+    """Prefix (sorted words + bisect) and trigram index over suggestion labels"""
+
+    def __init__(self, entries):
+        self.entries = entries
+        word_entries = defaultdict(set)
+        for position, entry in enumerate(entries):
+            for word in tokens(entry['label']):
+                word_entries[word].add(position)
+        self.word_entries = dict(word_entries)
+        self.words = sorted(self.word_entries)
+        self.trigram_words = defaultdict(set)
+        for word in self.words:
+            for trigram in trigrams(word):
+                self.trigram_words[trigram].add(word)
+
+    def prefix_matches(self, prefix):
+        matches = set()
+        start = bisect_left(self.words, prefix)
+        for word in self.words[start:]:
+            if not word.startswith(prefix):
+                break
+            matches |= self.word_entries[word]
+        return matches
+
+    def fuzzy_matches(self, word):
+        """{entry position: similarity} for words sharing enough trigrams with word"""
+        query_trigrams = trigrams(word)
+        shared = defaultdict(int)
+        for trigram in query_trigrams:
+            for candidate in self.trigram_words.get(trigram, ()):
+                shared[candidate] += 1
+        matches = {}
+        for candidate, count in shared.items():
+            similarity = count / len(query_trigrams | trigrams(candidate))
+            if similarity < FUZZY_THRESHOLD:
+                # Опечатки в коротких словах почти не оставляют общих триграмм,
+                # поэтому проверяем расстояние и до слова, и до его начала
+                typos = min(edit_distance(word, candidate), edit_distance(word, candidate[:len(word)]))
+                if typos <= max_typos(word):
+                    similarity = 1 - typos / max(len(word), 1)
+            if similarity >= FUZZY_THRESHOLD:
+                for position in self.word_entries[candidate]:
+                    matches[position] = max(matches.get(position, 0), similarity)
+        return matches
+
+    def suggest(self, query, limit=10):
+        scores = None
+        for word in tokens(query):
+            word_scores = dict.fromkeys(self.prefix_matches(word), 2.0)
+            if len(word) >= 3:
+                for position, similarity in self.fuzzy_matches(word).items():
+                    word_scores.setdefault(position, similarity)
+            # Каждое слово запроса должно совпасть (по префиксу или нечётко)
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = {position: scores[position] + score
+                          for position, score in word_scores.items() if position in scores}
+            if not scores:
+                return []
+        if not scores:
+            return []
+        ranked = sorted(scores, key=lambda position: (
+            -scores[position],
+            KIND_ORDER[self.entries[position]['kind']],
+            len(self.entries[position]['label']),
+        ))
+        return [self.entries[position] for position in ranked[:limit]]
+
+
+def build_entries(language):
+    with translation.override(language):
+        return _build_entries(language)
+
+
+def _build_entries(language):
+    entries = []
+    for category in prefetch_translations(ProductCategory.objects.all()):
+        name = category.get_translation_json(language)['name']
+        if name:
+            entries.append({'label': name, 'kind': 'category', 'id': category.id,
+                            'url': reverse('category_detail', args=[category.id])})
+    for product_type in prefetch_translations(ProductType.objects.filter(category__isnull=False)):
+        entries.append({'label': product_type.get_name(language), 'kind': 'type', 'id': product_type.id,
+                        'url': reverse('category_detail', args=[product_type.category_id])})
+    for product_id, data in ProductProjection.objects.filter(language=language).values_list('product_id', 'data'):
+        if data.get('name'):
+            entries.append({'label': data['name'], 'kind': 'product', 'id': product_id,
+                            'url': reverse('product_detail', args=[product_id])})
+    return entries
+
+
+def get_index(language):
+    """Per-process index for language, rebuilt when the catalog version changes"""
+    version = catalog_version()
+    cached = _indexes.get(language)
+    if cached and cached[0] == version:
+        return cached[1]
+    with _lock:
+        cached = _indexes.get(language)
+        if not cached or cached[0] != version:
+            cached = _indexes[language] = (version, SuggestIndex(build_entries(language)))
+    return cached[1]
+
+
+def suggest(query, language, limit=10):
+    return get_index(language).suggest(query, limit)
@@ -0,0 +1,124 @@
+import glob
+import hashlib
+import os
+import uuid
+from datetime import timedelta
+from urllib.parse import unquote, urlparse
+
+from django.conf import settings
+from django.db.models import Count, ProtectedError, Q
+from django.utils import timezone
+
+from .images import DERIVATIVE_DIR
+from .models import MediaBlob, ProductCategory, ProductImage
+
+BLOB_DIR = 'blobs'
+
+
+def blob_path(digest, extension):
+    return f'{BLOB_DIR}/{digest[:2]}/{digest}{extension}'
+
+
+def write_chunks(chunks, extension):
+    """Hash chunks while writing them into the blob directory; returns (digest, size, path).
+
+    Touches only the filesystem, so it is safe to call from fetch threads.
+    """
+    tmp_dir = os.path.join(settings.MEDIA_ROOT, BLOB_DIR)
+    os.makedirs(tmp_dir, exist_ok=True)
+    tmp_path = os.path.join(tmp_dir, f'.{uuid.uuid4().hex}.tmp')
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, 'wb') as f:
+            for chunk in chunks:
+                digest.update(chunk)
+                size += len(chunk)
+                f.write(chunk)
+        digest = digest.hexdigest()
+        path = blob_path(digest, extension)
+        full_path = os.path.join(settings.MEDIA_ROOT, path)
+        if not os.path.exists(full_path):
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            os.replace(tmp_path, full_path)
+        return digest, size, path
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def register_blob(digest, size, path):
+    """MediaBlob for a file written by write_chunks, reusing the existing row for the digest"""
+    blob, created = MediaBlob.objects.get_or_create(digest=digest, defaults={'path': path, 'size': size})
+    if not created and blob.path != path:
+        if os.path.exists(os.path.join(settings.MEDIA_ROOT, blob.path)):
+            # Тот же файл уже хранится под другим расширением
+            os.remove(os.path.join(settings.MEDIA_ROOT, path))
+        else:
+            blob.path = path
+            blob.save(update_fields=['path'])
+    return blob
+
+
+def store_chunks(chunks, extension):
+    """Store a file once per content: hash while writing, reuse the blob if the digest exists"""
+    return register_blob(*write_chunks(chunks, extension))
+
+
+def store_file(path, extension):
+    with open(path, 'rb') as f:
+        return store_chunks(iter(lambda: f.read(64 * 1024), b''), extension)
+
+
+def blob_digest(url):
+    """Digest of the blob a media URL points to (any host), or None for other URLs"""
+    path = unquote(urlparse(url).path) if url else ''
+    prefix = f'{settings.MEDIA_URL}{BLOB_DIR}/'
+    if not path.startswith(prefix):
+        return None
+    return os.path.splitext(os.path.basename(path))[0] or None
+
+
+def blobs_for_urls(urls):
+    """{url: MediaBlob} for the URLs that point into the blob store"""
+    digests = {url: blob_digest(url) for url in urls}
+    blobs = MediaBlob.objects.in_bulk({digest for digest in digests.values() if digest}, field_name='digest')
+    return {url: blobs[digest] for url, digest in digests.items() if digest in blobs}
+
+
+def refresh_ref_counts(blob_ids):
+    """Recount ProductImage/ProductCategory references of the given blobs"""
+    blobs = MediaBlob.objects.filter(id__in=set(blob_ids) - {None}).annotate(
+        images=Count('product_images', distinct=True), categories_count=Count('categories', distinct=True)
+    )
+    changed = []
+    for blob in blobs:
+        ref_count = blob.images + blob.categories_count
+        if blob.ref_count != ref_count:
+            blob.ref_count = ref_count
+            changed.append(blob)
+    MediaBlob.objects.bulk_update(changed, ['ref_count'])
+
+
+def collect_garbage(min_age=timedelta(days=1)):
+    """Delete unreferenced blobs older than min_age with their files and derivatives"""
+    candidates = MediaBlob.objects.filter(created_at__lt=timezone.now() - min_age)
+    refresh_ref_counts(candidates.values_list('id', flat=True))
+    deleted = 0
+    for blob in candidates.filter(ref_count=0):
+        # Ссылка только по URL (строка без image_blob): файл ещё показывается на сайте
+        by_url = Q(image_url__endswith=blob.path)
+        if ProductImage.objects.filter(by_url).exists() or ProductCategory.objects.filter(by_url).exists():
+            continue
+        paths = [os.path.join(settings.MEDIA_ROOT, blob.path)]
+        paths += glob.glob(os.path.join(settings.MEDIA_ROOT, DERIVATIVE_DIR, blob.digest[:2], f'{blob.digest}-*'))
+        try:
+            blob.delete()
+        except ProtectedError:
+            # На файл сослались уже после пересчёта
+            continue
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+        deleted += 1
+    return deleted
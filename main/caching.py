@@ -0,0 +1,238 @@
+import math
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import translation
+
+VERSION_KEY = 'catalog:version'
+CHANGED_AT_KEY = 'catalog:changed_at'
+METRICS_PREFIX = 'cache:metrics'
+METRIC_EVENTS = ('local_hit', 'shared_hit', 'miss', 'early_recompute', 'stale_served', 'lock_wait')
+
+_tiers = {}
+
+
+def shared_cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def _new_version():
+    # Уникальное значение, а не счётчик: после вытеснения ключа не вернёмся
+    # к версии, под которой уже лежат старые данные
+    return uuid.uuid4().hex[:16]
+
+
+def catalog_version():
+    """Current catalog version; part of every versioned cache key"""
+    cache = shared_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, _new_version(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """Switch every versioned cache key to a new version.
+
+    A fresh unique value is set instead of incr(): incr of the file and
+    locmem backends is get + set, so two processes bumping at once could
+    both write the same number and lose a bump. set() of one key is atomic
+    in every backend, and whichever value lands last differs from all the
+    versions pages were cached under before it.
+    """
+    # Время правки читает db_router: сразу после неё реплика может отставать
+    shared_cache().set(CHANGED_AT_KEY, time.time(), None)
+    shared_cache().set(VERSION_KEY, _new_version(), None)
+
+
+def catalog_changed_at():
+    """Time of the last catalog version bump, or None"""
+    return shared_cache().get(CHANGED_AT_KEY)
+
+
+class LocalLRU:
+    """Thread-safe per-process LRU of cache entries"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class CacheMetrics:
+    """Per-namespace event counters, flushed to the shared cache in batches"""
+
+    def __init__(self, namespace, flush_every=100):
+        self.namespace = namespace
+        self.flush_every = flush_every
+        self.counts = dict.fromkeys(METRIC_EVENTS, 0)
+        self.pending = 0
+        self.lock = threading.Lock()
+
+    def record(self, event):
+        with self.lock:
+            self.counts[event] += 1
+            self.pending += 1
+            if self.pending < self.flush_every:
+                return
+            counts, self.counts, self.pending = self.counts, dict.fromkeys(METRIC_EVENTS, 0), 0
+        self.flush(counts)
+
+    def flush(self, counts=None):
+        if counts is None:
+            with self.lock:
+                counts, self.counts, self.pending = self.counts, dict.fromkeys(METRIC_EVENTS, 0), 0
+        cache = shared_cache()
+        for event, count in counts.items():
+            if count:
+                key = f'{METRICS_PREFIX}:{self.namespace}:{event}'
+                # add не перезапишет счётчик другого процесса
+                if not cache.add(key, count, None):
+                    try:
+                        cache.incr(key, count)
+                    except ValueError:
+                        cache.set(key, count, None)
+
+
+def read_metrics(namespaces):
+    """{namespace: {event: count}} summed over all processes (as flushed so far)"""
+    cache = shared_cache()
+    return {
+        namespace: {event: cache.get(f'{METRICS_PREFIX}:{namespace}:{event}', 0) for event in METRIC_EVENTS}
+        for namespace in namespaces
+    }
+
+
+class TieredCache:
+    """Per-process LRU in front of the shared cache backend.
+
+    Keys are namespaced and, unless disabled, include the current language
+    and catalog version, so a catalog change makes every old entry
+    unreachable in both tiers at once. get_or_set protects the shared tier
+    from stampedes: a cold key is computed by one process under a lock
+    while the others wait for it, and warm keys are recomputed slightly
+    before they expire (probabilistic early expiration, XFetch) while
+    everyone else keeps getting the current value.
+    """
+
+    def __init__(self, namespace, timeout, local_entries=256, per_language=True, versioned=True, beta=1.0,
+                 lock_timeout=10):
+        self.namespace = namespace
+        self.timeout = timeout
+        self.per_language = per_language
+        self.versioned = versioned
+        self.beta = beta
+        self.lock_timeout = lock_timeout
+        self.local = LocalLRU(local_entries)
+        self.metrics = CacheMetrics(namespace)
+        _tiers[namespace] = self
+
+    def make_key(self, key):
+        parts = [self.namespace]
+        if self.per_language:
+            parts.append(translation.get_language() or settings.LANGUAGE_CODE)
+        if self.versioned:
+            parts.append(str(catalog_version()))
+        parts.append(str(key))
+        return ':'.join(parts)
+
+    def _lookup(self, full_key):
+        entry = self.local.get(full_key)
+        if entry is not None and entry[1] > time.time():
+            return entry, 'local_hit'
+        entry = shared_cache().get(full_key)
+        if entry is not None:
+            self.local.set(full_key, entry)
+            return entry, 'shared_hit'
+        return None, 'miss'
+
+    def _store(self, full_key, value, delta):
+        expires_at = time.time() + self.timeout if self.timeout else math.inf
+        entry = (value, expires_at, delta)
+        shared_cache().set(full_key, entry, self.timeout)
+        self.local.set(full_key, entry)
+
+    def get(self, key, default=None):
+        entry, event = self._lookup(self.make_key(key))
+        self.metrics.record(event)
+        return default if entry is None else entry[0]
+
+    def set(self, key, value):
+        self._store(self.make_key(key), value, 0)
+
+    def _compute(self, full_key, compute):
+        started = time.monotonic()
+        value = compute()
+        self._store(full_key, value, time.monotonic() - started)
+        return value
+
+    def _locked_compute(self, full_key, compute):
+        lock_key = f'{full_key}:lock'
+        if not shared_cache().add(lock_key, 1, self.lock_timeout):
+            return False, None
+        try:
+            return True, self._compute(full_key, compute)
+        finally:
+            shared_cache().delete(lock_key)
+
+    def get_or_set(self, key, compute):
+        full_key = self.make_key(key)
+        entry, event = self._lookup(full_key)
+        if entry is not None:
+            value, expires_at, delta = entry
+            # XFetch: чем дольше пересчёт и ближе истечение, тем вероятнее ранний пересчёт
+            if time.time() - delta * self.beta * math.log(1 - random.random()) < expires_at:
+                self.metrics.record(event)
+                return value
+            computed, new_value = self._locked_compute(full_key, compute)
+            self.metrics.record('early_recompute' if computed else 'stale_served')
+            return new_value if computed else value
+
+        self.metrics.record('miss')
+        computed, value = self._locked_compute(full_key, compute)
+        if computed:
+            return value
+        # Значение уже считает другой процесс: ждём его, а не считаем параллельно
+        self.metrics.record('lock_wait')
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            entry = shared_cache().get(full_key)
+            if entry is not None:
+                self.local.set(full_key, entry)
+                return entry[0]
+            # Блокировку сняли без значения (пересчёт упал, например Http404): не ждём до таймаута
+            if shared_cache().get(f'{full_key}:lock') is None:
+                computed, value = self._locked_compute(full_key, compute)
+                if computed:
+                    return value
+                deadline = time.monotonic() + self.lock_timeout
+        return self._compute(full_key, compute)
+
+
+def tiers():
+    return dict(_tiers)
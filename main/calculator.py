@@ -0,0 +1,153 @@
+import threading
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models.fields.json import KT
+
+from .models import ProductProjection, Quote, QuoteRoom
+from .caching import catalog_version
+from .pagination import CATALOG_ORDERING
+
+MONEY = Decimal('0.01')
+
+# Размер комнаты в метрах, как в CalculatorForm (max_digits=5, decimal_places=2)
+MAX_DIMENSION = Decimal('999.99')
+MAX_ROOMS = 100
+
+_table = None
+_lock = threading.Lock()
+
+
+class QuoteError(ValueError):
+    pass
+
+
+def to_decimal(value, field):
+    """Positive room dimension rounded to 0.01 m, as QuoteRoom stores it.
+
+    Accepts str, int, Decimal and float (JSON numbers); a float is taken by
+    its shortest repr, so 2.7 becomes Decimal('2.7'), not the binary value.
+    Area and cost are computed from the rounded value, so a saved quote adds up.
+    """
+    if isinstance(value, float):
+        value = str(value)
+    try:
+        number = Decimal(value)
+    except (InvalidOperation, TypeError, ValueError):
+        raise QuoteError(f'Invalid {field}')
+    # Диапазон проверяется до quantize: для 1e30 quantize бросает InvalidOperation
+    if not number.is_finite() or number <= 0 or number > MAX_DIMENSION:
+        raise QuoteError(f'Invalid {field}')
+    number = number.quantize(MONEY, rounding=ROUND_HALF_UP)
+    if not number:
+        raise QuoteError(f'Invalid {field}')
+    return number
+
+
+class PriceTable:
+    """Product id → price per m² and display names per language, for one catalog version"""
+
+    def __init__(self, rows):
+        self.prices = {}
+        self.names = {}
+        self.order = []
+        for product_id, language, price, type_name, name in rows:
+            if product_id not in self.prices:
+                self.prices[product_id] = price
+                self.order.append(product_id)
+            self.names.setdefault(product_id, {})[language] = type_name or name
+
+    def name(self, product_id, language):
+        names = self.names.get(product_id, {})
+        return names.get(language) or next(iter(names.values()), None)
+
+    def options(self, language):
+        """Products for the calculator select, in catalog order"""
+        return [
+            {'id': product_id, 'type_name': self.name(product_id, language), 'price_per_sqm': self.prices[product_id]}
+            for product_id in self.order
+        ]
+
+    def quote(self, product_id, width, length, language):
+        try:
+            product_id = int(product_id)
+        except (TypeError, ValueError):
+            raise QuoteError('Invalid product')
+        if product_id not in self.prices:
+            raise QuoteError('Unknown product')
+        width = to_decimal(width, 'width')
+        length = to_decimal(length, 'length')
+        area = width * length
+        price = self.prices[product_id]
+        return {
+            'product_id': product_id,
+            'product_name': self.name(product_id, language),
+            'width': width,
+            'length': length,
+            'area': area,
+            'price_per_sqm': price,
+            'cost': (area * price).quantize(MONEY, ROUND_HALF_UP),
+        }
+
+    def quote_rooms(self, rooms, language):
+        """Quote every room ({width, length, product_id, name?}) and the totals"""
+        if not isinstance(rooms, list) or not rooms:
+            raise QuoteError('No rooms')
+        if len(rooms) > MAX_ROOMS:
+            raise QuoteError(f'At most {MAX_ROOMS} rooms')
+        quotes = []
+        for number, room in enumerate(rooms, 1):
+            if not isinstance(room, dict):
+                raise QuoteError(f'Room {number}: invalid room')
+            try:
+                quote = self.quote(room.get('product_id'), room.get('width'), room.get('length'), language)
+            except QuoteError as e:
+                raise QuoteError(f'Room {number}: {e}')
+            quote['name'] = str(room.get('name') or '')[:100]
+            quotes.append(quote)
+        return {
+            'rooms': quotes,
+            'total_area': sum((quote['area'] for quote in quotes), Decimal(0)),
+            'total_cost': sum((quote['cost'] for quote in quotes), Decimal(0)),
+        }
+
+
+def get_price_table():
+    """Per-process price table, rebuilt when the catalog version changes"""
+    global _table
+    version = catalog_version()
+    if _table and _table[0] == version:
+        return _table[1]
+    with _lock:
+        if not _table or _table[0] != version:
+            # Из JSON берутся только названия, без остальных данных продукта
+            rows = ProductProjection.objects.order_by(*CATALOG_ORDERING).values_list(
+                'product_id', 'language', 'price_per_sqm', KT('data__type_name'), KT('data__name')
+            )
+            _table = (version, PriceTable(rows))
+    return _table[1]
+
+
+def save_quote(result, language):
+    """Persist a quote_rooms() result as a Quote with its rooms"""
+    with transaction.atomic():
+        quote = Quote.objects.create(language=language, total_area=result['total_area'],
+                                     total_cost=result['total_cost'])
+        QuoteRoom.objects.bulk_create([
+            QuoteRoom(quote=quote, order=order, name=room['name'], product_id=room['product_id'],
+                      product_name=(room['product_name'] or '')[:500], width=room['width'], length=room['length'],
+                      area=room['area'], price_per_sqm=room['price_per_sqm'], cost=room['cost'])
+            for order, room in enumerate(result['rooms'])
+        ])
+    return quote
+
+
+def find_quote(quote_id):
+    """Quote by its id (str or UUID), None for empty, malformed or unknown ids"""
+    if not quote_id:
+        return None
+    try:
+        return Quote.objects.filter(id=quote_id).first()
+    except ValidationError:
+        return None
@@ -0,0 +1,363 @@
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.color import no_style
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import (Product, ProductCategory, ProductCategoryTranslation, ProductCharacteristic,
+                     ProductCharacteristicTranslation, ProductImage, ProductTranslation, ProductType,
+                     ProductTypeTranslation)
+from .blobs import blobs_for_urls, refresh_ref_counts
+from .caching import bump_catalog_version
+from .projection import LANGUAGES, deferred_rebuilds, rebuild_products
+
+
+class CatalogImportError(ValueError):
+    pass
+
+
+# --- Экспорт ---
+
+def category_record(category):
+    return {
+        'model': 'category',
+        'id': category.id,
+        'image_url': category.image_url,
+        'translations': {t.language: {'name': t.name, 'description': t.description}
+                         for t in category.translations.all()},
+    }
+
+
+def type_record(product_type):
+    return {
+        'model': 'type',
+        'id': product_type.id,
+        'category': product_type.category_id,
+        'translations': {t.language: t.name for t in product_type.translations.all()},
+    }
+
+
+def product_record(product):
+    return {
+        'model': 'product',
+        'id': product.id,
+        'type': product.product_type_id,
+        'price_per_sqm': str(product.price_per_sqm),
+        'in_stock': product.in_stock,
+        'tags': product.tags,
+        'image_url': product.image_url,
+        'translations': {t.language: {'name': t.name, 'description': t.description}
+                         for t in product.translations.all()},
+        'characteristics': [
+            {'translations': {t.language: {'name': t.name, 'value': t.value} for t in char.translations.all()}}
+            for char in product.characteristics.all()
+        ],
+        'images': [{'url': image.image_url, 'alt_text': image.alt_text}
+                   for image in product.images.all() if image.image_url],
+    }
+
+
+def export_records(batch_size=500):
+    """Catalog as records: categories, then types, then products (streamed in chunks)"""
+    for category in ProductCategory.objects.prefetch_related('translations').order_by('id').iterator(batch_size):
+        yield category_record(category)
+    for product_type in ProductType.objects.prefetch_related('translations').order_by('id').iterator(batch_size):
+        yield type_record(product_type)
+    products = Product.objects.prefetch_related('translations', 'images', 'characteristics__translations')
+    for product in products.order_by('id').iterator(batch_size):
+        yield product_record(product)
+
+
+def write_jsonl(records, stream):
+    for record in records:
+        stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def csv_columns():
+    columns = ['id', 'type', 'price_per_sqm', 'in_stock', 'tags', 'image_url']
+    for language in LANGUAGES:
+        columns += [f'name_{language}', f'description_{language}']
+    columns += ['category', 'category_image_url']
+    columns += [f'category_name_{language}' for language in LANGUAGES]
+    columns += [f'type_name_{language}' for language in LANGUAGES]
+    columns += ['characteristics', 'images']
+    return columns
+
+
+def write_csv(records, stream):
+    """One row per product; category and type names are repeated on every row"""
+    writer = csv.DictWriter(stream, fieldnames=csv_columns())
+    writer.writeheader()
+    categories, types = {}, {}
+    for record in records:
+        if record['model'] == 'category':
+            categories[record['id']] = record
+            continue
+        if record['model'] == 'type':
+            types[record['id']] = record
+            continue
+        product_type = types.get(record['type'], {})
+        category = categories.get(product_type.get('category'), {})
+        row = {
+            'id': record['id'],
+            'type': record['type'] or '',
+            'price_per_sqm': record['price_per_sqm'],
+            'in_stock': int(record['in_stock']),
+            'tags': record['tags'],
+            'image_url': record['image_url'],
+            'category': category.get('id', ''),
+            'category_image_url': category.get('image_url') or '',
+            'characteristics': json.dumps([char['translations'] for char in record['characteristics']],
+                                          ensure_ascii=False),
+            'images': ' '.join(image['url'] for image in record['images']),
+        }
+        for language in LANGUAGES:
+            translation = record['translations'].get(language, {})
+            row[f'name_{language}'] = translation.get('name', '')
+            row[f'description_{language}'] = translation.get('description', '')
+            row[f'category_name_{language}'] = category.get('translations', {}).get(language, {}).get('name', '')
+            row[f'type_name_{language}'] = product_type.get('translations', {}).get(language, '')
+        writer.writerow(row)
+
+
+# --- Импорт ---
+
+def read_jsonl(stream):
+    for line_number, line in enumerate(stream, 1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                raise CatalogImportError(f'Line {line_number}: {e}')
+
+
+def read_csv(stream):
+    """Records from product rows; each category and type is emitted once, before its first product"""
+    seen_categories, seen_types = set(), set()
+    reader = csv.DictReader(stream)
+    try:
+        for row in reader:
+            try:
+                records = list(_csv_records(row, seen_categories, seen_types))
+            except (KeyError, TypeError, ValueError) as e:
+                raise CatalogImportError(f'Line {reader.line_num}: {e!r}')
+            yield from records
+    except csv.Error as e:
+        raise CatalogImportError(f'Line {reader.line_num}: {e}')
+
+
+def _csv_records(row, seen_categories, seen_types):
+    category_id = int(row['category']) if row.get('category') else None
+    type_id = int(row['type']) if row.get('type') else None
+    if category_id and category_id not in seen_categories:
+        seen_categories.add(category_id)
+        yield {
+            'model': 'category',
+            'id': category_id,
+            'image_url': row.get('category_image_url') or None,
+            'translations': {language: {'name': row[f'category_name_{language}']}
+                             for language in LANGUAGES if row.get(f'category_name_{language}')},
+        }
+    if type_id and type_id not in seen_types:
+        seen_types.add(type_id)
+        yield {
+            'model': 'type',
+            'id': type_id,
+            'category': category_id,
+            'translations': {language: row[f'type_name_{language}']
+                             for language in LANGUAGES if row.get(f'type_name_{language}')},
+        }
+    characteristics = json.loads(row.get('characteristics') or '[]')
+    if not isinstance(characteristics, list) or not all(isinstance(item, dict) for item in characteristics):
+        raise ValueError('characteristics must be a JSON list of translation objects')
+    yield {
+        'model': 'product',
+        'id': int(row['id']),
+        'type': type_id,
+        'price_per_sqm': row['price_per_sqm'],
+        'in_stock': row.get('in_stock', '1') not in ('0', 'false', 'False', ''),
+        'tags': row.get('tags', ''),
+        'image_url': row.get('image_url', ''),
+        'translations': {
+            language: {'name': row[f'name_{language}'], 'description': row.get(f'description_{language}', '')}
+            for language in LANGUAGES if row.get(f'name_{language}')
+        },
+        'characteristics': [{'translations': translations} for translations in characteristics],
+        'images': [{'url': url, 'alt_text': ''} for url in (row.get('images') or '').split()],
+    }
+
+
+def _upsert(model, objects, fields):
+    """bulk_update objects whose id exists, bulk_create the rest with their ids"""
+    # bulk_update не вызывает auto_now
+    now = timezone.now()
+    for obj in objects:
+        obj.updated_at = now
+    fields = [*fields, 'updated_at']
+    existing = set(model.objects.filter(id__in=[obj.id for obj in objects]).values_list('id', flat=True))
+    # bulk_update строит CASE WHEN на каждую строку: небольшие пачки компилируются быстрее
+    model.objects.bulk_update([obj for obj in objects if obj.id in existing], fields, batch_size=100)
+    model.objects.bulk_create([obj for obj in objects if obj.id not in existing])
+
+
+def _upsert_translations(model, parent_field, values):
+    """values: {(parent_id, language): {field: value}}.
+
+    Only the given fields are written, so a CSV without descriptions keeps
+    the existing ones; translations missing from the file are left alone.
+    """
+    existing = {
+        (getattr(obj, f'{parent_field}_id'), obj.language): obj
+        for obj in model.objects.filter(**{f'{parent_field}_id__in': {key[0] for key in values}})
+    }
+    to_update, to_create, fields = [], [], set()
+    for (parent_id, language), data in values.items():
+        obj = existing.get((parent_id, language))
+        if obj is None:
+            to_create.append(model(**{f'{parent_field}_id': parent_id, 'language': language}, **data))
+        else:
+            for field, value in data.items():
+                setattr(obj, field, value)
+            fields.update(data)
+            to_update.append(obj)
+    if to_update:
+        model.objects.bulk_update(to_update, sorted(fields), batch_size=100)
+    model.objects.bulk_create(to_create)
+
+
+def _import_categories(records):
+    """Returns ids of the blobs whose references changed"""
+    blobs = blobs_for_urls(r.get('image_url') for r in records)
+    old_blobs = ProductCategory.objects.filter(id__in=[r['id'] for r in records]).values_list('image_blob', flat=True)
+    categories = [
+        ProductCategory(id=r['id'], image_url=r.get('image_url'), image_blob=blobs.get(r.get('image_url')))
+        for r in records
+    ]
+    changed_blobs = {*old_blobs, *(category.image_blob_id for category in categories)}
+    _upsert(ProductCategory, categories, ['image_url', 'image_blob'])
+    _upsert_translations(ProductCategoryTranslation, 'product_category', {
+        (r['id'], language): {field: t[field] for field in ('name', 'description') if field in t}
+        for r in records for language, t in r['translations'].items()
+    })
+    return changed_blobs
+
+
+def _import_types(records):
+    _upsert(ProductType, [ProductType(id=r['id'], category_id=r.get('category')) for r in records], ['category'])
+    _upsert_translations(ProductTypeTranslation, 'product_type', {
+        (r['id'], language): {'name': name} for r in records for language, name in r['translations'].items()
+    })
+
+
+def _import_products(records):
+    _upsert(Product, [
+        Product(id=r['id'], product_type_id=r.get('type'), price_per_sqm=Decimal(r['price_per_sqm']),
+                in_stock=r.get('in_stock', True), tags=r.get('tags', ''), image_url=r.get('image_url') or '')
+        for r in records
+    ], ['product_type', 'price_per_sqm', 'in_stock', 'tags', 'image_url'])
+
+    # Переводы, характеристики и изображения заменяются целиком
+    ids = [r['id'] for r in records]
+    old_blobs = set(ProductImage.objects.filter(product_id__in=ids).values_list('image_blob', flat=True))
+    ProductTranslation.objects.filter(product_id__in=ids).delete()
+    ProductCharacteristic.objects.filter(product_id__in=ids).delete()
+    ProductImage.objects.filter(product_id__in=ids).delete()
+
+    ProductTranslation.objects.bulk_create([
+        ProductTranslation(product_id=r['id'], language=language, name=t['name'],
+                           description=t.get('description', ''))
+        for r in records for language, t in r['translations'].items()
+    ])
+    characteristics = ProductCharacteristic.objects.bulk_create([
+        ProductCharacteristic(product_id=r['id'], order=order)
+        for r in records for order, _ in enumerate(r.get('characteristics', []))
+    ])
+    char_translations = [
+        char['translations'] for r in records for char in r.get('characteristics', [])
+    ]
+    ProductCharacteristicTranslation.objects.bulk_create([
+        ProductCharacteristicTranslation(characteristic=characteristic, language=language, name=t['name'],
+                                         value=t.get('value', ''))
+        for characteristic, translations in zip(characteristics, char_translations)
+        for language, t in translations.items()
+    ])
+    # Изображения из хранилища снова ссылаются на свой файл, иначе сборщик мусора его удалит
+    blobs = blobs_for_urls(image['url'] for r in records for image in r.get('images', []))
+    images = ProductImage.objects.bulk_create([
+        ProductImage(product_id=r['id'], image_url=image['url'], image_blob=blobs.get(image['url']),
+                     alt_text=image.get('alt_text', ''), order=order)
+        for r in records for order, image in enumerate(r.get('images', []))
+    ])
+    return old_blobs | {image.image_blob_id for image in images}
+
+
+IMPORTERS = {
+    'category': _import_categories,
+    'type': _import_types,
+    'product': _import_products,
+}
+
+
+def import_records(records, batch_size=500):
+    """Upsert records by id, batch_size records per transaction; returns {model: count}.
+
+    Categories and types must come before the products that use them (as
+    export_records and read_csv emit them); inside a batch they are written
+    first. Projection rows are rebuilt once per batch instead of per row.
+    """
+    counts = dict.fromkeys(IMPORTERS, 0)
+    touched = {model: set() for model in IMPORTERS}
+    batch = []
+
+    def flush(number):
+        by_model = {model: [r for r in batch if r['model'] == model] for model in IMPORTERS}
+        try:
+            with transaction.atomic(), deferred_rebuilds():
+                changed_blobs = set()
+                for model, model_records in by_model.items():
+                    if model_records:
+                        changed_blobs |= IMPORTERS[model](model_records) or set()
+                rebuild_products([r['id'] for r in by_model['product']])
+                refresh_ref_counts(changed_blobs)
+        # IntegrityError может прийти и при COMMIT (в SQLite внешние ключи проверяются отложенно)
+        except (KeyError, TypeError, ValueError, InvalidOperation, IntegrityError) as e:
+            raise CatalogImportError(f'Batch ending at record {number}: {e!r}')
+        for model, model_records in by_model.items():
+            counts[model] += len(model_records)
+            touched[model].update(r['id'] for r in model_records)
+        batch.clear()
+
+    number = 0
+    for number, record in enumerate(records, 1):
+        if not isinstance(record, dict) or record.get('model') not in IMPORTERS or 'id' not in record:
+            raise CatalogImportError(f'Record {number}: unknown model or missing id')
+        batch.append(record)
+        if len(batch) >= batch_size:
+            flush(number)
+    if batch:
+        flush(number)
+
+    _reset_sequences()
+    # Продукты, которых нет в файле, но чьи категории или типы изменились
+    stale = Product.objects.filter(
+        Q(product_type_id__in=touched['type']) | Q(product_type__category_id__in=touched['category'])
+    ).values_list('id', flat=True) if touched['type'] or touched['category'] else []
+    stale = [product_id for product_id in stale if product_id not in touched['product']]
+    for start in range(0, len(stale), batch_size):
+        rebuild_products(stale[start:start + batch_size])
+    bump_catalog_version()
+    return counts
+
+
+def _reset_sequences():
+    # Строки создавались с явными id: счётчики автоинкремента (PostgreSQL) нужно сдвинуть
+    statements = connection.ops.sequence_reset_sql(no_style(), [
+        ProductCategory, ProductCategoryTranslation, ProductType, ProductTypeTranslation, Product,
+        ProductTranslation, ProductCharacteristic, ProductCharacteristicTranslation, ProductImage,
+    ])
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
@@ -0,0 +1,92 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from .caching import catalog_changed_at
+
+REPLICA = 'replica'
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+def replica_is_fresh():
+    """False for DATABASE_REPLICA_LAG seconds after a catalog change"""
+    changed_at = catalog_changed_at()
+    return changed_at is None or time.time() - changed_at > settings.DATABASE_REPLICA_LAG
+
+
+@contextmanager
+def primary():
+    """Read from the primary inside the block, e.g. to read back rows just written there"""
+    token = _use_replica.set(False)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class ReplicaRouter:
+    """Reads of views marked with read_replica go to the replica; everything else to the primary.
+
+    Writes always go to the primary, even for objects read from the replica,
+    and the replica is never migrated: it gets the schema from the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and replica_configured():
+            return REPLICA
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика — копия основной базы, связи между ними допустимы
+        return {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, REPLICA} or None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
+
+
+def _should_use_replica(request):
+    # POST может сразу читать то, что записал; после правок каталога реплика ещё отстаёт
+    return request.method in ('GET', 'HEAD') and replica_configured() and replica_is_fresh()
+
+
+def read_replica(view):
+    """Run the queries of a read-only catalog view on the replica, when one is configured.
+
+    Only GET/HEAD requests are routed, and only when the catalog has not been
+    changed during the last DATABASE_REPLICA_LAG seconds. Works for both sync
+    and async views: sync_to_async copies the routing flag into its thread.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            use = replica_configured() and await sync_to_async(_should_use_replica)(request)
+            token = _use_replica.set(use)
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _use_replica.reset(token)
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        token = _use_replica.set(_should_use_replica(request))
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _use_replica.reset(token)
+
+    return wrapper
@@ -0,0 +1,139 @@
+import threading
+from bisect import bisect_left, bisect_right
+
+from .models import ProductProjection
+from .caching import catalog_version
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def positions(bits):
+    """Set bit positions of an int bitset, lowest first"""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class CategoryFacetIndex:
+    """Inverted index of one category in one language.
+
+    Products are numbered in listing order; every characteristic value,
+    the in-stock flag and each product type map to an int bitset of those
+    positions, so filters are AND/OR over ints and counts are bit_count().
+    """
+
+    def __init__(self, projections):
+        self.products = []
+        self.product_types = []
+        self.values = {}
+        self.types = {}
+        self.in_stock = 0
+        for position, projection in enumerate(projections):
+            bit = 1 << position
+            self.products.append(projection.data)
+            self.product_types.append(projection.product_type_id)
+            self.types[projection.product_type_id] = self.types.get(projection.product_type_id, 0) | bit
+            if projection.in_stock:
+                self.in_stock |= bit
+            for char in projection.data.get('characteristics', []):
+                values = self.values.setdefault(char['name'], {})
+                values[char['value']] = values.get(char['value'], 0) | bit
+        self.all = (1 << len(self.products)) - 1
+        # Цены по возрастанию для выборки диапазона через bisect
+        by_price = sorted(range(len(self.products)), key=lambda p: self.products[p]['price_per_sqm'])
+        self.sorted_prices = [self.products[p]['price_per_sqm'] for p in by_price]
+        self.sorted_positions = by_price
+
+    def characteristic_values(self):
+        return {name: sorted(values, key=lambda value: value or '') for name, values in self.values.items()}
+
+    def price_bits(self, price_min=None, price_max=None):
+        if price_min is None and price_max is None:
+            return self.all
+        start = bisect_left(self.sorted_prices, price_min) if price_min is not None else 0
+        stop = bisect_right(self.sorted_prices, price_max) if price_max is not None else len(self.sorted_prices)
+        bits = 0
+        for position in self.sorted_positions[start:stop]:
+            bits |= 1 << position
+        return bits
+
+    def characteristic_bits(self, name, values):
+        bits = 0
+        for value in values:
+            bits |= self.values.get(name, {}).get(value, 0)
+        return bits
+
+    def bits_for_ids(self, product_ids):
+        wanted = set(product_ids)
+        bits = 0
+        for position, data in enumerate(self.products):
+            if data['id'] in wanted:
+                bits |= 1 << position
+        return bits
+
+    def filter(self, characteristics=None, in_stock=False, price_min=None, price_max=None, product_ids=None):
+        """Matching bitset plus facet counts and the price range of the other filters"""
+        characteristics = {name: values for name, values in (characteristics or {}).items() if values}
+        base = self.all
+        if in_stock:
+            base &= self.in_stock
+        if product_ids is not None:
+            base &= self.bits_for_ids(product_ids)
+        selected = {name: self.characteristic_bits(name, values) for name, values in characteristics.items()}
+
+        without_price = base
+        for bits in selected.values():
+            without_price &= bits
+        price = self.price_bits(price_min, price_max)
+        matched = without_price & price
+
+        # Счётчики значения считаются без фильтра по своей же характеристике
+        facets = {}
+        for name, values in self.values.items():
+            others = base & price
+            for other, bits in selected.items():
+                if other != name:
+                    others &= bits
+            facets[name] = {value: (others & bits).bit_count() for value, bits in values.items()}
+
+        prices = [self.products[position]['price_per_sqm'] for position in positions(without_price)]
+        return matched, {
+            'facets': facets,
+            'in_stock': (matched & self.in_stock).bit_count(),
+            'sections': {type_id: (matched & bits).bit_count() for type_id, bits in self.types.items()},
+            'price': {'min': min(prices, default=0), 'max': max(prices, default=0)},
+        }
+
+    def page(self, bits, page=1, page_size=24):
+        matched = list(positions(bits))
+        start = (page - 1) * page_size
+        return [self.products[position] for position in matched[start:start + page_size]]
+
+    def product_ids(self, bits):
+        return [self.products[position]['id'] for position in positions(bits)]
+
+    def sections(self):
+        """{product_type_id: [product dicts]} in listing order"""
+        sections = {}
+        for type_id, data in zip(self.product_types, self.products):
+            sections.setdefault(type_id, []).append(data)
+        return sections
+
+
+def get_facet_index(category_id, language):
+    """Per-process facet index, rebuilt when the catalog version changes"""
+    version = catalog_version()
+    key = (category_id, language)
+    cached = _indexes.get(key)
+    if cached and cached[0] == version:
+        return cached[1]
+    with _lock:
+        cached = _indexes.get(key)
+        if not cached or cached[0] != version:
+            projections = ProductProjection.objects.filter(category_id=category_id, language=language).only(
+                'product_type_id', 'in_stock', 'data'
+            )
+            cached = _indexes[key] = (version, CategoryFacetIndex(projections))
+    return cached[1]
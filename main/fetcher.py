@@ -0,0 +1,100 @@
+import threading
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+CHUNK_SIZE = 64 * 1024
+
+# Сигнатуры форматов: тип файла определяем по содержимому, а не по имени
+IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', '.png'),
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'GIF87a', '.gif'),
+    (b'GIF89a', '.gif'),
+)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class FetchError(Exception):
+    pass
+
+
+def sniff_image_type(head):
+    """Extension for the image format recognised from the first bytes, or None"""
+    for signature, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    return None
+
+
+def get_session():
+    """Process-wide session: keep-alive connection pool per host, shared by all fetch threads"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=16,
+                    pool_maxsize=settings.IMAGE_FETCH_CONCURRENCY,
+                    max_retries=Retry(total=2, connect=2, read=0, backoff_factor=0.5),
+                )
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers['User-Agent'] = 'ceiling-solutions-image-fetcher'
+                _session = session
+    return _session
+
+
+class RemoteImage:
+    """Streaming image download with a byte cap, an overall deadline and a magic-byte check.
+
+    Use as a context manager; .extension is known after opening, .chunks()
+    streams the body and raises FetchError when a limit is exceeded.
+    """
+
+    def __init__(self, url, max_bytes=None, timeout=None, deadline=None):
+        self.url = url
+        self.max_bytes = max_bytes or settings.IMAGE_FETCH_MAX_BYTES
+        self.timeout = timeout or settings.IMAGE_INGEST_TIMEOUT
+        self.deadline = deadline or settings.IMAGE_FETCH_DEADLINE
+        self.response = None
+        self.extension = None
+
+    def __enter__(self):
+        self.started = time.monotonic()
+        self.response = get_session().get(self.url, stream=True, timeout=self.timeout)
+        try:
+            if self.response.status_code != 200:
+                raise FetchError(f'HTTP {self.response.status_code}')
+            length = self.response.headers.get('Content-Length')
+            if length and length.isdigit() and int(length) > self.max_bytes:
+                raise FetchError(f'Image is larger than {self.max_bytes} bytes')
+            self._body = self.response.iter_content(CHUNK_SIZE)
+            self._head = next(self._body, b'')
+            self.extension = sniff_image_type(self._head)
+            if self.extension is None:
+                raise FetchError('Not a PNG, JPEG or GIF image')
+        except BaseException:
+            self.response.close()
+            raise
+        return self
+
+    def __exit__(self, *exc_info):
+        self.response.close()
+
+    def chunks(self):
+        size = len(self._head)
+        yield self._head
+        for chunk in self._body:
+            size += len(chunk)
+            if size > self.max_bytes:
+                raise FetchError(f'Image is larger than {self.max_bytes} bytes')
+            if time.monotonic() - self.started > self.deadline:
+                raise FetchError(f'Download took longer than {self.deadline}s')
+            yield chunk
@@ -1,12 +1,16 @@
 from django import forms
 from django.core.exceptions import ValidationError
 import re
-from .models import ContactInquiry, Product
+from .calculator import find_quote
+from .models import ContactInquiry
 
 class ContactForm(forms.ModelForm):
+    # id сметы из ссылки калькулятора; в модель попадает сама смета
+    quote = forms.CharField(required=False, widget=forms.HiddenInput)
+
     class Meta:
         model = ContactInquiry
-        fields = ['name', 'email', 'phone', 'message']
+        fields = ['name', 'email', 'phone', 'message', 'quote']
         widgets = {
             'name': forms.TextInput(attrs={
                 'class': 'form-control',
@@ -32,6 +36,10 @@ class ContactForm(forms.ModelForm):
             })
         }
 
+    def clean_quote(self):
+        # Неизвестная смета не мешает отправить заявку
+        return find_quote(self.cleaned_data.get('quote'))
+
     def clean_phone(self):
         phone = self.cleaned_data.get('phone')
         if not phone:
@@ -83,10 +91,9 @@ class CalculatorForm(forms.Form):
             'min': '0.1'
         })
     )
-    ceiling_type = forms.ModelChoiceField(
-        queryset=Product.objects.all(),
+    # Продукт проверяется по таблице цен калькулятора, без запроса к Product
+    ceiling_type = forms.IntegerField(
         widget=forms.Select(attrs={
             'class': 'form-control'
-        }),
-        empty_label="Choose a ceiling type..."
+        })
     )
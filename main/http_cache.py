@@ -0,0 +1,130 @@
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils import translation
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .caching import TieredCache
+from .models import ProductCategory, ProductProjection, ProductType
+from .page_cache import can_use_cache
+
+# Валидаторы зависят только от данных каталога: пока версия не сменилась, 304 обходится без агрегатов
+validators = TieredCache('validators', settings.CATALOG_VALIDATORS_TIMEOUT,
+                         local_entries=settings.CATALOG_LOCAL_CACHE_ENTRIES)
+
+
+def _aggregate(queryset):
+    return tuple(queryset.aggregate(updated_at=Max('updated_at'), count=Count('pk')).values())
+
+
+def _validators(*parts):
+    """(Last-Modified timestamp, weak ETag) for (newest updated_at, row count) pairs.
+
+    The counts catch deletions, which leave the newest updated_at unchanged.
+    """
+    timestamps = [updated_at for updated_at, _ in parts if updated_at]
+    last_modified = int(max(timestamps).timestamp()) if timestamps else None
+    key = repr((settings.RELEASE, translation.get_language(), parts))
+    return last_modified, f'W/"{hashlib.md5(key.encode()).hexdigest()}"'
+
+
+def catalog_state(request, *args, **kwargs):
+    """Validators for the whole catalog in the current language"""
+    return _validators(
+        _aggregate(ProductCategory.objects.all()),
+        _aggregate(ProductType.objects.all()),
+        _aggregate(ProductProjection.objects.filter(language=translation.get_language())),
+    )
+
+
+def categories_state(request, *args, **kwargs):
+    return _validators(_aggregate(ProductCategory.objects.all()))
+
+
+def category_state(request, category_id, *args, **kwargs):
+    """Validators for a category page: the category, its types and its products"""
+    return _validators(
+        _aggregate(ProductCategory.objects.filter(id=category_id)),
+        _aggregate(ProductType.objects.filter(category_id=category_id)),
+        _aggregate(ProductProjection.objects.filter(category_id=category_id, language=translation.get_language())),
+    )
+
+
+def product_state(request, product_id, *args, **kwargs):
+    """Validators for a product page: the product and the category it is shown in"""
+    projection = ProductProjection.objects.filter(product_id=product_id, language=translation.get_language())
+    return _validators(
+        _aggregate(projection),
+        _aggregate(ProductCategory.objects.filter(id__in=projection.values('category_id'))),
+    )
+
+
+def _patch_headers(response, public):
+    if public:
+        # JSON без CSRF-токенов: можно хранить в CDN и обратном прокси
+        patch_cache_control(response, public=True, max_age=settings.CATALOG_HTTP_MAX_AGE,
+                            s_maxage=settings.CATALOG_HTTP_SHARED_MAX_AGE)
+    else:
+        # В HTML есть CSRF-токен, поэтому только браузер, и каждый раз с проверкой
+        patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Accept-Language',))
+
+
+def _pre_process(request, state, public, args, kwargs):
+    """(304 response or None, last_modified, etag); validators are skipped for personal requests"""
+    # Публичные JSON-ответы не читают сессию: иначе появится Vary: Cookie и CDN их не сохранит
+    if request.method not in ('GET', 'HEAD') or (not public and not can_use_cache(request)):
+        return None, None, None
+    key = ':'.join([state.__name__, *map(str, args), *(f'{k}={v}' for k, v in sorted(kwargs.items()))])
+    last_modified, etag = validators.get_or_set(key, lambda: state(request, *args, **kwargs))
+    return get_conditional_response(request, etag=etag, last_modified=last_modified), last_modified, etag
+
+
+def _post_process(response, last_modified, etag, public):
+    if etag and response.status_code == 200:
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+    if response.status_code in (200, 304):
+        _patch_headers(response, public)
+    return response
+
+
+def conditional_page(state, public=False):
+    """Answer conditional GETs from catalog timestamps before the view runs.
+
+    state(request, *view_args) returns (last_modified, etag) for the data the
+    view renders; it must depend only on the view arguments, the language
+    and the catalog, because its result is cached per catalog version. A
+    matching If-None-Match / If-Modified-Since gets a 304 without rendering.
+    Adds Cache-Control and Vary: Accept-Language. Pages with pending flash
+    messages and non-GET requests go straight to the view. Works for both
+    sync and async views.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                not_modified, last_modified, etag = await sync_to_async(_pre_process)(
+                    request, state, public, args, kwargs
+                )
+                if not_modified is not None:
+                    return _post_process(not_modified, last_modified, etag, public)
+                return _post_process(await view(request, *args, **kwargs), last_modified, etag, public)
+
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            not_modified, last_modified, etag = _pre_process(request, state, public, args, kwargs)
+            if not_modified is not None:
+                return _post_process(not_modified, last_modified, etag, public)
+            return _post_process(view(request, *args, **kwargs), last_modified, etag, public)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,106 @@
+import hashlib
+import os
+from functools import lru_cache
+from urllib.parse import unquote, urlparse
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+# Ширины производных изображений для srcset
+DERIVATIVE_WIDTHS = (320, 640, 960, 1280)
+DERIVATIVE_DIR = 'derivatives'
+DERIVATIVE_QUALITY = 80
+
+# Анимированные GIF не пережимаем
+DERIVABLE_FORMATS = ('JPEG', 'PNG', 'WEBP')
+
+EXIF_ORIENTATION = 0x0112
+
+
+def media_url(path):
+    return f"{settings.HOST}{settings.MEDIA_URL}{path}"
+
+
+def local_media_path(image_url):
+    """Path under MEDIA_ROOT for a media URL (any host), or None for external images"""
+    if not image_url:
+        return None
+    path = unquote(urlparse(image_url).path)
+    if not path.startswith(settings.MEDIA_URL):
+        return None
+    full_path = os.path.join(settings.MEDIA_ROOT, path[len(settings.MEDIA_URL):])
+    return full_path if os.path.isfile(full_path) else None
+
+
+@lru_cache(maxsize=4096)
+def _file_digest(path, mtime_ns, size):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_digest(path):
+    # mtime и размер в ключе: перезаписанный файл хэшируется заново
+    stat = os.stat(path)
+    return _file_digest(path, stat.st_mtime_ns, stat.st_size)
+
+
+def derivative_path(digest, width):
+    return f'{DERIVATIVE_DIR}/{digest[:2]}/{digest}-{width}.webp'
+
+
+@lru_cache(maxsize=4096)
+def _derivatives(path, digest):
+    """[(width, media path)] for the source file with this digest, generating missing files"""
+    with Image.open(path) as image:
+        if image.format not in DERIVABLE_FORMATS:
+            return []
+        # EXIF-поворот на 90° меняет местами ширину и высоту
+        rotated = image.getexif().get(EXIF_ORIENTATION) in (5, 6, 7, 8)
+        source_width = image.height if rotated else image.width
+        widths = [width for width in DERIVATIVE_WIDTHS if width < source_width]
+        # Самый большой вариант — исходная ширина, но в WebP
+        if source_width <= DERIVATIVE_WIDTHS[-1]:
+            widths.append(source_width)
+
+        missing = [
+            width for width in widths
+            if not os.path.exists(os.path.join(settings.MEDIA_ROOT, derivative_path(digest, width)))
+        ]
+        if missing:
+            source = ImageOps.exif_transpose(image)
+            if source.mode not in ('RGB', 'RGBA'):
+                has_alpha = source.mode in ('LA', 'PA') or 'transparency' in source.info
+                source = source.convert('RGBA' if has_alpha else 'RGB')
+            for width in missing:
+                _save_variant(source, width, os.path.join(settings.MEDIA_ROOT, derivative_path(digest, width)))
+    return [(width, derivative_path(digest, width)) for width in widths]
+
+
+def _save_variant(source, width, full_path):
+    resized = source.copy()
+    resized.thumbnail((width, width * 10), Image.LANCZOS)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    # Пишем во временный файл, чтобы параллельный процесс не увидел недописанный
+    tmp_path = f'{full_path}.{os.getpid()}.tmp'
+    resized.save(tmp_path, 'WEBP', quality=DERIVATIVE_QUALITY, method=4)
+    os.replace(tmp_path, full_path)
+
+
+def derivatives(image_url):
+    """[(width, url)] WebP variants of a local media image; empty for external or broken images"""
+    path = local_media_path(image_url)
+    if path is None:
+        return []
+    try:
+        return [(width, media_url(relative_path)) for width, relative_path in _derivatives(path, file_digest(path))]
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return []
+
+
+def srcset(image_url):
+    """srcset attribute value for image_url, or None when there are no variants"""
+    variants = derivatives(image_url)
+    return ', '.join(f'{url} {width}w' for width, url in variants) or None
@@ -0,0 +1,119 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .blobs import register_blob, store_chunks, write_chunks
+from .fetcher import RemoteImage, sniff_image_type
+from .images import derivatives, media_url
+from .models import ImageIngestionTask, ProductCategory
+
+
+def uploaded_image_type(uploaded_file):
+    """Extension of an uploaded image by its magic bytes, or None"""
+    uploaded_file.seek(0)
+    head = uploaded_file.read(16)
+    uploaded_file.seek(0)
+    return sniff_image_type(head)
+
+
+def store_upload(uploaded_file):
+    blob = store_chunks(uploaded_file.chunks(), uploaded_image_type(uploaded_file))
+    derivatives(blob.url)
+    return blob
+
+
+def image_update_fields(instance, fields=('image_url', 'image_blob', 'image_status')):
+    """update_fields for an image change; categories also get their updated_at bumped"""
+    return [*fields, 'updated_at'] if isinstance(instance, ProductCategory) else list(fields)
+
+
+def enqueue_image(instance, url):
+    """Queue the download of url into a saved ProductCategory or ProductImage"""
+    field = 'category' if instance._meta.model_name == 'productcategory' else 'product_image'
+    # Незавершённые задачи по этому же объекту больше не нужны
+    ImageIngestionTask.objects.filter(**{field: instance}, status__in=['pending', 'processing']).delete()
+    return ImageIngestionTask.objects.create(**{field: instance}, source_url=url)
+
+
+def fetch(url):
+    """Stream url into the blob directory; (digest, size, path) or the exception. No DB access"""
+    try:
+        with RemoteImage(url) as image:
+            digest, size, path = write_chunks(image.chunks(), image.extension)
+        derivatives(media_url(path))
+        return digest, size, path
+    # Любая ошибка (сеть, диск, PIL в derivatives) — результат задачи, а не падение потока:
+    # иначе задачи так и останутся в processing до истечения блокировки
+    except Exception as e:
+        return e
+
+
+def claim_tasks(limit):
+    """Atomically move up to limit due tasks to processing; stale locks are reclaimed"""
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.IMAGE_INGEST_LOCK_TIMEOUT)
+    ImageIngestionTask.objects.filter(status='processing', locked_at__lt=stale).update(status='pending')
+
+    claimed = []
+    for task_id in ImageIngestionTask.objects.filter(status='pending', run_after__lte=now).values_list(
+        'id', flat=True
+    )[:limit]:
+        # Условный UPDATE: задачу забирает только один воркер
+        if ImageIngestionTask.objects.filter(id=task_id, status='pending').update(
+            status='processing', locked_at=now
+        ):
+            claimed.append(task_id)
+    return list(ImageIngestionTask.objects.filter(id__in=claimed).select_related('category', 'product_image'))
+
+
+def _finish(task, status, image_status, blob=None, error=''):
+    with transaction.atomic():
+        updated = ImageIngestionTask.objects.filter(pk=task.pk).update(
+            status=status, error=error, locked_at=None, attempts=task.attempts, run_after=task.run_after
+        )
+        # Задачу удалили, пока шла загрузка: в админке уже задан другой источник
+        target = task.target if updated else None
+        if target is not None:
+            if blob is not None:
+                target.image_url = blob.url
+                target.image_blob = blob
+            target.image_status = image_status
+            target.save(update_fields=image_update_fields(target))
+
+
+def finish_task(task, result):
+    """Record a fetch result in the database: link the blob or schedule a retry"""
+    task.attempts += 1
+    if isinstance(result, Exception):
+        if task.attempts < settings.IMAGE_INGEST_MAX_ATTEMPTS:
+            # Повтор с нарастающей задержкой
+            task.run_after = timezone.now() + timedelta(seconds=30 * 2 ** task.attempts)
+            _finish(task, 'pending', 'pending', error=str(result))
+        else:
+            _finish(task, 'failed', 'failed', error=str(result))
+        return False
+    try:
+        _finish(task, 'done', 'ready', blob=register_blob(*result))
+    except Exception as e:
+        # Файл скачан, но не записан в базу: повтор или отказ, как при ошибке загрузки
+        task.attempts -= 1
+        return finish_task(task, e)
+    return True
+
+
+def process_pending(limit=10):
+    """Process up to limit queued tasks, return (done, failed).
+
+    Downloads run in parallel threads that only touch the network and the
+    filesystem; database writes stay in the calling thread.
+    """
+    tasks = claim_tasks(limit)
+    if not tasks:
+        return 0, 0
+    with ThreadPoolExecutor(max_workers=settings.IMAGE_FETCH_CONCURRENCY) as pool:
+        results = list(pool.map(fetch, [task.source_url for task in tasks]))
+    done = sum(finish_task(task, result) for task, result in zip(tasks, results))
+    return done, len(tasks) - done
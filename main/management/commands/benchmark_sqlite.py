@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from main.sqlite_benchmark import SQLITE_DEFAULTS, category_urls, run_benchmark
+
+
+class Command(BaseCommand):
+    help = 'Measure concurrent category page reads while contact inquiries are being written (SQLite)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8, help='Reading threads')
+        parser.add_argument('--writers', type=int, default=2, help='Writing threads')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per run')
+        parser.add_argument('--write-interval', type=float, default=0.01, help='Pause between inserts of a writer')
+        parser.add_argument('--compare', action='store_true',
+                            help='Run with SQLite defaults first, then with SQLITE_PRAGMAS')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError(f'The default database is {connection.vendor}, not SQLite')
+        urls = category_urls()
+        if not urls:
+            raise CommandError('No categories to read')
+
+        profiles = [('tuned', settings.SQLITE_PRAGMAS)]
+        if options['compare']:
+            profiles.insert(0, ('defaults', SQLITE_DEFAULTS))
+        for name, pragmas in profiles:
+            result = run_benchmark(urls, pragmas, readers=options['readers'], writers=options['writers'],
+                                   duration=options['duration'], write_interval=options['write_interval'])
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{name}: {', '.join(f'{key}={value}' for key, value in result['pragmas'].items())}"
+            ))
+            for kind in ('reads', 'writes'):
+                stats = result[kind]
+                line = (f"  {kind}: {stats['count']} ({stats['per_second']:.1f}/s), p50 {stats['p50_ms']:.1f} ms, "
+                        f"p95 {stats['p95_ms']:.1f} ms, p99 {stats['p99_ms']:.1f} ms, max {stats['max_ms']:.1f} ms, "
+                        f"errors {stats['errors']}")
+                self.stdout.write(self.style.ERROR(line) if stats['errors'] else line)
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from main import http_cache, page_cache  # noqa: F401 (регистрируют свои кэши)
+from main.caching import METRIC_EVENTS, METRICS_PREFIX, catalog_version, read_metrics, shared_cache, tiers
+
+
+class Command(BaseCommand):
+    help = 'Show hit/miss counters of the catalog caches, summed over all processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters after printing them')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Catalog version: {catalog_version()}')
+        self.stdout.write('Counters are flushed by each process every 100 events')
+        metrics = read_metrics(sorted(tiers()))
+        for namespace, counts in metrics.items():
+            hits = counts['local_hit'] + counts['shared_hit'] + counts['early_recompute'] + counts['stale_served']
+            total = hits + counts['miss']
+            ratio = f'{hits / total:.1%}' if total else '-'
+            details = ', '.join(f'{event}={counts[event]}' for event in METRIC_EVENTS)
+            self.stdout.write(f'{namespace}: hit ratio {ratio} ({details})')
+        if options['reset']:
+            shared_cache().delete_many([
+                f'{METRICS_PREFIX}:{namespace}:{event}' for namespace in metrics for event in METRIC_EVENTS
+            ])
+            self.stdout.write(self.style.SUCCESS('Counters reset'))
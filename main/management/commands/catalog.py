@@ -0,0 +1,47 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.catalog_io import (CatalogImportError, export_records, import_records, read_csv, read_jsonl, write_csv,
+                             write_jsonl)
+
+READERS = {'jsonl': read_jsonl, 'csv': read_csv}
+WRITERS = {'jsonl': write_jsonl, 'csv': write_csv}
+
+
+class Command(BaseCommand):
+    help = 'Export or import the catalog tree (categories, types, products with translations, ' \
+           'characteristics and images) as JSONL or CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['export', 'import'])
+        parser.add_argument('path', help="File path, or '-' for stdout/stdin")
+        parser.add_argument('--format', choices=sorted(READERS),
+                            help='Defaults to the file extension, jsonl otherwise')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Records per query chunk (export) or per transaction (import)')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('csv' if path.endswith('.csv') else 'jsonl')
+
+        if options['action'] == 'export':
+            stream = sys.stdout if path == '-' else open(path, 'w', encoding='utf-8', newline='')
+            try:
+                WRITERS[file_format](export_records(options['batch_size']), stream)
+            finally:
+                if stream is not sys.stdout:
+                    stream.close()
+            return
+
+        stream = sys.stdin if path == '-' else open(path, encoding='utf-8', newline='')
+        try:
+            counts = import_records(READERS[file_format](stream), options['batch_size'])
+        except CatalogImportError as e:
+            raise CommandError(str(e))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {counts['category']} categories, {counts['type']} types, {counts['product']} products"
+        ))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main.query_plans import admin_available, admin_urls, catalog_urls, check_urls
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN on the queries of every catalog page and API endpoint; fails on full table scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='*', help='Check these URLs instead of the catalog pages')
+        parser.add_argument('--admin', action='store_true',
+                            help='Also check admin pages; requests are made as the first superuser')
+        parser.add_argument('--show-sorts', action='store_true', help='Also list sorts that use no index')
+
+    def handle(self, *args, **options):
+        verbosity = options['verbosity']
+        if options['admin'] and not admin_available():
+            raise CommandError('--admin needs a superuser')
+        if options['urls']:
+            results = check_urls(options['urls'], admin=options['admin'])
+        else:
+            results = check_urls(catalog_urls())
+            if options['admin']:
+                results.update(check_urls(admin_urls(), admin=True))
+
+        failures = 0
+        for url, (status, queries) in results.items():
+            scans = sum(bool(query_scans) for _, query_scans, _ in queries)
+            line = f'{url} [{status}]: {len(queries)} queries, {scans} with full scans'
+            self.stdout.write(self.style.ERROR(line) if scans or status >= 400 else line)
+            for sql, query_scans, sorts in queries:
+                if query_scans or (sorts and options['show_sorts']) or verbosity > 1:
+                    self.stdout.write(f'    {sql}')
+                    for detail in query_scans:
+                        self.stdout.write(self.style.ERROR(f'      {detail}'))
+                    if options['show_sorts'] or verbosity > 1:
+                        for detail in sorts:
+                            self.stdout.write(self.style.WARNING(f'      {detail}'))
+            failures += scans + (status >= 400)
+
+        if failures:
+            raise CommandError(f'{failures} problems: full table scans or failed requests')
+        self.stdout.write(self.style.SUCCESS(f'No full table scans in {len(results)} URLs'))
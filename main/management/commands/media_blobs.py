@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from main.blobs import collect_garbage, store_file
+from main.images import local_media_path
+from main.ingestion import image_update_fields
+from main.fetcher import sniff_image_type
+from main.models import ProductCategory, ProductImage
+
+
+class Command(BaseCommand):
+    help = 'Move legacy uploads into content-addressed blobs and delete unreferenced blobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--import-uploads', action='store_true',
+                            help='Link images that still point at media/uploads to deduplicated blobs')
+        parser.add_argument('--min-age-hours', type=float, default=24,
+                            help='Keep unreferenced blobs younger than this')
+
+    def handle(self, *args, **options):
+        if options['import_uploads']:
+            imported = 0
+            for model in (ProductImage, ProductCategory):
+                legacy = model.objects.filter(image_blob__isnull=True).exclude(image_url__isnull=True)
+                for instance in legacy.exclude(image_url=''):
+                    path = local_media_path(instance.image_url)
+                    if path is None:
+                        continue
+                    with open(path, 'rb') as f:
+                        extension = sniff_image_type(f.read(16))
+                    if extension is None:
+                        continue
+                    instance.image_blob = store_file(path, extension)
+                    instance.image_url = instance.image_blob.url
+                    instance.save(update_fields=image_update_fields(instance, ('image_blob', 'image_url')))
+                    imported += 1
+            self.stdout.write(f'Linked {imported} images to blobs')
+
+        deleted = collect_garbage(timedelta(hours=options['min_age_hours']))
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} unreferenced blobs'))
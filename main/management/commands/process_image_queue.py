@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main.ingestion import process_pending
+
+
+class Command(BaseCommand):
+    help = 'Download queued admin images (run continuously, or once with --once)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process the queue once and exit')
+        parser.add_argument('--batch-size', type=int, default=10)
+        parser.add_argument('--sleep', type=float, default=5, help='Seconds to wait when the queue is empty')
+
+    def handle(self, *args, **options):
+        while True:
+            done, failed = process_pending(options['batch_size'])
+            if done or failed:
+                self.stdout.write(f'Processed {done} images, {failed} failed')
+            if options['once']:
+                break
+            if not (done or failed):
+                time.sleep(options['sleep'])
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from main.projection import rebuild_all
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized product catalog projection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        count = rebuild_all(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt projection for {count} products'))
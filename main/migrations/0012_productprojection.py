@@ -0,0 +1,39 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0011_product_in_stock_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='product',
+            options={'ordering': ['-in_stock', '-created_at'], 'verbose_name': 'Модель', 'verbose_name_plural': 'Модели'},
+        ),
+        migrations.CreateModel(
+            name='ProductProjection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('language', models.CharField(choices=[('en', 'English'), ('ru', 'Русский'), ('ky', 'Кыргызча')], max_length=10)),
+                ('price_per_sqm', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('in_stock', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField()),
+                ('data', models.JSONField()),
+                ('category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='main.productcategory')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='projections', to='main.product')),
+                ('product_type', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='main.producttype')),
+            ],
+            options={
+                'verbose_name': 'Проекция продукта',
+                'verbose_name_plural': 'Проекции продуктов',
+                'ordering': ['-in_stock', '-created_at', 'product_id'],
+                'indexes': [models.Index(fields=['language', 'category'], name='projection_lang_category_idx')],
+                'unique_together': {('product', 'language')},
+            },
+        ),
+    ]
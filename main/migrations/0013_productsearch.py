@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+def create_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE IF NOT EXISTS main_productsearch USING fts5('
+        'language UNINDEXED, name, type_name, tags, characteristics, description, '
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS main_productsearch')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0012_productprojection'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0013_productsearch'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productprojection',
+            index=models.Index(fields=['language', 'product_type', '-in_stock', '-created_at', 'product'], name='projection_type_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productprojection',
+            index=models.Index(fields=['language', '-in_stock', '-created_at', 'product'], name='projection_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0014_projection_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productcategory',
+            name='image_status',
+            field=models.CharField(choices=[('ready', 'Готово'), ('pending', 'Загружается'), ('failed', 'Ошибка загрузки')], default='ready', max_length=10, verbose_name='Статус изображения'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='image_status',
+            field=models.CharField(choices=[('ready', 'Готово'), ('pending', 'Загружается'), ('failed', 'Ошибка загрузки')], default='ready', max_length=10, verbose_name='Статус изображения'),
+        ),
+        migrations.AlterField(
+            model_name='productimage',
+            name='image_url',
+            field=models.URLField(blank=True, verbose_name='URL изображения'),
+        ),
+        migrations.CreateModel(
+            name='ImageIngestionTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_url', models.URLField(max_length=1000, verbose_name='Источник')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('processing', 'Обрабатывается'), ('done', 'Готово'), ('failed', 'Ошибка')], default='pending', max_length=10, verbose_name='Статус')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Попытки')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('run_after', models.DateTimeField(auto_now_add=True, verbose_name='Не раньше')),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='image_tasks', to='main.productcategory')),
+                ('product_image', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='image_tasks', to='main.productimage')),
+            ],
+            options={
+                'verbose_name': 'Загрузка изображения',
+                'verbose_name_plural': 'Загрузки изображений',
+                'ordering': ['run_after', 'id'],
+                'indexes': [models.Index(fields=['status', 'run_after'], name='image_task_queue_idx')],
+            },
+        ),
+    ]
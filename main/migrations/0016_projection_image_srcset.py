@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+def clear_projection(apps, schema_editor):
+    # Проекция пересоберётся с image_srcset в post_migrate (backfill_projection)
+    apps.get_model('main', 'ProductProjection').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0015_image_ingestion'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_projection, migrations.RunPython.noop),
+    ]
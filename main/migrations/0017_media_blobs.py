@@ -0,0 +1,39 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0016_projection_image_srcset'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, unique=True, verbose_name='SHA-256')),
+                ('path', models.CharField(max_length=255, verbose_name='Путь в MEDIA_ROOT')),
+                ('size', models.PositiveBigIntegerField(verbose_name='Размер')),
+                ('ref_count', models.PositiveIntegerField(default=0, verbose_name='Ссылок')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+            ],
+            options={
+                'verbose_name': 'Файл',
+                'verbose_name_plural': 'Файлы',
+            },
+        ),
+        migrations.AddField(
+            model_name='productcategory',
+            name='image_blob',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='categories', to='main.mediablob'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='image_blob',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='product_images', to='main.mediablob'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:42
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0017_media_blobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Quote',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('language', models.CharField(choices=[('en', 'English'), ('ru', 'Русский'), ('ky', 'Кыргызча')], default='ru', max_length=10, verbose_name='Язык')),
+                ('total_area', models.DecimalField(decimal_places=4, max_digits=14, verbose_name='Общая площадь, м²')),
+                ('total_cost', models.DecimalField(decimal_places=2, max_digits=20, verbose_name='Итого')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+            ],
+            options={
+                'verbose_name': 'Смета',
+                'verbose_name_plural': 'Сметы',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='contactinquiry',
+            name='quote',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='inquiries', to='main.quote', verbose_name='Смета'),
+        ),
+        migrations.CreateModel(
+            name='QuoteRoom',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order', models.PositiveIntegerField(default=0, verbose_name='Порядок')),
+                ('name', models.CharField(blank=True, max_length=100, verbose_name='Помещение')),
+                ('product_name', models.CharField(blank=True, max_length=500, verbose_name='Название продукта')),
+                ('width', models.DecimalField(decimal_places=2, max_digits=5, verbose_name='Ширина, м')),
+                ('length', models.DecimalField(decimal_places=2, max_digits=5, verbose_name='Длина, м')),
+                ('area', models.DecimalField(decimal_places=4, max_digits=12, verbose_name='Площадь, м²')),
+                ('price_per_sqm', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Цена за м²')),
+                ('cost', models.DecimalField(decimal_places=2, max_digits=20, verbose_name='Стоимость')),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='main.product', verbose_name='Продукт')),
+                ('quote', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rooms', to='main.quote')),
+            ],
+            options={
+                'verbose_name': 'Помещение сметы',
+                'verbose_name_plural': 'Помещения сметы',
+                'ordering': ['order'],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:59
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def drop_duplicate_type_translations(apps, schema_editor):
+    # До уникального ограничения могли появиться повторы: остаётся первый перевод каждого языка
+    ProductTypeTranslation = apps.get_model('main', 'ProductTypeTranslation')
+    keep = ProductTypeTranslation.objects.values('product_type', 'language').annotate(first=Min('id'))
+    ProductTypeTranslation.objects.exclude(id__in=[row['first'] for row in keep]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0019_catalog_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_type_translations, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='producttypetranslation',
+            unique_together={('product_type', 'language')},
+        ),
+        migrations.AddIndex(
+            model_name='contactinquiry',
+            index=models.Index(fields=['-created_at'], name='inquiry_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-in_stock', '-created_at'], name='product_ordering_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productcharacteristic',
+            index=models.Index(fields=['product', 'order'], name='characteristic_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productimage',
+            index=models.Index(fields=['product', 'order'], name='product_image_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quote',
+            index=models.Index(fields=['-created_at'], name='quote_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quoteroom',
+            index=models.Index(fields=['quote', 'order'], name='quote_room_order_idx'),
+        ),
+    ]
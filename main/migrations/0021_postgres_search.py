@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+def create_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE TABLE IF NOT EXISTS main_productsearch ('
+        'product_id bigint NOT NULL, language varchar(10) NOT NULL, document tsvector NOT NULL, '
+        'PRIMARY KEY (product_id, language))'
+    )
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS main_productsearch_document_idx ON main_productsearch USING GIN (document)'
+    )
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP TABLE IF EXISTS main_productsearch')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0020_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
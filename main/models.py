@@ -1,27 +1,59 @@
+import uuid
+
 from django.db import models
 
+from .images import media_url, srcset
+from .translations import display_name, pick_translation
+
+IMAGE_STATUSES = [
+    ('ready', 'Готово'),
+    ('pending', 'Загружается'),
+    ('failed', 'Ошибка загрузки'),
+]
+
+
+class MediaBlob(models.Model):
+    """Stored media file, shared by every image with the same content"""
+    digest = models.CharField(max_length=64, unique=True, verbose_name='SHA-256')
+    path = models.CharField(max_length=255, verbose_name='Путь в MEDIA_ROOT')
+    size = models.PositiveBigIntegerField(verbose_name='Размер')
+    ref_count = models.PositiveIntegerField(default=0, verbose_name='Ссылок')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+
+    class Meta:
+        verbose_name = "Файл"
+        verbose_name_plural = "Файлы"
+
+    def __str__(self):
+        return self.path
+
+    @property
+    def url(self):
+        return media_url(self.path)
+
 
 class ProductCategory(models.Model):
     image_url = models.URLField(blank=True, null=True, verbose_name='Изображение')
+    image_blob = models.ForeignKey(MediaBlob, related_name='categories', on_delete=models.PROTECT,
+                                   null=True, blank=True, editable=False)
+    image_status = models.CharField(max_length=10, choices=IMAGE_STATUSES, default='ready',
+                                    verbose_name='Статус изображения')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата изменения')
     
     def __str__(self):
-        tranlatiion = self.get_translation_json('ru')
-        if tranlatiion.get('name'):
-            return tranlatiion.get('name')
-        return ''
+        return display_name(self, '')
     
     class Meta:
         verbose_name = "Категория"
         verbose_name_plural = "Категории"
 
     def get_translation_json(self, lang):
-        translation = self.translations.filter(language=lang).first()
-        if not translation:
-            translation = self.translations.first()
+        translation = pick_translation(self, lang)
         return {
             'id': self.id,
             'name': translation.name if translation else None,
             'description': translation.description if translation else None,
+            'image_srcset': srcset(self.image_url),
         }
 
 
@@ -51,25 +83,21 @@ class ProductCategoryTranslation(models.Model):
 
 class ProductType(models.Model):
     category = models.ForeignKey(ProductCategory, related_name='product_types', on_delete=models.CASCADE, null=True)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата изменения')
 
     def __str__(self):
-        translation = self.translations.first()
-        return translation.name if translation else 'Без названия'
+        return display_name(self, 'Без названия')
     
     def get_name(self, lang='ru'):
-        translation = self.translations.filter(language=lang).first()
-        if translation:
-            return translation.name
-        return self.translations.first().name if self.translations.exists() else 'Без названия'
+        translation = pick_translation(self, lang)
+        return translation.name if translation else 'Без названия'
     
     class Meta:
         verbose_name = "Модель вид"
         verbose_name_plural = "Модель виды"
 
     def get_translation_json(self, lang):
-        translation = self.translations.filter(language=lang).first()
-        if not translation:
-            translation = self.translations.first()
+        translation = pick_translation(self, lang)
         return {
             'id': self.id,
             'name': translation.name if translation else None,
@@ -87,6 +115,9 @@ class ProductTypeTranslation(models.Model):
     language = models.CharField(max_length=10, choices=LANGUAGES, default='ru')
     name = models.CharField(max_length=100, verbose_name='Название', default='Без названия')
 
+    class Meta:
+        unique_together = ('product_type', 'language')
+
     def __str__(self):
         return self.name
 
@@ -100,22 +131,25 @@ class Product(models.Model):
     image_url = models.URLField(verbose_name='Основное изображение')
     tags = models.CharField(max_length=200, blank=True, verbose_name='Теги (через запятую)',)
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата изменения')
 
     class Meta:
         verbose_name = "Модель"
         verbose_name_plural = "Модели"
         ordering = ['-in_stock', '-created_at']
+        indexes = [
+            # Порядок Meta.ordering: первая страница списка без сортировки всей таблицы
+            models.Index(fields=['-in_stock', '-created_at'], name='product_ordering_idx'),
+        ]
 
     def __str__(self):
-        translation = self.translations.first()
-        return translation.name if translation else 'Без названия'
+        return display_name(self, 'Без названия')
 
     def get_translation_json(self, lang):
-        translation = self.translations.filter(language=lang).first()
-        if not translation:
-            translation = self.translations.first()
+        translation = pick_translation(self, lang)
 
-        images = self.images.all()
+        # Изображения, которые ещё загружаются, пока без URL
+        images = [image for image in self.images.all() if image.image_url]
         type_name = None
         if hasattr(self, 'product_type') and self.product_type:
             type_translation = self.product_type.get_translation_json(lang)
@@ -134,16 +168,15 @@ class Product(models.Model):
             'price_per_sqm': float(self.price_per_sqm.normalize()),
             'in_stock': self.in_stock,
             'image_url': images[0].image_url if images else None,
-            'additional_images': [img.image_url for img in images[1:]] if images.count() > 1 else [],
+            'image_srcset': srcset(images[0].image_url) if images else None,
+            'additional_images': [img.image_url for img in images[1:]],
             'tags': self.tags,
             'characteristics': [char.get_translation_json(lang) for char in self.characteristics.all()]
         }
 
     def get_name(self, lang='ru'):
-        translation = self.translations.filter(language=lang).first()
-        if translation:
-            return translation.name
-        return self.translations.first().name if self.translations.exists() else 'Без названия'
+        translation = pick_translation(self, lang)
+        return translation.name if translation else 'Без названия'
 
 
 class ProductTranslation(models.Model):
@@ -176,14 +209,15 @@ class ProductCharacteristic(models.Model):
         verbose_name = "Характеристика модели"
         verbose_name_plural = "Характеристики моделей"
         ordering = ['order']
+        indexes = [
+            models.Index(fields=['product', 'order'], name='characteristic_order_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.product} - {self.translations.first().name if self.translations.exists() else 'Характеристика'}"
+        return f"{self.product} - {display_name(self, 'Характеристика')}"
 
     def get_translation_json(self, lang='ru'):
-        translation = self.translations.filter(language=lang).first()
-        if not translation:
-            translation = self.translations.first()
+        translation = pick_translation(self, lang)
         return {
             "id": self.id,
             "name": translation.name if translation else None,
@@ -214,7 +248,11 @@ class ProductCharacteristicTranslation(models.Model):
 
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, related_name='images', on_delete=models.CASCADE)
-    image_url = models.URLField(verbose_name='URL изображения')
+    image_url = models.URLField(blank=True, verbose_name='URL изображения')
+    image_blob = models.ForeignKey(MediaBlob, related_name='product_images', on_delete=models.PROTECT,
+                                   null=True, blank=True, editable=False)
+    image_status = models.CharField(max_length=10, choices=IMAGE_STATUSES, default='ready',
+                                    verbose_name='Статус изображения')
 
     alt_text = models.CharField(max_length=200, blank=True, verbose_name='Альтернативный текст')
     order = models.PositiveIntegerField(default=0, verbose_name='Порядок отображения')
@@ -223,11 +261,98 @@ class ProductImage(models.Model):
         verbose_name = "Изображение продукта"
         verbose_name_plural = "Изображения продуктов"
         ordering = ['order']
+        indexes = [
+            models.Index(fields=['product', 'order'], name='product_image_order_idx'),
+        ]
     
     def __str__(self):
         return f"{self.product} - Image {self.order}"
 
 
+class ProductProjection(models.Model):
+    """Precomputed Product.get_translation_json for every language"""
+    product = models.ForeignKey(Product, related_name='projections', on_delete=models.CASCADE)
+    language = models.CharField(max_length=10, choices=ProductTranslation.LANGUAGES)
+
+    # Денормализованные поля для фильтрации и сортировки без JOIN
+    category = models.ForeignKey(ProductCategory, related_name='+', on_delete=models.CASCADE, null=True)
+    product_type = models.ForeignKey(ProductType, related_name='+', on_delete=models.CASCADE, null=True)
+    price_per_sqm = models.DecimalField(max_digits=10, decimal_places=2)
+    in_stock = models.BooleanField(default=True)
+    created_at = models.DateTimeField()
+    # Время пересборки: меняется при любом изменении продукта, его типа или категории
+    updated_at = models.DateTimeField(auto_now=True)
+
+    data = models.JSONField()
+
+    class Meta:
+        verbose_name = "Проекция продукта"
+        verbose_name_plural = "Проекции продуктов"
+        ordering = ['-in_stock', '-created_at', 'product_id']
+        unique_together = ('product', 'language')
+        indexes = [
+            models.Index(fields=['language', 'category'], name='projection_lang_category_idx'),
+            # Keyset-пагинация разделов категории и общего списка
+            models.Index(fields=['language', 'product_type', '-in_stock', '-created_at', 'product'],
+                         name='projection_type_keyset_idx'),
+            models.Index(fields=['language', '-in_stock', '-created_at', 'product'], name='projection_keyset_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} ({self.language})"
+
+    @property
+    def card(self):
+        """data for product_card.html; version keys the card's fragment cache"""
+        return {**self.data, 'version': self.updated_at.timestamp()}
+
+
+class Quote(models.Model):
+    """Saved multi-room estimate, shared by its id"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    language = models.CharField(max_length=10, choices=ProductTranslation.LANGUAGES, default='ru', verbose_name='Язык')
+    total_area = models.DecimalField(max_digits=14, decimal_places=4, verbose_name='Общая площадь, м²')
+    total_cost = models.DecimalField(max_digits=20, decimal_places=2, verbose_name='Итого')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+
+    class Meta:
+        verbose_name = "Смета"
+        verbose_name_plural = "Сметы"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='quote_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.id} - {self.total_cost}"
+
+
+class QuoteRoom(models.Model):
+    """Room of a quote; the product name and price are copied so the estimate does not change later"""
+    quote = models.ForeignKey(Quote, related_name='rooms', on_delete=models.CASCADE)
+    order = models.PositiveIntegerField(default=0, verbose_name='Порядок')
+    name = models.CharField(max_length=100, blank=True, verbose_name='Помещение')
+    product = models.ForeignKey(Product, related_name='+', on_delete=models.SET_NULL, null=True, blank=True,
+                                verbose_name='Продукт')
+    product_name = models.CharField(max_length=500, blank=True, verbose_name='Название продукта')
+    width = models.DecimalField(max_digits=5, decimal_places=2, verbose_name='Ширина, м')
+    length = models.DecimalField(max_digits=5, decimal_places=2, verbose_name='Длина, м')
+    area = models.DecimalField(max_digits=12, decimal_places=4, verbose_name='Площадь, м²')
+    price_per_sqm = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Цена за м²')
+    cost = models.DecimalField(max_digits=20, decimal_places=2, verbose_name='Стоимость')
+
+    class Meta:
+        verbose_name = "Помещение сметы"
+        verbose_name_plural = "Помещения сметы"
+        ordering = ['order']
+        indexes = [
+            models.Index(fields=['quote', 'order'], name='quote_room_order_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name or self.order} - {self.cost}"
+
+
 class ContactInquiry(models.Model):
     name = models.CharField(max_length=100, verbose_name='Имя')
     email = models.EmailField()
@@ -236,6 +361,8 @@ class ContactInquiry(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
     
     checked = models.BooleanField(default=False, verbose_name='Проверено')    
+    quote = models.ForeignKey(Quote, related_name='inquiries', on_delete=models.SET_NULL, null=True, blank=True,
+                              verbose_name='Смета')
     def __str__(self):
         return f"{self.name} - {self.email}"
     
@@ -244,4 +371,43 @@ class ContactInquiry(models.Model):
         verbose_name_plural = "Контактные запросы"
 
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='inquiry_created_idx'),
+        ]
+
+
+class ImageIngestionTask(models.Model):
+    """Queued download of a remote image for a category or a product image"""
+    STATUSES = [
+        ('pending', 'В очереди'),
+        ('processing', 'Обрабатывается'),
+        ('done', 'Готово'),
+        ('failed', 'Ошибка'),
+    ]
+
+    category = models.ForeignKey(ProductCategory, related_name='image_tasks', on_delete=models.CASCADE,
+                                 null=True, blank=True)
+    product_image = models.ForeignKey(ProductImage, related_name='image_tasks', on_delete=models.CASCADE,
+                                      null=True, blank=True)
+    source_url = models.URLField(max_length=1000, verbose_name='Источник')
+    status = models.CharField(max_length=10, choices=STATUSES, default='pending', verbose_name='Статус')
+    attempts = models.PositiveIntegerField(default=0, verbose_name='Попытки')
+    error = models.TextField(blank=True, verbose_name='Ошибка')
+    run_after = models.DateTimeField(auto_now_add=True, verbose_name='Не раньше')
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+
+    class Meta:
+        verbose_name = "Загрузка изображения"
+        verbose_name_plural = "Загрузки изображений"
+        ordering = ['run_after', 'id']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='image_task_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.source_url} ({self.status})"
 
+    @property
+    def target(self):
+        return self.category or self.product_image
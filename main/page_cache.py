@@ -0,0 +1,94 @@
+import hashlib
+import re
+from functools import wraps
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+from .caching import TieredCache
+
+CSRF_PLACEHOLDER = '__csrf_token__'
+CSRF_INPUT_RE = re.compile(r'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+
+
+# Язык и версия каталога входят в ключ TieredCache
+pages = TieredCache('page', settings.CATALOG_PAGE_CACHE_TIMEOUT, local_entries=settings.CATALOG_LOCAL_CACHE_ENTRIES)
+
+
+def page_cache_key(request):
+    return hashlib.md5(request.get_full_path().encode()).hexdigest()
+
+
+def can_use_cache(request):
+    # Страницы с flash-сообщениями персональные, их не кэшируем
+    return request.method in ('GET', 'HEAD') and not len(messages.get_messages(request))
+
+
+class Uncacheable(Exception):
+    """Raised from the page computation to hand back a response that must not be stored"""
+
+    def __init__(self, response):
+        super().__init__()
+        self.response = response
+
+
+def _respond(request, entry):
+    content = entry['content'].replace(CSRF_PLACEHOLDER, get_token(request))
+    return HttpResponse(content, content_type=entry['content_type'])
+
+
+def _is_cacheable(response):
+    return response.status_code == 200 and not response.streaming
+
+
+def _entry(response):
+    if not _is_cacheable(response):
+        raise Uncacheable(response)
+    content = CSRF_INPUT_RE.sub(rf'\g<1>{CSRF_PLACEHOLDER}\g<2>', response.content.decode(response.charset))
+    return {
+        'content': content,
+        'content_type': response['Content-Type'],
+    }
+
+
+def _cached(request, render):
+    """The page from the cache, rendered with render() on a miss.
+
+    Misses go through TieredCache.get_or_set: one process renders a cold
+    page under a lock while the others wait for it, and warm pages are
+    re-rendered shortly before they expire (XFetch).
+    """
+    try:
+        entry = pages.get_or_set(page_cache_key(request), lambda: _entry(render()))
+    except Uncacheable as e:
+        return e.response
+    return _respond(request, entry)
+
+
+def cache_catalog_page(view):
+    """Cache the rendered page per URL, language and catalog version (two-tier, see caching.py).
+
+    CSRF tokens are swapped for a placeholder before storing and filled in
+    per request. Works for both sync and async views; ETags and 304s come
+    from http_cache.conditional_page.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if not await sync_to_async(can_use_cache)(request):
+                return await view(request, *args, **kwargs)
+            # get_or_set синхронный: промах рендерит асинхронное представление через async_to_sync
+            return await sync_to_async(_cached)(request, lambda: async_to_sync(view)(request, *args, **kwargs))
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not can_use_cache(request):
+            return view(request, *args, **kwargs)
+        return _cached(request, lambda: view(request, *args, **kwargs))
+
+    return wrapper
@@ -0,0 +1,77 @@
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+# Порядок каталога: Product.Meta.ordering + id для однозначности
+CATALOG_ORDERING = ('-in_stock', '-created_at', 'product_id')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(str(e))
+
+
+def keyset_page(queryset, cursor=None, page_size=12):
+    """Page of a ProductProjection queryset in catalog order, after cursor.
+
+    Seeks with WHERE on (in_stock, created_at, product_id) instead of OFFSET,
+    so every page costs the same. Returns (rows, next_cursor or None).
+    Rows may be model instances or .values() dicts with those three keys.
+    """
+    queryset = queryset.order_by(*CATALOG_ORDERING)
+    if cursor:
+        # Курсор приходит от клиента: типы проверяются до того, как значения попадут в фильтр
+        try:
+            in_stock, created_at, product_id = decode_cursor(cursor)
+            in_stock = bool(int(in_stock))
+            product_id = int(product_id)
+            created_at = parse_datetime(created_at)
+        except (ValueError, TypeError) as e:
+            raise InvalidCursor(str(e))
+        if created_at is None:
+            raise InvalidCursor('Invalid cursor date')
+        if not 0 <= product_id < 2 ** 63:
+            raise InvalidCursor('Invalid cursor id')
+        queryset = queryset.filter(
+            Q(in_stock__lt=in_stock) |
+            Q(in_stock=in_stock, created_at__lt=created_at) |
+            Q(in_stock=in_stock, created_at=created_at, product_id__gt=product_id)
+        )
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        last = rows[page_size - 1]
+        if not isinstance(last, dict):
+            last = {field: getattr(last, field) for field in ('in_stock', 'created_at', 'product_id')}
+        next_cursor = encode_cursor([int(last['in_stock']), last['created_at'].isoformat(), last['product_id']])
+    return rows[:page_size], next_cursor
+
+
+def ranked_page(product_ids, cursor=None, page_size=12):
+    """Page of a relevance-ranked id list, continuing after the (position, id) in cursor"""
+    start = 0
+    if cursor:
+        try:
+            position, product_id = decode_cursor(cursor)
+            position = int(position)
+        except (ValueError, TypeError) as e:
+            raise InvalidCursor(str(e))
+        # Если выдача изменилась, продолжаем от того же товара, а не от позиции
+        start = product_ids.index(product_id) + 1 if product_id in product_ids else position + 1
+    page = product_ids[start:start + page_size]
+    next_cursor = None
+    if start + page_size < len(product_ids):
+        next_cursor = encode_cursor([start + page_size - 1, page[-1]])
+    return page, next_cursor
@@ -0,0 +1,263 @@
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .blobs import refresh_ref_counts
+from .caching import bump_catalog_version
+from .images import derivatives
+from .ingestion import enqueue_image
+from .models import (Product, ProductCharacteristic, ProductCharacteristicTranslation, ProductImage,
+                     ProductTranslation, ProductType)
+from .projection import deferred_rebuilds, rebuild_products
+
+SECTIONS = ('translations', 'characteristics', 'images')
+PRODUCT_FIELDS = ('product_type', 'price_per_sqm', 'in_stock', 'tags')
+
+
+class EditorError(ValueError):
+    pass
+
+
+def clean(model, field, value, label):
+    """value run through the model field's validation (max_length, choices, URL...)"""
+    try:
+        return model._meta.get_field(field).clean(value, None)
+    except ValidationError as e:
+        raise EditorError(f"{label}: {' '.join(e.messages)}")
+
+
+def thumbnail(image_url):
+    # Самая маленькая производная, как в image_preview
+    variants = derivatives(image_url) if image_url else []
+    return variants[0][1] if variants else image_url
+
+
+# --- Чтение разделов ---
+
+def product_data(product):
+    return {
+        'id': product.id,
+        'product_type': product.product_type_id,
+        'price_per_sqm': str(product.price_per_sqm),
+        'in_stock': product.in_stock,
+        'tags': product.tags,
+    }
+
+
+def load_section(product, section):
+    """Rows of one inline section of the product as JSON-ready dicts"""
+    if section == 'translations':
+        return [
+            {'language': t.language, 'name': t.name, 'description': t.description}
+            for t in product.translations.order_by('id')
+        ]
+    if section == 'characteristics':
+        return [
+            {
+                'id': char.id,
+                'order': char.order,
+                'translations': {t.language: {'name': t.name, 'value': t.value} for t in char.translations.all()},
+            }
+            for char in product.characteristics.prefetch_related('translations')
+        ]
+    if section == 'images':
+        return [
+            {'id': image.id, 'url': image.image_url, 'thumbnail': thumbnail(image.image_url),
+             'status': image.image_status, 'alt_text': image.alt_text, 'order': image.order}
+            for image in product.images.all()
+        ]
+    raise EditorError(f'Unknown section: {section}')
+
+
+# --- Сохранение ---
+
+def _changes(changes, section):
+    value = changes.get(section) or {}
+    if not isinstance(value, dict):
+        raise EditorError(f'{section}: expected an object')
+    save, delete = value.get('save') or [], value.get('delete') or []
+    if not isinstance(save, list) or not isinstance(delete, list):
+        raise EditorError(f'{section}: save and delete must be lists')
+    return save, delete
+
+
+def _existing(queryset, ids, label):
+    """{id: row} for ids that must belong to the product"""
+    try:
+        ids = {int(row_id) for row_id in ids}
+    except (TypeError, ValueError):
+        raise EditorError(f'{label}: invalid id')
+    rows = queryset.in_bulk(ids)
+    if len(rows) != len(ids):
+        raise EditorError(f'{label}: unknown id')
+    return rows
+
+
+def _save_product(product, data):
+    """Main product fields present in data; returns their names for update_fields"""
+    if not isinstance(data, dict):
+        raise EditorError('product: expected an object')
+    fields = [field for field in PRODUCT_FIELDS if field in data]
+    if 'product_type' in fields:
+        product_type_id = data['product_type'] or None
+        if product_type_id and not ProductType.objects.filter(id=product_type_id).exists():
+            raise EditorError('Тип: unknown product type')
+        product.product_type_id = product_type_id
+    if 'price_per_sqm' in fields:
+        product.price_per_sqm = clean(Product, 'price_per_sqm', data['price_per_sqm'], 'Цена за м²')
+    if 'in_stock' in fields:
+        product.in_stock = bool(data['in_stock'])
+    if 'tags' in fields:
+        product.tags = clean(Product, 'tags', data['tags'] or '', 'Теги')
+    return fields
+
+
+def _save_translations(product, save, delete):
+    """Product translations keyed by language: save upserts, delete lists languages"""
+    existing = {t.language: t for t in product.translations.all()}
+    to_update, to_create, seen = [], [], set()
+    for row in save:
+        language = clean(ProductTranslation, 'language', row.get('language'), 'Язык')
+        # Перевод на язык у продукта один (unique_together)
+        if language in seen:
+            raise EditorError(f'Язык {language}: duplicate translation')
+        seen.add(language)
+        name = clean(ProductTranslation, 'name', row.get('name'), f'Название ({language})')
+        description = clean(ProductTranslation, 'description', row.get('description') or '', f'Описание ({language})')
+        translation = existing.get(language)
+        if translation is None:
+            to_create.append(ProductTranslation(product=product, language=language, name=name,
+                                                description=description))
+        else:
+            translation.name, translation.description = name, description
+            to_update.append(translation)
+    ProductTranslation.objects.bulk_update(to_update, ['name', 'description'])
+    ProductTranslation.objects.bulk_create(to_create)
+    if delete:
+        product.translations.filter(language__in=delete).delete()
+
+
+def _characteristic_translations(characteristic, translations, label):
+    """(rows to upsert, languages to delete) from {language: {name, value}}; an empty name deletes"""
+    if not isinstance(translations, dict):
+        raise EditorError(f'{label}: translations must be an object')
+    rows, removed = [], []
+    for language, data in translations.items():
+        language = clean(ProductCharacteristicTranslation, 'language', language, f'{label}: язык')
+        if not isinstance(data, dict) or not data.get('name'):
+            removed.append(language)
+            continue
+        rows.append(ProductCharacteristicTranslation(
+            characteristic=characteristic, language=language,
+            name=clean(ProductCharacteristicTranslation, 'name', data['name'], f'{label} ({language})'),
+            value=clean(ProductCharacteristicTranslation, 'value', data.get('value') or '', f'{label} ({language})'),
+        ))
+    return rows, removed
+
+
+def _save_characteristics(product, save, delete):
+    """Characteristics with their translations; rows without id are created"""
+    existing = _existing(product.characteristics.all(), [row['id'] for row in save if row.get('id')],
+                         'Характеристика')
+    changed, created, translations, removed = [], [], [], []
+    for number, row in enumerate(save, 1):
+        characteristic = existing[int(row['id'])] if row.get('id') else ProductCharacteristic(product=product)
+        characteristic.order = clean(ProductCharacteristic, 'order', row.get('order', characteristic.order),
+                                     f'Характеристика {number}: порядок')
+        (changed if characteristic.pk else created).append(characteristic)
+        rows, languages = _characteristic_translations(characteristic, row.get('translations', {}),
+                                                       f'Характеристика {number}')
+        translations += rows
+        removed += [(characteristic, language) for language in languages]
+
+    ProductCharacteristic.objects.bulk_update(changed, ['order'])
+    # После bulk_create у новых характеристик есть id, переводы ссылаются на них
+    ProductCharacteristic.objects.bulk_create(created)
+    current = {
+        (t.characteristic_id, t.language): t
+        for t in ProductCharacteristicTranslation.objects.filter(characteristic__in=changed)
+    }
+    to_update = []
+    for translation in translations:
+        old = current.get((translation.characteristic.pk, translation.language))
+        if old is not None:
+            old.name, old.value = translation.name, translation.value
+            to_update.append(old)
+    ProductCharacteristicTranslation.objects.bulk_update(to_update, ['name', 'value'])
+    ProductCharacteristicTranslation.objects.bulk_create([
+        translation for translation in translations
+        if (translation.characteristic.pk, translation.language) not in current
+    ])
+    stale = [current[key].pk for key in ((c.pk, language) for c, language in removed) if key in current]
+    if stale:
+        ProductCharacteristicTranslation.objects.filter(pk__in=stale).delete()
+    if delete:
+        _existing(product.characteristics.all(), delete, 'Характеристика')
+        product.characteristics.filter(pk__in=delete).delete()
+
+
+def _save_images(product, save, delete):
+    """Alt text and order of images; a new or changed URL is queued like in the admin form"""
+    existing = _existing(product.images.all(), [row['id'] for row in save if row.get('id')], 'Изображение')
+    changed, created, queued, released = [], [], [], set()
+    for number, row in enumerate(save, 1):
+        image = existing[int(row['id'])] if row.get('id') else ProductImage(product=product)
+        label = f'Изображение {number}'
+        image.alt_text = clean(ProductImage, 'alt_text', row.get('alt_text', image.alt_text) or '', label)
+        image.order = clean(ProductImage, 'order', row.get('order', image.order), f'{label}: порядок')
+        url = (row.get('url') or '').strip()
+        if url and url != image.image_url:
+            clean(ProductImage, 'image_url', url, label)
+            # Скачивание идёт в очереди; до этого строка остаётся без изображения
+            if image.image_blob_id:
+                released.add(image.image_blob_id)
+            image.image_url, image.image_blob, image.image_status = '', None, 'pending'
+            queued.append((image, url))
+        elif not image.pk:
+            raise EditorError(f'{label}: URL is required')
+        (changed if image.pk else created).append(image)
+
+    ProductImage.objects.bulk_update(changed, ['alt_text', 'order', 'image_url', 'image_blob', 'image_status'])
+    ProductImage.objects.bulk_create(created)
+    for image, url in queued:
+        enqueue_image(image, url)
+    if delete:
+        removed = _existing(product.images.all(), delete, 'Изображение')
+        released.update(image.image_blob_id for image in removed.values() if image.image_blob_id)
+        product.images.filter(pk__in=delete).delete()
+    if released:
+        transaction.on_commit(lambda: refresh_ref_counts(released))
+
+
+SAVERS = {
+    'translations': _save_translations,
+    'characteristics': _save_characteristics,
+    'images': _save_images,
+}
+
+
+def apply_changes(product, changes):
+    """Save changed sub-objects of a product in one transaction.
+
+    changes: {"product": {field: value}, section: {"save": [rows], "delete": [ids or languages]}}
+    with only the rows that changed. Writes are bulk per section and the
+    projection is rebuilt once at the end instead of per saved row.
+    """
+    if not isinstance(changes, dict):
+        raise EditorError('Expected an object')
+    try:
+        with transaction.atomic(), deferred_rebuilds():
+            fields = _save_product(product, changes['product']) if 'product' in changes else []
+            for section, saver in SAVERS.items():
+                save, delete = _changes(changes, section)
+                if save or delete:
+                    saver(product, save, delete)
+            product.updated_at = timezone.now()
+            product.save(update_fields=[*fields, 'updated_at'])
+            rebuild_products([product.pk])
+            transaction.on_commit(bump_catalog_version)
+    except EditorError:
+        raise
+    except (AttributeError, KeyError, TypeError, ValueError, ArithmeticError) as e:
+        raise EditorError(f'Invalid data: {e!r}')
+    return product
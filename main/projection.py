@@ -0,0 +1,123 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .db_router import primary
+from .models import Product, ProductProjection, ProductTranslation
+from .search import get_backend
+from .translations import prefetch_translations
+
+
+LANGUAGES = [code for code, _ in ProductTranslation.LANGUAGES]
+
+_pending = threading.local()
+
+
+def build_rows(products):
+    """ProductProjection rows (not saved) for every product and language"""
+    rows = []
+    for product in prefetch_translations(products):
+        category_id = product.product_type.category_id if product.product_type else None
+        for language in LANGUAGES:
+            rows.append(ProductProjection(
+                product=product,
+                language=language,
+                category_id=category_id,
+                product_type_id=product.product_type_id,
+                price_per_sqm=product.price_per_sqm,
+                in_stock=product.in_stock,
+                created_at=product.created_at,
+                data=product.get_translation_json(language),
+            ))
+    return rows
+
+
+def rebuild_products(product_ids, using=DEFAULT_DB_ALIAS):
+    """Rebuild projections of the given products; deleted products just lose their rows"""
+    product_ids = set(product_ids)
+    if not product_ids:
+        return
+    projections = ProductProjection.objects.using(using)
+    with transaction.atomic(using=using):
+        projections.filter(product_id__in=product_ids).delete()
+        rows = projections.bulk_create(build_rows(Product.objects.using(using).filter(id__in=product_ids)))
+        get_backend().update(product_ids, rows, using=using)
+
+
+def rebuild_all(batch_size=200):
+    product_ids = list(Product.objects.values_list('id', flat=True))
+    with transaction.atomic():
+        for start in range(0, len(product_ids), batch_size):
+            rebuild_products(product_ids[start:start + batch_size])
+        get_backend().rebuild()
+    return len(product_ids)
+
+
+def backfill_missing(using=DEFAULT_DB_ALIAS):
+    """Build projections for products that have none yet (e.g. right after migrate)"""
+    missing = Product.objects.using(using).filter(projections__isnull=True).values_list('id', flat=True)
+    rebuild_products(list(missing), using=using)
+    get_backend().ensure_built(using=using)
+
+
+@contextmanager
+def deferred_rebuilds():
+    """Ignore catalog signals inside the block; the caller rebuilds what it touched (bulk imports)"""
+    _pending.muted = getattr(_pending, 'muted', 0) + 1
+    try:
+        yield
+    finally:
+        _pending.muted -= 1
+
+
+def rebuilds_deferred():
+    return getattr(_pending, 'muted', 0) > 0
+
+
+def schedule_rebuild(product_ids):
+    """Rebuild after the current transaction commits, once per product.
+
+    Signals fire for every inline of an admin save, so ids are collected and
+    the first on_commit callback rebuilds all of them; the rest are no-ops.
+    """
+    pending = getattr(_pending, 'product_ids', None)
+    if pending is None:
+        pending = _pending.product_ids = set()
+    pending.update(product_ids)
+    transaction.on_commit(_flush)
+
+
+def _flush():
+    product_ids, _pending.product_ids = getattr(_pending, 'product_ids', None), set()
+    if product_ids:
+        rebuild_products(product_ids)
+
+
+def projection_rows(product_ids, language):
+    """{product_id: ProductProjection} for one language, building missing rows on the fly"""
+    product_ids = list(product_ids)
+    rows = {
+        row.product_id: row
+        for row in ProductProjection.objects.filter(product_id__in=product_ids, language=language)
+    }
+    missing = [product_id for product_id in product_ids if product_id not in rows]
+    if not missing:
+        return rows
+    # Строки пишутся в основную базу: и сборка, и повторное чтение идут туда, а не в отстающую реплику
+    with primary():
+        missing = list(Product.objects.filter(id__in=missing).values_list('id', flat=True))
+        if missing:
+            rebuild_products(missing)
+            rows.update(
+                (row.product_id, row)
+                for row in ProductProjection.objects.filter(product_id__in=missing, language=language)
+            )
+    return rows
+
+
+def project_products(product_ids, language):
+    """Product card dicts (ProductProjection.card) in the order of product_ids"""
+    product_ids = list(product_ids)
+    rows = projection_rows(product_ids, language)
+    return [rows[product_id].card for product_id in product_ids if product_id in rows]
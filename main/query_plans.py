@@ -0,0 +1,203 @@
+import json
+import re
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import translation
+
+from .caching import tiers
+from .models import ContactInquiry, Product, ProductCategory, ProductType, Quote
+from .translations import DISPLAY_LANGUAGE
+
+WHERE_RE = re.compile(r'\bWHERE\b', re.IGNORECASE)
+LIMIT_RE = re.compile(r'\bLIMIT\b', re.IGNORECASE)
+PARENS_RE = re.compile(r'\([^()]*\)')
+FTS_FULL_SCAN_RE = re.compile(r'VIRTUAL TABLE INDEX \d+:$')
+WORD_RE = re.compile(r'\w{3,}')
+
+
+def catalog_urls():
+    """Catalog pages and API endpoints with ids taken from the current data"""
+    category = ProductCategory.objects.order_by('id').first()
+    product_type = ProductType.objects.filter(category=category).order_by('id').first() if category else None
+    product = Product.objects.order_by('id').first()
+    quote = Quote.objects.order_by('created_at').first()
+    word = next(iter(WORD_RE.findall(str(product))), 'a') if product else 'a'
+
+    with translation.override(DISPLAY_LANGUAGE):
+        urls = [
+            reverse('home'),
+            reverse('calculator'),
+            f"{reverse('search')}?q={word}",
+            f"{reverse('search_results')}?q={word}",
+            f"{reverse('search_suggest')}?q={word[:2]}",
+            reverse('api_categories'),
+            reverse('api_types'),
+            reverse('api_products'),
+        ]
+        if category:
+            urls += [
+                reverse('category_detail', args=[category.id]),
+                f"{reverse('api_products')}?category={category.id}",
+                f"{reverse('api_types')}?category={category.id}",
+            ]
+        if product_type:
+            urls += [
+                f"{reverse('category_filter', args=[category.id])}?type={product_type.id}",
+                f"{reverse('category_filter', args=[category.id])}?type={product_type.id}&q={word}",
+                f"{reverse('category_products', args=[category.id])}?type={product_type.id}",
+                f"{reverse('api_products')}?type={product_type.id}",
+            ]
+        if product:
+            urls += [reverse('product_detail', args=[product.id]), reverse('api_product', args=[product.id])]
+        if quote:
+            urls.append(reverse('quote_detail', args=[quote.id]))
+    return urls
+
+
+def admin_urls():
+    product = Product.objects.order_by('id').first()
+    category = ProductCategory.objects.order_by('id').first()
+    inquiry = ContactInquiry.objects.order_by('id').first()
+    urls = [
+        reverse('admin:main_product_changelist'),
+        reverse('admin:main_productcategory_changelist'),
+        reverse('admin:main_producttype_changelist'),
+        reverse('admin:main_contactinquiry_changelist'),
+        reverse('admin:main_quote_changelist'),
+    ]
+    if product:
+        urls += [reverse('admin:main_product_change', args=[product.id]),
+                 reverse('admin:main_product_editor_section', args=[product.id, 'characteristics'])]
+    if category:
+        urls.append(reverse('admin:main_productcategory_change', args=[category.id]))
+    if inquiry:
+        urls.append(reverse('admin:main_contactinquiry_change', args=[inquiry.id]))
+    return urls
+
+
+@contextmanager
+def capture_selects():
+    """Collects (alias, sql, params) of every SELECT run inside the block, on any connection (replica too)"""
+    queries = []
+
+    def wrapper(execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith('SELECT'):
+            queries.append((context['connection'].alias, sql, params))
+        return execute(sql, params, many, context)
+
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(wrapper))
+        yield queries
+
+
+def reads_whole_table(sql):
+    """True when the outer query has neither WHERE nor LIMIT: it lists every row on purpose (category lists, counts).
+
+    A first page (ORDER BY ... LIMIT) is not such a query: without an index
+    for its ordering it reads and sorts the whole table.
+    """
+    outer = sql
+    while PARENS_RE.search(outer):
+        outer = PARENS_RE.sub('', outer)
+    return not WHERE_RE.search(outer) and not LIMIT_RE.search(outer)
+
+
+def _sqlite_problems(connection, sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        plan = cursor.fetchall()
+    whole_table = reads_whole_table(sql)
+    scans = []
+    for _, parent, _, detail in plan:
+        if not detail.startswith('SCAN ') or 'CONSTANT ROW' in detail or (whole_table and parent == 0):
+            continue
+        # У FTS5 полный проход — это пустой idxStr; MATCH даёт, например, INDEX 0:M6
+        if 'VIRTUAL TABLE' in detail:
+            if FTS_FULL_SCAN_RE.search(detail):
+                scans.append(detail)
+        elif ' USING ' not in detail:
+            scans.append(detail)
+    sorts = [detail for _, _, _, detail in plan if 'TEMP B-TREE' in detail]
+    return scans, sorts
+
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from _plan_nodes(child)
+
+
+def _postgresql_problems(connection, sql, params):
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        # Без seq scan планировщик берёт индекс везде, где он вообще есть
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    root = plan[0]['Plan']
+    nodes = list(_plan_nodes(root))
+    # Прямой проход по таблице внешнего запроса без WHERE ожидаем, как и в SQLite
+    skip = {id(root), *(id(child) for child in root.get('Plans', []))} if reads_whole_table(sql) else set()
+    scans = [
+        f"Seq Scan on {node['Relation Name']}" for node in nodes
+        if node['Node Type'] == 'Seq Scan' and id(node) not in skip
+    ]
+    sorts = [f"Sort ({', '.join(node.get('Sort Key', []))})" for node in nodes if node['Node Type'] == 'Sort']
+    return scans, sorts
+
+
+def explain(sql, params, using=DEFAULT_DB_ALIAS):
+    """(full scans, sorts without an index) in the plan of one query on the given database"""
+    connection = connections[using]
+    if connection.vendor == 'sqlite':
+        return _sqlite_problems(connection, sql, params)
+    if connection.vendor == 'postgresql':
+        return _postgresql_problems(connection, sql, params)
+    raise NotImplementedError(f'No plan checker for {connection.vendor}')
+
+
+def _fetch(client, url):
+    # Кэш пуст перед каждым запросом: проверяются запросы к базе, а не попадания в кэш
+    for tier in tiers().values():
+        tier.local.clear()
+    with capture_selects() as queries:
+        response = client.get(url, HTTP_ACCEPT_LANGUAGE=DISPLAY_LANGUAGE)
+    return response.status_code, queries
+
+
+def check_urls(urls, admin=False):
+    """{url: (status, [(sql, full scans, sorts)])} for the SELECTs each URL runs.
+
+    Every URL is requested twice and only the second run is checked: the
+    first one builds the per-process indexes (facets, autocomplete, price
+    table), which read whole tables on purpose. A scan of the outer table of
+    a query without WHERE is expected too (see reads_whole_table).
+    """
+    dummy = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+    results = {}
+    with override_settings(CACHES=dummy, ALLOWED_HOSTS=['testserver']):
+        client = Client()
+        if admin:
+            client.force_login(get_user_model().objects.filter(is_superuser=True).order_by('id').first())
+        for url in urls:
+            _fetch(client, url)
+            status, queries = _fetch(client, url)
+            checked = {}
+            for alias, sql, params in queries:
+                if sql not in checked:
+                    checked[sql] = explain(sql, params, using=alias)
+            results[url] = (status, [(sql, scans, sorts) for sql, (scans, sorts) in checked.items()])
+    return results
+
+
+def admin_available():
+    return 'django.contrib.admin' in settings.INSTALLED_APPS and \
+        get_user_model().objects.filter(is_superuser=True).exists()
@@ -0,0 +1,221 @@
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, connections, router
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.utils.module_loading import import_string
+
+from .models import ProductProjection
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def document_fields(data):
+    """Searchable text of one projected product, by field"""
+    return {
+        'name': data.get('name') or '',
+        'type_name': data.get('type_name') or '',
+        'tags': (data.get('tags') or '').replace(',', ' '),
+        'characteristics': ' '.join(
+            f"{char.get('name') or ''} {char.get('value') or ''}" for char in data.get('characteristics', [])
+        ),
+        'description': data.get('description') or '',
+    }
+
+
+class BaseSearchBackend:
+    # Таблица индекса, которую заполняет update (None — индекса нет)
+    table = None
+
+    def update(self, product_ids, rows, using=DEFAULT_DB_ALIAS):
+        """Replace the documents of product_ids with the given ProductProjection rows"""
+        raise NotImplementedError
+
+    def rebuild(self, using=DEFAULT_DB_ALIAS):
+        raise NotImplementedError
+
+    def ensure_built(self, using=DEFAULT_DB_ALIAS):
+        """Build the index if it has never been built"""
+        if self.table is None or self.table not in connections[using].introspection.table_names():
+            return
+        with connections[using].cursor() as cursor:
+            cursor.execute(f'SELECT 1 FROM {self.table} LIMIT 1')
+            if cursor.fetchone() is None:
+                self.rebuild(using)
+
+    def search(self, query, language, limit, category_id=None):
+        """Product ids matching query, most relevant first; limit applies after the category filter"""
+        raise NotImplementedError
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """Portable fallback: substring match over the projection, name matches first"""
+
+    def update(self, product_ids, rows, using=DEFAULT_DB_ALIAS):
+        pass
+
+    def rebuild(self, using=DEFAULT_DB_ALIAS):
+        pass
+
+    def search(self, query, language, limit, category_id=None):
+        words = WORD_RE.findall(query)
+        if not words:
+            return []
+        condition = Q()
+        name_match = Q()
+        for word in words:
+            condition &= (
+                Q(data__name__icontains=word) | Q(data__type_name__icontains=word) |
+                Q(data__tags__icontains=word) | Q(data__description__icontains=word) |
+                Q(data__characteristics__icontains=word)
+            )
+            name_match &= Q(data__name__icontains=word)
+        projections = ProductProjection.objects.filter(condition, language=language)
+        if category_id is not None:
+            projections = projections.filter(category_id=category_id)
+        return list(
+            projections
+            .annotate(rank=Case(When(name_match, then=Value(0)), default=Value(1), output_field=IntegerField()))
+            .order_by('rank', '-in_stock', '-created_at', 'product_id')
+            .values_list('product_id', flat=True)[:limit]
+        )
+
+
+class SqliteFTSBackend(BaseSearchBackend):
+    """SQLite FTS5 index, one document per product and language.
+
+    rowid = product_id * ROWID_STRIDE + language index, so all documents of a
+    product are a rowid range and can be replaced without a table scan.
+    """
+    table = 'main_productsearch'
+    columns = ('name', 'type_name', 'tags', 'characteristics', 'description')
+    # bm25: language, затем веса колонок из columns
+    weights = (0, 10.0, 5.0, 4.0, 2.0, 1.0)
+    ROWID_STRIDE = 16
+
+    @property
+    def languages(self):
+        return [code for code, _ in ProductProjection._meta.get_field('language').choices]
+
+    def _rowid(self, row):
+        return row.product_id * self.ROWID_STRIDE + self.languages.index(row.language)
+
+    def update(self, product_ids, rows, using=DEFAULT_DB_ALIAS):
+        with connections[using].cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {self.table} WHERE rowid >= %s AND rowid < %s',
+                [(pk * self.ROWID_STRIDE, (pk + 1) * self.ROWID_STRIDE) for pk in product_ids]
+            )
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, language, {", ".join(self.columns)}) '
+                f'VALUES (%s, %s, {", ".join(["%s"] * len(self.columns))})',
+                [
+                    (self._rowid(row), row.language, *document_fields(row.data).values())
+                    for row in rows
+                ]
+            )
+
+    def rebuild(self, using=DEFAULT_DB_ALIAS):
+        with connections[using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+        rows = ProductProjection.objects.using(using).all()
+        self.update([], rows.iterator(chunk_size=500), using=using)
+
+    def match_expression(self, query):
+        # Каждое слово — префиксный токен, кавычки защищают от синтаксиса FTS5
+        return ' '.join(f'"{word}"*' for word in WORD_RE.findall(query))
+
+    def search(self, query, language, limit, category_id=None):
+        expression = self.match_expression(query)
+        if not expression:
+            return []
+        join, params = '', []
+        if category_id is not None:
+            # Категория фильтруется до LIMIT, через уникальный индекс (product, language) проекции
+            projections = ProductProjection._meta.db_table
+            join = (f' JOIN {projections} ON {projections}.product_id = {self.table}.rowid / {self.ROWID_STRIDE}'
+                    f' AND {projections}.language = {self.table}.language AND {projections}.category_id = %s')
+            params.append(category_id)
+        # Поиск — чтение каталога: идёт туда же, куда роутер отправляет проекции (реплика)
+        with connections[router.db_for_read(ProductProjection)].cursor() as cursor:
+            cursor.execute(
+                f'SELECT {self.table}.rowid FROM {self.table}{join} '
+                f'WHERE {self.table} MATCH %s AND {self.table}.language = %s '
+                f'ORDER BY bm25({self.table}, {", ".join(map(str, self.weights))}) LIMIT %s',
+                params + [expression, language, limit]
+            )
+            return [rowid // self.ROWID_STRIDE for rowid, in cursor.fetchall()]
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """PostgreSQL full-text search: a weighted tsvector per product and language under a GIN index.
+
+    The 'simple' configuration does no stemming, so Russian, English and
+    Kyrgyz text is indexed the same way; words match as prefixes.
+    """
+    table = 'main_productsearch'
+    # Веса ts_rank по колонкам document_fields
+    weights = {'name': 'A', 'type_name': 'B', 'tags': 'B', 'characteristics': 'C', 'description': 'D'}
+
+    def update(self, product_ids, rows, using=DEFAULT_DB_ALIAS):
+        document = ' || '.join(
+            f"setweight(to_tsvector('simple', %s), '{weight}')" for weight in self.weights.values()
+        )
+        with connections[using].cursor() as cursor:
+            if product_ids:
+                cursor.execute(f'DELETE FROM {self.table} WHERE product_id = ANY(%s)', [list(product_ids)])
+            cursor.executemany(
+                f'INSERT INTO {self.table} (product_id, language, document) VALUES (%s, %s, {document})',
+                [
+                    (row.product_id, row.language, *(document_fields(row.data)[field] for field in self.weights))
+                    for row in rows
+                ]
+            )
+
+    def rebuild(self, using=DEFAULT_DB_ALIAS):
+        with connections[using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+        rows = ProductProjection.objects.using(using).all()
+        self.update([], rows.iterator(chunk_size=500), using=using)
+
+    def ts_query(self, query):
+        # Слова — только \w, поэтому в кавычках tsquery они не могут нарушить синтаксис
+        return ' & '.join(f"'{word}':*" for word in WORD_RE.findall(query))
+
+    def search(self, query, language, limit, category_id=None):
+        ts_query = self.ts_query(query)
+        if not ts_query:
+            return []
+        join, params = '', []
+        if category_id is not None:
+            projections = ProductProjection._meta.db_table
+            join = (f' JOIN {projections} ON {projections}.product_id = {self.table}.product_id'
+                    f' AND {projections}.language = {self.table}.language AND {projections}.category_id = %s')
+            params.append(category_id)
+        with connections[router.db_for_read(ProductProjection)].cursor() as cursor:
+            cursor.execute(
+                f"SELECT {self.table}.product_id FROM {self.table}{join}, to_tsquery('simple', %s) query "
+                f'WHERE {self.table}.document @@ query AND {self.table}.language = %s '
+                f'ORDER BY ts_rank({self.table}.document, query) DESC, {self.table}.product_id LIMIT %s',
+                params + [ts_query, language, limit]
+            )
+            return [product_id for product_id, in cursor.fetchall()]
+
+
+DEFAULT_BACKENDS = {
+    'sqlite': 'main.search.SqliteFTSBackend',
+    'postgresql': 'main.search.PostgresSearchBackend',
+}
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    path = settings.CATALOG_SEARCH_BACKEND
+    if not path:
+        path = DEFAULT_BACKENDS.get(connection.vendor, 'main.search.DatabaseSearchBackend')
+    return import_string(path)()
+
+
+def search_products(query, language, category_id=None):
+    return get_backend().search(query, language, settings.CATALOG_SEARCH_LIMIT, category_id)
@@ -0,0 +1,114 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import (Product, ProductImage, ProductTranslation, ProductType, ProductTypeTranslation,
+                     ProductCharacteristic, ProductCharacteristicTranslation, ProductCategory,
+                     ProductCategoryTranslation)
+from .blobs import refresh_ref_counts
+from .caching import bump_catalog_version
+from .projection import rebuilds_deferred, schedule_rebuild
+
+
+def _type_product_ids(product_type_id):
+    return Product.objects.filter(product_type_id=product_type_id).values_list('id', flat=True)
+
+
+def _touch(model, pk):
+    # Изменение вложенных записей меняет и updated_at родителя (валидаторы HTTP-кэша)
+    if pk:
+        model.objects.filter(pk=pk).update(updated_at=timezone.now())
+
+
+def catalog_changed(product_ids=(), touch=()):
+    """Schedule the projection rebuild and the version bump; touch: (model, pk) parents to mark updated.
+
+    Inside deferred_rebuilds() nothing is done per row: the batch sets
+    updated_at and rebuilds the projection itself.
+    """
+    if rebuilds_deferred():
+        return
+    for model, pk in touch:
+        _touch(model, pk)
+    # Версия поднимается после пересборки проекции, иначе страница
+    # может закэшироваться под новой версией со старыми данными
+    schedule_rebuild(product_ids)
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        catalog_changed([instance.pk])
+
+
+@receiver(post_save, sender=ProductTranslation)
+@receiver(post_delete, sender=ProductTranslation)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=ProductCharacteristic)
+@receiver(post_delete, sender=ProductCharacteristic)
+def product_part_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        catalog_changed([instance.product_id], touch=[(Product, instance.product_id)])
+
+
+@receiver(post_save, sender=ProductCharacteristicTranslation)
+@receiver(post_delete, sender=ProductCharacteristicTranslation)
+def characteristic_translation_changed(sender, instance, raw=False, **kwargs):
+    if raw or rebuilds_deferred():
+        return
+    product_id = (
+        ProductCharacteristic.objects.filter(id=instance.characteristic_id)
+        .values_list('product_id', flat=True).first()
+    )
+    catalog_changed([product_id] if product_id else [], touch=[(Product, product_id)])
+
+
+@receiver(post_save, sender=ProductType)
+def product_type_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        catalog_changed(_type_product_ids(instance.pk))
+
+
+@receiver(post_save, sender=ProductTypeTranslation)
+@receiver(post_delete, sender=ProductTypeTranslation)
+def product_type_translation_changed(sender, instance, raw=False, **kwargs):
+    if not raw and instance.product_type_id:
+        catalog_changed(_type_product_ids(instance.product_type_id), touch=[(ProductType, instance.product_type_id)])
+
+
+@receiver(post_delete, sender=ProductType)
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_delete, sender=ProductCategory)
+@receiver(post_save, sender=ProductCategoryTranslation)
+@receiver(post_delete, sender=ProductCategoryTranslation)
+def category_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        touch = []
+        if sender is ProductType:
+            touch = [(ProductCategory, instance.category_id)]
+        elif sender is ProductCategoryTranslation:
+            touch = [(ProductCategory, instance.product_category_id)]
+        catalog_changed(touch=touch)
+
+
+@receiver(post_init, sender=ProductImage)
+@receiver(post_init, sender=ProductCategory)
+def remember_image_blob(sender, instance, **kwargs):
+    instance._loaded_blob_id = instance.image_blob_id
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_delete, sender=ProductCategory)
+def image_blob_changed(sender, instance, raw=False, **kwargs):
+    # Пересчитываем ссылки и на прежний файл, и на новый
+    blob_ids = {instance._loaded_blob_id, instance.image_blob_id} - {None}
+    instance._loaded_blob_id = instance.image_blob_id
+    # Пакеты (импорт, быстрый редактор) пересчитывают ссылки один раз сами
+    if blob_ids and not raw and not rebuilds_deferred():
+        transaction.on_commit(lambda: refresh_ref_counts(blob_ids))
@@ -0,0 +1,146 @@
+import threading
+import time
+
+from django.db import OperationalError, connection, connections, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import translation
+
+from .caching import tiers
+from .models import ContactInquiry, ProductCategory
+from .translations import DISPLAY_LANGUAGE
+
+# Значения SQLite по умолчанию (как при SQLITE_TUNING=0), с ними сравнивает --compare
+SQLITE_DEFAULTS = {
+    'busy_timeout': 5000,
+    'journal_mode': 'DELETE',
+    'synchronous': 'FULL',
+    'mmap_size': 0,
+    'cache_size': -2000,
+}
+
+
+def current_pragmas(using='default'):
+    """{pragma: value} as the connection reports them"""
+    with connections[using].cursor() as cursor:
+        values = {}
+        for name in SQLITE_DEFAULTS:
+            cursor.execute(f'PRAGMA {name}')
+            values[name] = cursor.fetchone()[0]
+    return values
+
+
+def category_urls():
+    with translation.override(DISPLAY_LANGUAGE):
+        return [reverse('category_detail', args=[pk]) for pk in ProductCategory.objects.values_list('pk', flat=True)]
+
+
+class Timings:
+    """Durations of successful operations and the number of failed ones, shared between threads"""
+
+    def __init__(self):
+        self.durations = []
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def add(self, duration=None):
+        with self.lock:
+            if duration is None:
+                self.errors += 1
+            else:
+                self.durations.append(duration)
+
+    def summary(self, elapsed):
+        durations = sorted(self.durations)
+
+        def percentile(fraction):
+            return durations[min(int(len(durations) * fraction), len(durations) - 1)] * 1000 if durations else 0
+
+        return {
+            'count': len(durations),
+            'per_second': len(durations) / elapsed if elapsed else 0,
+            'p50_ms': percentile(0.5),
+            'p95_ms': percentile(0.95),
+            'p99_ms': percentile(0.99),
+            'max_ms': durations[-1] * 1000 if durations else 0,
+            'errors': self.errors,
+        }
+
+
+def _read(urls, offset, deadline, timings):
+    client = Client()
+    try:
+        number = offset
+        while time.monotonic() < deadline:
+            url = urls[number % len(urls)]
+            number += 1
+            started = time.perf_counter()
+            try:
+                response = client.get(url, HTTP_ACCEPT_LANGUAGE=DISPLAY_LANGUAGE)
+            except OperationalError:
+                timings.add()
+                continue
+            timings.add(time.perf_counter() - started if response.status_code == 200 else None)
+    finally:
+        connections.close_all()
+
+
+def _write(deadline, interval, timings, created):
+    try:
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                # Как форма контактов: одна вставка в своей транзакции
+                with transaction.atomic():
+                    inquiry = ContactInquiry.objects.create(
+                        name='benchmark', email='benchmark@example.com', message='sqlite benchmark'
+                    )
+            except OperationalError:
+                timings.add()
+            else:
+                timings.add(time.perf_counter() - started)
+                created.append(inquiry.pk)
+            time.sleep(interval)
+    finally:
+        connections.close_all()
+
+
+def run_benchmark(urls, pragmas, readers=8, writers=2, duration=10.0, write_interval=0.01):
+    """Category pages read by `readers` threads while `writers` threads insert contact inquiries.
+
+    Page caches are turned off so every request reads the database. The
+    inserted inquiries are deleted afterwards. Returns the pragmas in effect
+    and summaries of read and write timings.
+    """
+    if connection.vendor != 'sqlite':
+        raise NotImplementedError(f'The benchmark is for SQLite, not {connection.vendor}')
+    dummy = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+    local_sizes = {tier: tier.local.max_entries for tier in tiers().values()}
+    reads, writes, created = Timings(), Timings(), []
+    with override_settings(CACHES=dummy, ALLOWED_HOSTS=['testserver'], SQLITE_PRAGMAS=pragmas):
+        for tier in local_sizes:
+            tier.local.clear()
+            tier.local.max_entries = 0
+        try:
+            # journal_mode меняется только без других соединений: сначала одно, потом потоки
+            connections.close_all()
+            in_effect = current_pragmas()
+            connections.close_all()
+
+            deadline = time.monotonic() + duration
+            threads = [threading.Thread(target=_read, args=(urls, number, deadline, reads)) for number in range(readers)]
+            threads += [threading.Thread(target=_write, args=(deadline, write_interval, writes, created))
+                        for _ in range(writers)]
+            started = time.monotonic()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.monotonic() - started
+        finally:
+            for tier, size in local_sizes.items():
+                tier.local.max_entries = size
+            ContactInquiry.objects.filter(pk__in=created).delete()
+            connections.close_all()
+    return {'pragmas': in_effect, 'reads': reads.summary(elapsed), 'writes': writes.summary(elapsed)}
@@ -0,0 +1,97 @@
+import io
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+
+from .calculator import QuoteError, to_decimal
+from .catalog_io import CatalogImportError, read_csv
+from .models import (ContactInquiry, Product, ProductCategory, ProductCategoryTranslation, ProductCharacteristic,
+                     ProductCharacteristicTranslation, ProductImage, ProductTranslation, ProductType,
+                     ProductProjection, ProductTypeTranslation, Quote)
+from .pagination import InvalidCursor, encode_cursor, keyset_page
+from .query_plans import admin_urls, catalog_urls, check_urls
+
+
+class QueryPlanTests(TestCase):
+    """EXPLAIN of every query of the catalog and admin pages: no full table scans, indexed catalog sorts"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Проекции и поисковый индекс строятся в on_commit сигналов
+        with cls.captureOnCommitCallbacks(execute=True):
+            for number in range(2):
+                category = ProductCategory.objects.create(image_url='https://example.com/category.jpg')
+                ProductCategoryTranslation.objects.create(product_category=category, language='ru',
+                                                          name=f'Категория {number}', description='Описание')
+                product_type = ProductType.objects.create(category=category)
+                ProductTypeTranslation.objects.create(product_type=product_type, language='ru',
+                                                      name=f'Тип {number}')
+                for index in range(3):
+                    product = Product.objects.create(product_type=product_type, price_per_sqm=Decimal('100.50') + index,
+                                                     image_url='https://example.com/product.jpg', tags='армстронг')
+                    ProductTranslation.objects.create(product=product, language='ru',
+                                                      name=f'Потолок армстронг {number}-{index}')
+                    characteristic = ProductCharacteristic.objects.create(product=product, order=0)
+                    ProductCharacteristicTranslation.objects.create(characteristic=characteristic, language='ru',
+                                                                    name='Толщина', value=f'{index + 10} мм')
+                    ProductImage.objects.create(product=product, image_url='https://example.com/extra.jpg')
+        Quote.objects.create(total_area=Decimal('12'), total_cost=Decimal('1206'))
+        ContactInquiry.objects.create(name='Тест', email='test@example.com')
+        get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def assertNoProblems(self, results, sorts=False):
+        """No failed requests and no full scans; with sorts=True also no sorts without an index"""
+        self.assertEqual({url: status for url, (status, _) in results.items() if status >= 400}, {})
+        problems = {}
+        for url, (_, queries) in results.items():
+            for sql, query_scans, query_sorts in queries:
+                # Ранжирование FTS5 (bm25) всегда сортирует найденные строки
+                found = query_scans + (query_sorts if sorts and 'bm25(' not in sql else [])
+                if found:
+                    problems.setdefault(url, []).append((sql, found))
+        self.assertEqual(problems, {})
+
+    def test_catalog_pages(self):
+        self.assertNoProblems(check_urls(catalog_urls()), sorts=True)
+
+    def test_admin_pages(self):
+        self.assertNoProblems(check_urls(admin_urls(), admin=True))
+
+
+class ToDecimalTests(SimpleTestCase):
+    def test_rounds_to_centimetres(self):
+        self.assertEqual(to_decimal(2.7, 'width'), Decimal('2.70'))
+        self.assertEqual(to_decimal('0.005', 'width'), Decimal('0.01'))
+
+    def test_rejects_out_of_range(self):
+        for value in ('1e30', '1' * 30, '0.004', '999.991', '-1', 'nan', 'abc', None):
+            with self.subTest(value=value), self.assertRaises(QuoteError):
+                to_decimal(value, 'width')
+
+
+class KeysetCursorTests(SimpleTestCase):
+    def test_rejects_malformed_cursors(self):
+        date = '2024-01-01T00:00:00+00:00'
+        cursors = [encode_cursor(values) for values in (
+            [1, date, [1]], [[1], date, 1], [1, 5, 1], [1, 'x', 1], [1, '2024-13-01T00:00:00', 1], [1, date, 10 ** 30], 5,
+        )] + ['not base64!']
+        for cursor in cursors:
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                keyset_page(ProductProjection.objects.none(), cursor)
+
+
+class ApiCursorTests(TestCase):
+    def test_malformed_cursor_is_400(self):
+        cursor = encode_cursor([1, '2024-01-01T00:00:00+00:00', [1]])
+        response = self.client.get('/ru/api/products/', {'cursor': cursor})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json())
+
+
+class ReadCsvTests(SimpleTestCase):
+    def test_malformed_rows_name_the_line(self):
+        for row in ('abc,1,[]', '1,1,{bad', '1,1,{}'):
+            stream = io.StringIO(f'id,price_per_sqm,characteristics\n1,1,[]\n{row}\n')
+            with self.subTest(row=row), self.assertRaisesMessage(CatalogImportError, 'Line 3'):
+                list(read_csv(stream))
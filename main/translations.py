@@ -0,0 +1,73 @@
+from django.db.models import Case, OuterRef, Subquery, When, prefetch_related_objects
+
+# Язык названий в __str__ и в админке
+DISPLAY_LANGUAGE = 'ru'
+
+
+# Какие связи нужны каждой модели каталога, чтобы get_translation_json
+# работал целиком из кэша prefetch_related
+TRANSLATION_LOOKUPS = {
+    'ProductCategory': ('translations',),
+    'ProductType': ('translations',),
+    'Product': (
+        'translations',
+        'images',
+        'product_type__translations',
+        'characteristics__translations',
+    ),
+    'ProductCharacteristic': ('translations',),
+}
+
+
+def is_prefetched(obj, related_name='translations'):
+    return related_name in getattr(obj, '_prefetched_objects_cache', {})
+
+
+def pick_translation(obj, lang):
+    """Translation of obj for lang, falling back to the first one (by id)"""
+    if is_prefetched(obj):
+        translations = obj.translations.all()
+        for translation in translations:
+            if translation.language == lang:
+                return translation
+        return min(translations, key=lambda t: t.pk, default=None)
+
+    translation = obj.translations.filter(language=lang).first()
+    if not translation:
+        translation = obj.translations.first()
+    return translation
+
+
+def translated_name(model, lang=DISPLAY_LANGUAGE, outer='pk'):
+    """Subquery with the name of the model row whose id is in the outer column, picked as pick_translation does.
+
+    Annotate it as display_name: __str__ of catalog models then needs no queries.
+    """
+    relation = model._meta.get_field('translations')
+    translations = relation.related_model.objects.filter(**{relation.field.name: OuterRef(outer)})
+    preferred = Case(When(language=lang, then=0), default=1)
+    return Subquery(translations.order_by(preferred, 'pk').values('name')[:1])
+
+
+def display_name(obj, default, lang=DISPLAY_LANGUAGE):
+    """Annotated display_name (see translated_name), else the name of the picked translation"""
+    if hasattr(obj, 'display_name'):
+        name = obj.display_name
+    else:
+        translation = pick_translation(obj, lang)
+        name = translation.name if translation else None
+    return name or default
+
+
+def prefetch_translations(objects):
+    """Load translations (and related catalog data) for all objects in bulk"""
+    objects = list(objects)
+    if objects:
+        lookups = TRANSLATION_LOOKUPS.get(type(objects[0]).__name__, ('translations',))
+        prefetch_related_objects(objects, *lookups)
+    return objects
+
+
+def resolve_translations(objects, lang):
+    """get_translation_json(lang) for a whole queryset with a fixed number of queries"""
+    return [obj.get_translation_json(lang) for obj in prefetch_translations(objects)]
@@ -1,12 +1,22 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     path('', views.home, name='home'),
     path('category/<int:category_id>/', views.category_detail, name='category_detail'),
+    path('category/<int:category_id>/filter/', views.category_filter, name='category_filter'),
+    path('category/<int:category_id>/products/', views.category_products, name='category_products'),
     path('product/<int:product_id>/', views.product_detail, name='product_detail'),
     path('calculator/', views.calculator, name='calculator'),
     path('contact/', views.contact, name='contact'),
     path('search/', views.search, name='search'),
+    path('search/results/', views.search_results, name='search_results'),
+    path('search/suggest/', views.search_suggest, name='search_suggest'),
     path('ajax/calculate/', views.ajax_calculate_cost, name='ajax_calculate_cost'),
+    path('ajax/quote/', views.ajax_quote, name='ajax_quote'),
+    path('quote/<uuid:quote_id>/', views.quote_detail, name='quote_detail'),
+    path('api/categories/', api.categories, name='api_categories'),
+    path('api/types/', api.product_types, name='api_types'),
+    path('api/products/', api.products, name='api_products'),
+    path('api/products/<int:product_id>/', api.product, name='api_product'),
 ]
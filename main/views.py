@@ -1,84 +1,97 @@
-from django.shortcuts import render, get_object_or_404, redirect
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.shortcuts import render, aget_object_or_404, redirect
 from django.contrib import messages
-from django.http import JsonResponse
-from django.core.paginator import Paginator
-from django.db.models import Q
-from decimal import Decimal
+from django.http import JsonResponse, Http404
+from django.template.loader import render_to_string
+from django.urls import reverse
+import json
+from decimal import Decimal, InvalidOperation
 
 from django.utils import translation
 
-from .models import Product, ContactInquiry, ProductType, ProductCategory
+from .models import ContactInquiry, ProductType, ProductCategory, ProductProjection, Quote
 from .forms import ContactForm, CalculatorForm
+from .autocomplete import suggest
+from .calculator import QuoteError, find_quote, get_price_table, save_quote
+from .db_router import read_replica
+from .facets import get_facet_index
+from .http_cache import catalog_state, categories_state, category_state, conditional_page, product_state
+from .page_cache import cache_catalog_page
+from .pagination import InvalidCursor, keyset_page, ranked_page
+from .projection import project_products, projection_rows
+from .search import search_products
 
+CATALOG_PAGE_SIZE = 12
 
-def home(request):
-    language = translation.get_language()
-    
-    # Получаем все категории с их переводами
-    categories = ProductCategory.objects.prefetch_related('translations').all()
-    
-    # Формируем данные для шаблона
+FILTER_PARAMS = ('q', 'price_min', 'price_max', 'in_stock')
+
+
+async def arender(request, template_name, context):
+    """render() for async views: context processors read the session from the DB"""
+    return await sync_to_async(render)(request, template_name, context)
+
+
+def _categories_data(language):
     categories_data = []
-    for category in categories:
+    for category in ProductCategory.objects.prefetch_related('translations'):
         category_data = category.get_translation_json(language)
         category_data['image_url'] = category.image_url
         categories_data.append(category_data)
+    return categories_data
+
+
+@read_replica
+@conditional_page(categories_state)
+async def home(request):
+    language = translation.get_language()
+    
+    # srcset читает и хэширует файлы изображений (и при промахе создаёт варианты):
+    # это блокирующая работа, она идёт в потоке, а не в цикле событий
+    categories_data = await sync_to_async(_categories_data)(language)
     
-    return render(request, 'main/home.html', {
+    return await arender(request, 'main/home.html', {
         'categories': categories_data
     })
 
 
-def category_detail(request, category_id):
+@read_replica
+@conditional_page(category_state)
+@cache_catalog_page
+async def category_detail(request, category_id):
     language = translation.get_language()
-    category = get_object_or_404(ProductCategory, id=category_id)
-    
-    # Получаем все типы продуктов для этой категории с их продуктами
-    product_types = ProductType.objects.filter(category=category).prefetch_related(
-        'products__translations', 
-        'products__images',
-        'products__characteristics__translations'
-    ).all()
+    category = await aget_object_or_404(ProductCategory.objects.prefetch_related('translations'), id=category_id)
     
-    # Собираем все уникальные характеристики для фильтрации
-    unique_characteristics = {}
-    all_products = []
+    # Получаем все типы продуктов для этой категории
+    product_types = ProductType.objects.filter(category=category).prefetch_related('translations')
+
+    # Значения характеристик и цены категории из индекса фасетов
+    facet_index = await sync_to_async(get_facet_index)(category.id, language)
+    products_url = reverse('category_products', args=[category.id])
     
-    # Формируем данные для шаблона
+    # Формируем данные для шаблона: только первая страница каждого раздела,
+    # остальное догружается при прокрутке
     product_sections = []
-    for product_type in product_types:
-        if product_type.products.exists():  # Показываем только типы с продуктами
-            products_data = []
-            for product in product_type.products.all():
-                product_data = product.get_translation_json(language)
-                products_data.append(product_data)
-                all_products.append(product_data)
-                
-                # Собираем уникальные характеристики
-                for char in product_data.get('characteristics', []):
-                    char_name = char['name']
-                    char_value = char['value']
-                    if char_name not in unique_characteristics:
-                        unique_characteristics[char_name] = set()
-                    unique_characteristics[char_name].add(char_value)
-            
+    async for product_type in product_types:
+        if product_type.id in facet_index.types:  # Показываем только типы с продуктами
+            projections, next_cursor = await sync_to_async(keyset_page)(
+                ProductProjection.objects.filter(category=category, product_type=product_type, language=language),
+                page_size=CATALOG_PAGE_SIZE
+            )
+            section_url = f'{products_url}?type={product_type.id}'
             section_data = {
+                'type_id': product_type.id,
                 'type_name': product_type.get_name(language),
-                'products': products_data
+                'products': [projection.card for projection in projections],
+                'products_url': section_url,
+                'next_url': f'{section_url}&cursor={next_cursor}' if next_cursor else None,
             }
             product_sections.append(section_data)
     
-    # Преобразуем sets в списки для JSON сериализации
-    characteristics_filter = {}
-    for name, values in unique_characteristics.items():
-        characteristics_filter[name] = sorted(list(values))
+    characteristics_filter = facet_index.characteristic_values()
     
     # Получаем минимальную и максимальную цены для слайдера
-    prices = []
-    for product in all_products:
-        price = product.get('price_per_sqm', 0)
-        if price and price > 0:
-            prices.append(float(price))
+    prices = [float(price) for price in facet_index.sorted_prices if price and price > 0]
     
     if prices:
         min_price = min(prices)
@@ -93,68 +106,172 @@ def category_detail(request, category_id):
         min_price = 0
         max_price = 100
 
-    print(f"Prices found: {prices}")
-    print(f"Min price: {min_price}")
-    print(f"Max price: {max_price}")
-    print(f"All products data: {[{'name': p.get('name'), 'price': p.get('price_per_sqm')} for p in all_products]}")
-    print(f"Product sections: {len(product_sections)}")
-    return render(request, 'main/category_detail.html', {
-        'category': category.get_translation_json(language),
+    return await arender(request, 'main/category_detail.html', {
+        'category': await sync_to_async(category.get_translation_json)(language),
         'product_sections': product_sections,
         'unique_characteristics': characteristics_filter,
-        'all_products': all_products,
         'min_price': min_price,
         'max_price': max_price
     })
     
 
-def product_detail(request, product_id):
+def _has_filters(request):
+    return any(request.GET.get(param) for param in FILTER_PARAMS) or any(
+        key.startswith('char.') for key in request.GET
+    )
+
+
+def _price_param(request, name):
+    """Finite Decimal from the query string, None if absent; ValueError for nan, inf and garbage"""
+    value = request.GET.get(name)
+    if not value:
+        return None
+    try:
+        price = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f'Invalid {name}')
+    if not price.is_finite():
+        raise ValueError(f'Invalid {name}')
+    return price
+
+
+def _filter_products(request, category_id, facet_index, language):
+    """Apply the facet filters from the query string; raises ValueError on bad values"""
+    characteristics = {
+        key[len('char.'):]: request.GET.getlist(key) for key in request.GET if key.startswith('char.')
+    }
+    query = request.GET.get('q', '').strip()
+    price_min = _price_param(request, 'price_min')
+    price_max = _price_param(request, 'price_max')
+    return facet_index.filter(
+        characteristics=characteristics,
+        in_stock=request.GET.get('in_stock') in ('1', 'true'),
+        price_min=price_min,
+        price_max=price_max,
+        product_ids=search_products(query, language, category_id) if query else None,
+    )
+
+
+def _products_page(request, products, next_cursor):
+    """JSON page for infinite scroll: rendered cards (or raw data with format=json) and the next URL"""
+    next_url = None
+    if next_cursor:
+        params = request.GET.copy()
+        params['cursor'] = next_cursor
+        next_url = f'{request.path}?{params.urlencode()}'
+
+    data = {'success': True, 'next_url': next_url}
+    if request.GET.get('format') == 'json':
+        data['products'] = products
+    else:
+        data['html'] = render_to_string('main/includes/product_cards.html', {'products': products}, request=request)
+    return JsonResponse(data)
+
+
+@read_replica
+@conditional_page(category_state, public=True)
+def category_filter(request, category_id):
+    """JSON faceted filtering: matching product ids, facet counts and price range"""
+    language = translation.get_language()
+    # Иначе на каждый несуществующий id строился бы и оставался в памяти пустой индекс
+    if not ProductCategory.objects.filter(id=category_id).exists():
+        return JsonResponse({'success': False, 'error': 'Category not found'}, status=404)
+    facet_index = get_facet_index(category_id, language)
+
+    try:
+        matched, summary = _filter_products(request, category_id, facet_index, language)
+        page = max(int(request.GET.get('page', 1)), 1)
+        page_size = min(max(int(request.GET.get('page_size', 24)), 1), 100)
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid filter values'}, status=400)
+
+    return JsonResponse({
+        'success': True,
+        'total': matched.bit_count(),
+        'product_ids': facet_index.product_ids(matched),
+        'page': page,
+        'products': facet_index.page(matched, page, page_size),
+        **summary,
+    })
+
+
+@read_replica
+@conditional_page(category_state, public=True)
+def category_products(request, category_id):
+    """Next page of one category section (keyset cursor), with the same filters as category_filter"""
+    language = translation.get_language()
+    try:
+        projections = ProductProjection.objects.filter(
+            category_id=category_id, product_type_id=int(request.GET['type']), language=language
+        )
+        if _has_filters(request):
+            facet_index = get_facet_index(category_id, language)
+            matched, _ = _filter_products(request, category_id, facet_index, language)
+            projections = projections.filter(product_id__in=facet_index.product_ids(matched))
+        page, next_cursor = keyset_page(projections, request.GET.get('cursor'), CATALOG_PAGE_SIZE)
+    except (KeyError, ValueError):
+        return JsonResponse({'success': False, 'error': 'Invalid request'}, status=400)
+
+    return _products_page(request, [projection.card for projection in page], next_cursor)
+
+
+@read_replica
+@conditional_page(product_state)
+@cache_catalog_page
+async def product_detail(request, product_id):
     language = translation.get_language()
-    product = get_object_or_404(Product, id=product_id)
+    projection = (await sync_to_async(projection_rows)([product_id], language)).get(product_id)
+    if projection is None:
+        raise Http404('Product not found')
+    category = await aget_object_or_404(ProductCategory.objects.prefetch_related('translations'), id=projection.category_id)
 
-    return render(request, 'main/product_detail.html', {
-        'product': product.get_translation_json(language),
-        'category': product.product_type.category.get_translation_json(language)
+    return await arender(request, 'main/product_detail.html', {
+        'product': projection.data,
+        'category': await sync_to_async(category.get_translation_json)(language)
     })
 
 
+@read_replica
+@conditional_page(catalog_state)
 def calculator(request):
     """Cost calculator page"""
     language = translation.get_language()
-
-    print(request.method)
+    table = get_price_table()
     form = CalculatorForm()
     estimated_cost = None
-    
+
     if request.method == 'POST':
         form = CalculatorForm(request.POST)
         if form.is_valid():
-            width = form.cleaned_data['width']
-            length = form.cleaned_data['length']
-            ceiling_type = form.cleaned_data['ceiling_type']
-            
-            # Calculate area and cost
-            area = width * length
-            estimated_cost = area * ceiling_type.price_per_sqm
-            
-            # Return JSON response for AJAX requests
-            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                return JsonResponse({
-                    'success': True,
-                    'area': float(area),
-                    'cost': float(estimated_cost),
-                    'product_name': ceiling_type.get_name(language),
-                    'price_per_sqm': float(ceiling_type.price_per_sqm)
-                })
-    
-    products = Product.objects.all()
+            try:
+                quote = table.quote(form.cleaned_data['ceiling_type'], form.cleaned_data['width'],
+                                    form.cleaned_data['length'], language)
+            except QuoteError as e:
+                form.add_error('ceiling_type', str(e))
+            else:
+                estimated_cost = quote['cost']
+                # Return JSON response for AJAX requests
+                if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                    return JsonResponse(_quote_json(quote))
+
     return render(request, 'main/calculator.html', {
         'form': form,
-        'products': [p.get_translation_json(language) for p in products],
+        'products': table.options(language),
         'estimated_cost': estimated_cost
     })
 
 
+def _quote_json(quote):
+    # Поля в числах, как их ждёт calculator.js
+    return {
+        'success': True,
+        'area': float(quote['area']),
+        'cost': float(quote['cost']),
+        'product_name': quote['product_name'],
+        'price_per_sqm': float(quote['price_per_sqm'])
+    }
+
+
 def contact(request):
     """Contact page with form"""
     language = translation.get_language()
@@ -172,85 +289,114 @@ def contact(request):
             messages.success(request, success_text)
             return redirect('contact')
     else:
-        form = ContactForm()
-    
-    return render(request, 'main/contact.html', {'form': form})
+        form = ContactForm(initial={'quote': request.GET.get('quote')})
+
+    # Смета, приложенная к заявке со страницы калькулятора
+    quote = find_quote(form['quote'].value())
+    return render(request, 'main/contact.html', {'form': form, 'quote': quote})
 
 
-def ajax_calculate_cost(request):
+async def ajax_calculate_cost(request):
     """AJAX endpoint for cost calculation"""
-    print(request, 'ajax_calculate_cost')
-    if request.method == 'POST':
-        try:
-            width = Decimal(request.POST.get('width', '0'))
-            length = Decimal(request.POST.get('length', '0'))
-            product_id = request.POST.get('product_id')
-            
-            if width > 0 and length > 0 and product_id:
-                product = get_object_or_404(Product, id=product_id)
-                area = width * length
-                cost = area * product.price_per_sqm
-                
-                return JsonResponse({
-                    'success': True,
-                    'area': float(area),
-                    'cost': float(cost),
-                    'product_name': product.name,
-                    'price_per_sqm': float(product.price_per_sqm)
-                })
-            else:
-                return JsonResponse({
-                    'success': False,
-                    'error': 'Invalid input values'
-                })
-        except Exception as e:
-            return JsonResponse({
-                'success': False,
-                'error': str(e)
-            })
-    
-    return JsonResponse({'success': False, 'error': 'Invalid request method'})
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'})
+    table = await sync_to_async(get_price_table)()
+    try:
+        quote = table.quote(request.POST.get('product_id'), request.POST.get('width'),
+                            request.POST.get('length'), translation.get_language())
+    except QuoteError as e:
+        return JsonResponse({'success': False, 'error': str(e)})
+    return JsonResponse(_quote_json(quote))
+
 
+async def ajax_quote(request):
+    """Batch quote: POST {"rooms": [{"width", "length", "product_id", "name"}], "save": bool}.
 
-def search(request):
-    """Search products by name, characteristics, and description in all languages"""
+    Amounts are decimal strings. With save the quote is stored and the
+    response carries its id and shareable URL.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
+    try:
+        payload = json.loads(request.body)
+        rooms = payload.get('rooms')
+    except (ValueError, AttributeError):
+        return JsonResponse({'success': False, 'error': 'Invalid JSON'}, status=400)
     language = translation.get_language()
-    query = request.GET.get('q', '').strip()
-    
-    products = Product.objects.none()
-    
-    if query:
-        language = translation.get_language()
-        search_query = (
-            Q(translations__language=language, translations__name__icontains=query) |
-            Q(translations__language=language, translations__description__icontains=query) |
-            Q(characteristics__translations__value__icontains=query)
-        )
+    table = await sync_to_async(get_price_table)()
+    try:
+        result = table.quote_rooms(rooms, language)
+    except QuoteError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    response = {'success': True, **result}
+    if payload.get('save'):
+        quote = await sync_to_async(save_quote)(result, language)
+        response.update({
+            'quote_id': quote.id,
+            'url': request.build_absolute_uri(reverse('quote_detail', args=[quote.id])),
+            'contact_url': f"{reverse('contact')}?quote={quote.id}",
+        })
+    # DjangoJSONEncoder отдаёт Decimal строками без потери точности
+    return JsonResponse(response)
 
-        products = (
-            Product.objects.filter(search_query)
-            .prefetch_related("images", "translations", "characteristics__translations")
-            .distinct()
-            .order_by("id")  # или created_at, т.к. name нет
-        )
+
+async def quote_detail(request, quote_id):
+    """Saved quote, shareable by link"""
+    quote = await aget_object_or_404(Quote, id=quote_id)
+    rooms = [room async for room in quote.rooms.all()]
+    return await arender(request, 'main/quote.html', {'quote': quote, 'rooms': rooms})
+
+
+@read_replica
+@conditional_page(catalog_state)
+async def search(request):
+    """Search products by name, type, tags, characteristics and description"""
+    language = translation.get_language()
+    query = request.GET.get('q', '').strip()
     
-    # Pagination
-    paginator = Paginator(products, 12)  # Show 12 products per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Индекс возвращает id продуктов, отсортированные по релевантности
+    product_ids = await sync_to_async(search_products)(query, language) if query else []
+    page_ids, next_cursor = ranked_page(product_ids, page_size=CATALOG_PAGE_SIZE)
     
-    # Convert products to translation JSON
-    products_data = []
-    for product in page_obj:
-        products_data.append(product.get_translation_json(language))
+    next_url = None
+    if next_cursor:
+        params = request.GET.copy()
+        params['cursor'] = next_cursor
+        next_url = f"{reverse('search_results')}?{params.urlencode()}"
     
     context = {
         'query': query,
-        'products': products_data,
-        'qnt': products.count(),
-        'page_obj': page_obj,
-        'is_paginated': page_obj.has_other_pages(),
+        'products': await sync_to_async(project_products)(page_ids, language),
+        'qnt': len(product_ids),
+        # Поиск отдаёт не больше CATALOG_SEARCH_LIMIT id: на пределе настоящих совпадений может быть больше
+        'qnt_capped': len(product_ids) >= settings.CATALOG_SEARCH_LIMIT,
+        'next_url': next_url,
     }
     
-    return render(request, 'main/search_results.html', context)
+    return await arender(request, 'main/search_results.html', context)
+
 
+@read_replica
+@conditional_page(catalog_state, public=True)
+def search_results(request):
+    """Next page of search results for infinite scroll"""
+    language = translation.get_language()
+    query = request.GET.get('q', '').strip()
+    product_ids = search_products(query, language) if query else []
+    try:
+        page_ids, next_cursor = ranked_page(product_ids, request.GET.get('cursor'), CATALOG_PAGE_SIZE)
+    except InvalidCursor:
+        return JsonResponse({'success': False, 'error': 'Invalid cursor'}, status=400)
+
+    return _products_page(request, project_products(page_ids, language), next_cursor)
+
+
+@read_replica
+@conditional_page(catalog_state, public=True)
+def search_suggest(request):
+    """JSON prefix and typo-tolerant suggestions for the search box"""
+    query = request.GET.get('q', '').strip()
+    return JsonResponse({
+        'query': query,
+        'suggestions': suggest(query, translation.get_language()) if query else [],
+    })
@@ -85,13 +85,12 @@ document.addEventListener('DOMContentLoaded', function() {
         const selectedOption = ceilingTypeSelect.selectedOptions[0];
 
         if (width > 0 && length > 0 && selectedOption) {
-            const optionText = selectedOption.textContent;
-            const priceMatch = optionText.match(/\$(\d+\.?\d*)/);
-            if (priceMatch) {
-                const pricePerSqm = parseFloat(priceMatch[1]);
+            // Цена за м² приходит в data-price; итог на сервере округляется так же
+            const pricePerSqm = parseFloat(selectedOption.dataset.price);
+            if (!isNaN(pricePerSqm)) {
                 const area = width * length;
-                const totalCost = area * pricePerSqm;
-                updateResults(area, pricePerSqm, totalCost, selectedOption.textContent.split(' - ')[0]);
+                const totalCost = Math.round(area * pricePerSqm * 100) / 100;
+                updateResults(area, pricePerSqm, totalCost, selectedOption.textContent.trim());
             }
         }
     }
@@ -100,6 +99,118 @@ document.addEventListener('DOMContentLoaded', function() {
     lengthInput.addEventListener('input', debounce(calculateLiveCost, 300));
     ceilingTypeSelect.addEventListener('change', calculateLiveCost);
 
+    // Смета из нескольких помещений
+    const quoteBuilder = document.getElementById('quoteBuilder');
+    const roomsTable = document.getElementById('roomsTable');
+    const saveQuoteBtn = document.getElementById('saveQuoteBtn');
+    const rooms = [];
+
+    function renderRooms() {
+        const tbody = roomsTable.querySelector('tbody');
+        tbody.innerHTML = '';
+        let totalArea = 0;
+        let totalCost = 0;
+        rooms.forEach((room, index) => {
+            const row = tbody.insertRow();
+            row.insertCell().textContent = room.name || index + 1;
+            row.insertCell().textContent = room.productName;
+            const areaCell = row.insertCell();
+            areaCell.className = 'text-end text-nowrap';
+            areaCell.textContent = room.area.toFixed(2) + ' m²';
+            const costCell = row.insertCell();
+            costCell.className = 'text-end text-nowrap';
+            costCell.textContent = room.cost.toFixed(2) + ' KGS';
+            const removeBtn = document.createElement('button');
+            removeBtn.type = 'button';
+            removeBtn.className = 'btn btn-sm btn-link text-danger';
+            removeBtn.innerHTML = '<i class="fas fa-times"></i>';
+            removeBtn.addEventListener('click', () => {
+                rooms.splice(index, 1);
+                quoteChanged();
+            });
+            row.insertCell().appendChild(removeBtn);
+            totalArea += room.area;
+            totalCost += room.cost;
+        });
+        document.getElementById('roomsTotalArea').textContent = totalArea.toFixed(2) + ' m²';
+        document.getElementById('roomsTotalCost').textContent = totalCost.toFixed(2) + ' KGS';
+        roomsTable.style.display = rooms.length ? '' : 'none';
+        saveQuoteBtn.disabled = !rooms.length;
+    }
+
+    // После изменения списка сохранённая ссылка уже не соответствует смете
+    function quoteChanged() {
+        document.getElementById('quoteLink').style.display = 'none';
+        renderRooms();
+    }
+
+    if (quoteBuilder) {
+        document.getElementById('addRoomBtn').addEventListener('click', function() {
+            const width = parseFloat(widthInput.value) || 0;
+            const length = parseFloat(lengthInput.value) || 0;
+            const selectedOption = ceilingTypeSelect.selectedOptions[0];
+            if (width <= 0 || length <= 0 || !selectedOption) {
+                alert('Please fill all fields correctly.');
+                return;
+            }
+            const nameInput = document.getElementById('roomName');
+            const area = width * length;
+            rooms.push({
+                name: nameInput.value.trim(),
+                width: widthInput.value,
+                length: lengthInput.value,
+                product_id: selectedOption.value,
+                productName: selectedOption.textContent.trim(),
+                area: area,
+                cost: Math.round(area * parseFloat(selectedOption.dataset.price) * 100) / 100
+            });
+            nameInput.value = '';
+            quoteChanged();
+        });
+
+        // Все помещения считаются и сохраняются на сервере одним запросом
+        saveQuoteBtn.addEventListener('click', function() {
+            saveQuoteBtn.disabled = true;
+            fetch(quoteBuilder.dataset.quoteUrl, {
+                method: 'POST',
+                body: JSON.stringify({
+                    save: true,
+                    rooms: rooms.map(room => ({
+                        name: room.name, width: room.width, length: room.length, product_id: room.product_id
+                    }))
+                }),
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': document.querySelector('[name=csrfmiddlewaretoken]').value
+                }
+            })
+            .then(res => res.json())
+            .then(data => {
+                if (!data.success) {
+                    alert(data.error || 'Calculation failed. Please check inputs.');
+                    return;
+                }
+                data.rooms.forEach((quoted, index) => {
+                    rooms[index].area = parseFloat(quoted.area);
+                    rooms[index].cost = parseFloat(quoted.cost);
+                });
+                renderRooms();
+                const link = document.querySelector('#quoteLink a');
+                link.href = data.url;
+                link.textContent = data.url;
+                document.getElementById('quoteLink').style.display = '';
+                document.getElementById('requestQuoteLink').href = data.contact_url;
+            })
+            .catch(err => {
+                console.error('Error:', err);
+                alert('An error occurred. Please try again.');
+            })
+            .finally(() => {
+                saveQuoteBtn.disabled = !rooms.length;
+            });
+        });
+    }
+
     // Debounce для оптимизации
     function debounce(func, wait) {
         let timeout;
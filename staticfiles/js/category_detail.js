@@ -0,0 +1,308 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const clearFiltersBtn = document.getElementById('clearFilters');
+    const filterCheckboxes = document.querySelectorAll('input[type="checkbox"][data-filter]');
+    
+    // Dual Range Slider functionality
+    const priceSliderMin = document.getElementById('priceSliderMin');
+    const priceSliderMax = document.getElementById('priceSliderMax');
+    const sliderRange = document.getElementById('sliderRange');
+    const currentPriceMin = document.getElementById('currentPriceMin');
+    const currentPriceMax = document.getElementById('currentPriceMax');
+    const resetPriceRange = document.getElementById('resetPriceRange');
+    
+    // Ensure prices are parsed correctly regardless of server locale
+    let minPrice = parseFloat((priceSliderMin?.min || '0').toString().replace(',', '.'));
+    let maxPrice = parseFloat((priceSliderMax?.max || '1000').toString().replace(',', '.'));
+    let currentMin = minPrice;
+    let currentMax = maxPrice;
+    
+    console.log('Price slider initialization:', {
+        minPrice: minPrice,
+        maxPrice: maxPrice,
+        sliderMinValue: priceSliderMin?.min,
+        sliderMaxValue: priceSliderMax?.max
+    });
+    
+    function updateSliderRange() {
+        if (!sliderRange || !priceSliderMin || !priceSliderMax) return;
+        
+        const minVal = parseFloat(priceSliderMin.value);
+        const maxVal = parseFloat(priceSliderMax.value);
+        
+        // Ensure min doesn't exceed max
+        if (minVal >= maxVal) {
+            if (priceSliderMin === document.activeElement) {
+                priceSliderMax.value = minVal;
+                currentMax = minVal;
+            } else {
+                priceSliderMin.value = maxVal;
+                currentMin = maxVal;
+            }
+        } else {
+            currentMin = minVal;
+            currentMax = maxVal;
+        }
+        
+        // Prevent division by zero and ensure valid range
+        const priceRange = maxPrice - minPrice;
+        if (priceRange <= 0) {
+            sliderRange.style.left = '0%';
+            sliderRange.style.width = '100%';
+        } else {
+            // Update visual range with bounds checking
+            const minPercent = Math.max(0, Math.min(100, ((currentMin - minPrice) / priceRange) * 100));
+            const maxPercent = Math.max(0, Math.min(100, ((currentMax - minPrice) / priceRange) * 100));
+            
+            sliderRange.style.left = minPercent + '%';
+            sliderRange.style.width = Math.max(0, maxPercent - minPercent) + '%';
+        }
+        
+        // Update display values
+        if (currentPriceMin) currentPriceMin.textContent = Math.round(currentMin);
+        if (currentPriceMax) currentPriceMax.textContent = Math.round(currentMax);
+        
+        filterProducts();
+    }
+    
+    // Initialize slider
+    if (priceSliderMin && priceSliderMax) {
+        // Don't call filterProducts() on initial load - let products show naturally
+        // updateSliderRange();
+        
+        // Just update the visual slider without filtering
+        const priceRange = maxPrice - minPrice;
+        if (priceRange > 0) {
+            const minPercent = Math.max(0, Math.min(100, ((currentMin - minPrice) / priceRange) * 100));
+            const maxPercent = Math.max(0, Math.min(100, ((currentMax - minPrice) / priceRange) * 100));
+            
+            sliderRange.style.left = minPercent + '%';
+            sliderRange.style.width = Math.max(0, maxPercent - minPercent) + '%';
+        }
+        
+        // Update display values
+        if (currentPriceMin) currentPriceMin.textContent = Math.round(currentMin);
+        if (currentPriceMax) currentPriceMax.textContent = Math.round(currentMax);
+        
+        priceSliderMin.addEventListener('input', updateSliderRange);
+        priceSliderMax.addEventListener('input', updateSliderRange);
+    }
+    
+    // Reset price range
+    if (resetPriceRange) {
+        resetPriceRange.addEventListener('click', function() {
+            if (priceSliderMin) priceSliderMin.value = minPrice;
+            if (priceSliderMax) priceSliderMax.value = maxPrice;
+            currentMin = minPrice;
+            currentMax = maxPrice;
+            updateSliderRange();
+        });
+    }
+    
+    // Search functionality
+    const searchInput = document.getElementById('productSearch');
+    if (searchInput) {
+        searchInput.addEventListener('input', function() {
+            filterProducts();
+        });
+    }
+    
+    // Filter functionality
+    filterCheckboxes.forEach(checkbox => {
+        checkbox.addEventListener('change', function() {
+            if (this.value === 'all') {
+                // Handle "All" checkbox
+                const filterName = this.dataset.filter;
+                const relatedCheckboxes = document.querySelectorAll(`input[data-filter="${filterName}"]`);
+                
+                if (this.checked) {
+                    relatedCheckboxes.forEach(cb => {
+                        if (cb.value !== 'all') cb.checked = false;
+                    });
+                } else {
+                    this.checked = true; // Always keep "All" checked if unchecked
+                }
+            } else {
+                // Handle specific value checkbox
+                const filterName = this.dataset.filter;
+                const allCheckbox = document.querySelector(`input[data-filter="${filterName}"][value="all"]`);
+                
+                if (this.checked) {
+                    allCheckbox.checked = false;
+                } else {
+                    // If no specific values are selected, check "All"
+                    const specificCheckboxes = document.querySelectorAll(`input[data-filter="${filterName}"][value!="all"]`);
+                    const anyChecked = Array.from(specificCheckboxes).some(cb => cb.checked);
+                    if (!anyChecked) {
+                        allCheckbox.checked = true;
+                    }
+                }
+            }
+            filterProducts();
+        });
+    });
+    
+    // Clear filters functionality
+    if (clearFiltersBtn) {
+        clearFiltersBtn.addEventListener('click', function() {
+            const searchInput = document.getElementById('productSearch');
+            if (searchInput) searchInput.value = '';
+            filterCheckboxes.forEach(checkbox => {
+                if (checkbox.value === 'all') {
+                    checkbox.checked = true;
+                } else {
+                    checkbox.checked = false;
+                }
+            });
+            
+            // Reset price sliders
+            if (priceSliderMin) priceSliderMin.value = minPrice;
+            if (priceSliderMax) priceSliderMax.value = maxPrice;
+            currentMin = minPrice;
+            currentMax = maxPrice;
+            updateSliderRange();
+            
+            filterProducts();
+        });
+    }
+    
+    // Initialize collapsible filters
+    document.querySelectorAll('.collapsible-filter').forEach(filter => {
+        filter.addEventListener('click', function() {
+            const chevron = this.querySelector('.filter-chevron');
+            const isExpanded = this.getAttribute('aria-expanded') === 'true';
+            
+            if (isExpanded) {
+                chevron.style.transform = 'rotate(-90deg)';
+            } else {
+                chevron.style.transform = 'rotate(0deg)';
+            }
+        });
+    });
+    
+    // Toggle filters functionality
+    const toggleFiltersBtn = document.getElementById('toggleFilters');
+    const collapsibleFilters = document.querySelectorAll('.collapsible-filters');
+    let filtersVisible = true;
+    
+    if (toggleFiltersBtn) {
+        toggleFiltersBtn.addEventListener('click', function() {
+            filtersVisible = !filtersVisible;
+            
+            collapsibleFilters.forEach(filter => {
+                if (filtersVisible) {
+                    filter.style.display = 'block';
+                } else {
+                    filter.style.display = 'none';
+                }
+            });
+            
+            // Update button icon
+            const icon = this.querySelector('i');
+            if (filtersVisible) {
+                icon.className = 'fas fa-sliders-h';
+                this.title = this.dataset.hideTitle;
+            } else {
+                icon.className = 'fas fa-eye';
+                this.title = this.dataset.showTitle;
+            }
+        });
+    }
+    
+    // Фильтрация на сервере: индекс фасетов возвращает id подходящих товаров
+    const filtersSidebar = document.getElementById('mobileFilters');
+    let filterTimer = null;
+    let filterRequest = 0;
+
+    function filterProducts() {
+        clearTimeout(filterTimer);
+        filterTimer = setTimeout(fetchFilteredProducts, 150);
+    }
+
+    function fetchFilteredProducts() {
+        if (!filtersSidebar) return;
+
+        const params = new URLSearchParams();
+        const searchInput = document.getElementById('productSearch');
+        const searchTerm = searchInput ? searchInput.value.trim() : '';
+        if (searchTerm) params.append('q', searchTerm);
+        if (currentMin > minPrice) params.append('price_min', currentMin);
+        if (currentMax < maxPrice) params.append('price_max', currentMax);
+        for (const [filterName, filterValues] of Object.entries(getActiveFilters())) {
+            filterValues.forEach(value => params.append(`char.${filterName}`, value));
+        }
+        const requestId = ++filterRequest;
+        fetch(`${filtersSidebar.dataset.filterUrl}?${params}&page_size=1`)
+            .then(response => response.json())
+            .then(data => {
+                // Ответ на устаревший запрос не применяем
+                if (requestId !== filterRequest || !data.success) return;
+                applyFilterResult(data, params);
+            })
+            .catch(() => {});
+    }
+
+    function applyFilterResult(data, params) {
+        const productContainers = document.querySelectorAll('[id^="products-container-"]');
+        const noResultsContainers = document.querySelectorAll('[id^="no-results-"]');
+        const tabButtons = document.querySelectorAll('#productTabs button[data-bs-toggle="pill"]');
+        const tabVisibility = new Map();
+
+        productContainers.forEach((container, index) => {
+            const visibleCount = data.sections[container.dataset.typeId] || 0;
+            tabVisibility.set(index, visibleCount);
+
+            noResultsContainers[index].classList.toggle('d-none', visibleCount > 0);
+            if (tabButtons[index]) {
+                tabButtons[index].style.display = visibleCount > 0 ? 'block' : 'none';
+            }
+
+            // Перезагружаем раздел с первой страницы с теми же фильтрами
+            const sentinel = container.parentElement.querySelector('.infinite-sentinel');
+            if (sentinel) {
+                sentinel.dataset.nextUrl = `${sentinel.dataset.baseUrl}&${params}`;
+                if (visibleCount > 0) {
+                    window.loadNextPage(sentinel, true);
+                } else {
+                    container.innerHTML = '';
+                    sentinel.dataset.nextUrl = '';
+                }
+            }
+        });
+
+        // Количество товаров для каждого значения характеристики
+        filterCheckboxes.forEach(checkbox => {
+            if (checkbox.value === 'all') return;
+            const counts = data.facets[checkbox.dataset.filter] || {};
+            const countElement = checkbox.parentElement.querySelector('.facet-count');
+            if (countElement) countElement.textContent = `(${counts[checkbox.value] || 0})`;
+        });
+
+        // If no products are visible in current active tab, switch to first tab with visible products
+        const activeTab = document.querySelector('.tab-pane.active');
+        if (activeTab) {
+            const activeTabIndex = Array.from(document.querySelectorAll('.tab-pane')).indexOf(activeTab);
+            if (tabVisibility.get(activeTabIndex) === 0) {
+                for (let [index, count] of tabVisibility) {
+                    if (count > 0) {
+                        if (tabButtons[index]) tabButtons[index].click();
+                        break;
+                    }
+                }
+            }
+        }
+    }
+    
+    function getActiveFilters() {
+        const filters = {};
+        filterCheckboxes.forEach(checkbox => {
+            if (checkbox.checked && checkbox.value !== 'all') {
+                const filterName = checkbox.dataset.filter;
+                if (!filters[filterName]) {
+                    filters[filterName] = [];
+                }
+                filters[filterName].push(checkbox.value);
+            }
+        });
+        return filters;
+    }
+});
@@ -10,6 +10,8 @@ document.addEventListener('DOMContentLoaded', function() {
     initProductGallery();
     initProductGallery();
     initProductGallery();
+    initSearchSuggest();
+    initInfiniteScroll();
     
     // Navbar scroll effect
     function initNavbar() {
@@ -302,6 +304,81 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
+    // Search suggestions from the server-side autocomplete index
+    function initSearchSuggest() {
+        const input = document.querySelector('.search-input[data-suggest-url]');
+        const datalist = document.getElementById('search-suggestions');
+        if (!input || !datalist) return;
+
+        let timer = null;
+        let lastQuery = '';
+        const suggestions = {};
+
+        input.addEventListener('input', function() {
+            const query = this.value.trim();
+
+            // Выбор подсказки из списка сразу открывает её страницу
+            if (suggestions[this.value]) {
+                window.location.href = suggestions[this.value];
+                return;
+            }
+
+            clearTimeout(timer);
+            if (query.length < 2 || query === lastQuery) return;
+
+            timer = setTimeout(() => {
+                lastQuery = query;
+                fetch(`${input.dataset.suggestUrl}?q=${encodeURIComponent(query)}`)
+                    .then(response => response.json())
+                    .then(data => {
+                        datalist.innerHTML = '';
+                        data.suggestions.forEach(suggestion => {
+                            const option = document.createElement('option');
+                            option.value = suggestion.label;
+                            suggestions[suggestion.label] = suggestion.url;
+                            datalist.appendChild(option);
+                        });
+                    })
+                    .catch(() => {});
+            }, 150);
+        });
+    }
+
+    // Infinite scroll: sentinels load the next page (keyset cursor URL) when they come into view
+    function initInfiniteScroll() {
+        const observer = new IntersectionObserver(entries => {
+            entries.forEach(entry => {
+                if (entry.isIntersecting) loadNextPage(entry.target);
+            });
+        }, { rootMargin: '400px 0px' });
+
+        document.querySelectorAll('.infinite-sentinel').forEach(sentinel => observer.observe(sentinel));
+    }
+
+    // replace=true перезагружает список с первой страницы (например, после смены фильтров)
+    function loadNextPage(sentinel, replace = false) {
+        const url = sentinel.dataset.nextUrl;
+        if (!url || (sentinel.dataset.loading && !replace)) return Promise.resolve();
+
+        const requestId = String(Date.now() + Math.random());
+        sentinel.dataset.loading = requestId;
+        return fetch(url, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+            .then(response => response.json())
+            .then(data => {
+                if (sentinel.dataset.loading !== requestId || !data.success) return;
+                const target = document.querySelector(sentinel.dataset.target);
+                if (replace) target.innerHTML = '';
+                target.insertAdjacentHTML('beforeend', data.html);
+                target.querySelectorAll('.animate-card:not(.visible)').forEach(card => card.classList.add('visible'));
+                sentinel.dataset.nextUrl = data.next_url || '';
+            })
+            .catch(() => {})
+            .finally(() => {
+                if (sentinel.dataset.loading === requestId) delete sentinel.dataset.loading;
+            });
+    }
+    window.loadNextPage = loadNextPage;
+
     // Product filtering function
     function filterProducts() {
         const searchInput = document.getElementById('productSearch');
@@ -428,6 +505,7 @@ function changeMainImage(imageSrc) {
     if (mainImage) {
         mainImage.style.opacity = '0.5';
         setTimeout(() => {
+            mainImage.removeAttribute('srcset');
             mainImage.src = imageSrc;
             mainImage.style.opacity = '1';
         }, 150);
@@ -0,0 +1,58 @@
+function changeMainImage(src) {
+    const mainImage = document.getElementById('mainImage');
+    if (mainImage) {
+        // srcset главного изображения иначе перекроет выбранную миниатюру
+        mainImage.removeAttribute('srcset');
+        mainImage.src = src;
+    }
+    
+    // Update active thumbnail
+    document.querySelectorAll('.thumbnail-item').forEach(item => {
+        item.classList.remove('active');
+    });
+    
+    // Find the clicked thumbnail and make it active
+    document.querySelectorAll('.thumbnail-item').forEach(item => {
+        const dataImage = item.getAttribute('data-image');
+        if (dataImage === src) {
+            item.classList.add('active');
+        }
+    });
+}
+
+// Initialize page functionality
+document.addEventListener('DOMContentLoaded', function() {
+    // Add click handlers to thumbnails
+    document.querySelectorAll('.thumbnail-item').forEach(item => {
+        item.addEventListener('click', function() {
+            const imageSrc = this.getAttribute('data-image');
+            if (imageSrc) {
+                changeMainImage(imageSrc);
+            }
+        });
+    });
+    
+    // Initialize tooltips if Bootstrap is available
+    if (typeof bootstrap !== 'undefined') {
+        var tooltipTriggerList = [].slice.call(document.querySelectorAll('[data-bs-toggle="tooltip"]'));
+        var tooltipList = tooltipTriggerList.map(function (tooltipTriggerEl) {
+            return new bootstrap.Tooltip(tooltipTriggerEl);
+        });
+    }
+    
+    // Add ripple effect to buttons
+    document.querySelectorAll('.btn-modern').forEach(button => {
+        button.addEventListener('click', function(e) {
+            const ripple = this.querySelector('.btn-ripple');
+            if (ripple) {
+                ripple.style.opacity = '1';
+                ripple.style.transform = 'scale(1)';
+                
+                setTimeout(() => {
+                    ripple.style.opacity = '0';
+                    ripple.style.transform = 'scale(0)';
+                }, 600);
+            }
+        });
+    });
+});
@@ -0,0 +1,237 @@
+// product_editor.js — быстрый редактор продукта в админке
+document.addEventListener('DOMContentLoaded', function() {
+    const editor = document.getElementById('productEditor');
+    if (!editor) return;
+
+    const languages = JSON.parse(document.getElementById('editorLanguages').textContent);
+    const statusEl = document.getElementById('editorStatus');
+    const saveBtn = document.getElementById('editorSave');
+    const csrfToken = editor.querySelector('[name=csrfmiddlewaretoken]').value;
+    const productFields = editor.querySelector('[data-section="product"]');
+    let productChanged = false;
+
+    function sectionUrl(section) {
+        return editor.dataset.sectionUrl.replace('SECTION', section);
+    }
+
+    function setStatus(text, isError) {
+        statusEl.textContent = text;
+        statusEl.classList.toggle('error', Boolean(isError));
+    }
+
+    function field(tag, attrs, value) {
+        const el = document.createElement(tag);
+        Object.assign(el, attrs);
+        if (value !== undefined && value !== null) el.value = value;
+        return el;
+    }
+
+    function labelled(text, el) {
+        const label = document.createElement('label');
+        label.append(text + ' ', el);
+        return label;
+    }
+
+    function languageSelect(value) {
+        const select = field('select', { className: 'editor-language' });
+        languages.forEach(function([code, name]) {
+            select.append(new Option(name, code, false, code === value));
+        });
+        return select;
+    }
+
+    // --- Строки разделов ---
+
+    function translationRow(data) {
+        const row = document.createElement('div');
+        row.className = 'editor-row';
+        row.dataset.key = data.language || '';
+        if (data.language) {
+            const language = field('input', { className: 'editor-language', type: 'hidden' }, data.language);
+            row.append(language, document.createTextNode(data.language));
+        } else {
+            row.append(languageSelect('ru'));
+        }
+        row.append(
+            labelled('Название', field('input', { className: 'editor-name', maxLength: 200 }, data.name)),
+            labelled('Описание', field('textarea', { className: 'editor-description' }, data.description)),
+        );
+        return row;
+    }
+
+    function characteristicRow(data) {
+        const row = document.createElement('div');
+        row.className = 'editor-row';
+        row.dataset.key = data.id || '';
+        row.append(labelled('Порядок', field('input', { className: 'editor-order', type: 'number', min: 0 }, data.order || 0)));
+        const translations = data.translations || {};
+        languages.forEach(function([code]) {
+            const translation = translations[code] || {};
+            const group = document.createElement('span');
+            group.dataset.language = code;
+            group.append(
+                labelled(code, field('input', { className: 'editor-name', maxLength: 200, placeholder: 'Название' }, translation.name)),
+                field('input', { className: 'editor-value', maxLength: 200, placeholder: 'Значение' }, translation.value),
+            );
+            row.append(group);
+        });
+        return row;
+    }
+
+    function imageRow(data) {
+        const row = document.createElement('div');
+        row.className = 'editor-row';
+        row.dataset.key = data.id || '';
+        if (data.thumbnail) {
+            row.append(field('img', { className: 'editor-thumb', src: data.thumbnail, loading: 'lazy', alt: data.alt_text || '' }));
+        }
+        row.append(
+            labelled('URL', field('input', { className: 'editor-url', type: 'url' }, data.url)),
+            labelled('Alt', field('input', { className: 'editor-alt', maxLength: 200 }, data.alt_text)),
+            labelled('Порядок', field('input', { className: 'editor-order', type: 'number', min: 0 }, data.order || 0)),
+        );
+        if (data.status && data.status !== 'ready') row.append(document.createTextNode(data.status));
+        return row;
+    }
+
+    const builders = { translations: translationRow, characteristics: characteristicRow, images: imageRow };
+
+    function addRow(section, container, data) {
+        const row = builders[section](data);
+        const remove = field('input', { type: 'checkbox', className: 'editor-delete' });
+        row.append(labelled('Удалить', remove));
+        remove.addEventListener('change', function() {
+            row.classList.toggle('deleted', remove.checked);
+        });
+        row.addEventListener('input', function(e) {
+            if (e.target !== remove) row.classList.add('changed');
+        });
+        container.append(row);
+        return row;
+    }
+
+    // --- Загрузка разделов при открытии ---
+
+    function loadSection(details) {
+        const section = details.dataset.section;
+        const container = details.querySelector('.editor-rows');
+        details.dataset.loaded = 'loading';
+        return fetch(sectionUrl(section), { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+            .then(response => response.json())
+            .then(function(data) {
+                container.replaceChildren();
+                (data.rows || []).forEach(row => addRow(section, container, row));
+                details.dataset.loaded = 'yes';
+            })
+            .catch(function() {
+                details.dataset.loaded = '';
+                setStatus('Не удалось загрузить раздел', true);
+            });
+    }
+
+    editor.querySelectorAll('.editor-section').forEach(function(details) {
+        details.addEventListener('toggle', function() {
+            if (details.open && !details.dataset.loaded) loadSection(details);
+        });
+        details.querySelector('.editor-add').addEventListener('click', function() {
+            if (details.dataset.loaded !== 'yes') return;
+            const row = addRow(details.dataset.section, details.querySelector('.editor-rows'), {});
+            row.classList.add('changed');
+        });
+    });
+
+    productFields.addEventListener('input', function() {
+        productChanged = true;
+    });
+
+    // --- Сбор изменений ---
+
+    function collectRow(section, row) {
+        if (section === 'translations') {
+            return {
+                language: row.querySelector('.editor-language').value,
+                name: row.querySelector('.editor-name').value,
+                description: row.querySelector('.editor-description').value,
+            };
+        }
+        const data = { order: parseInt(row.querySelector('.editor-order').value, 10) || 0 };
+        if (row.dataset.key) data.id = parseInt(row.dataset.key, 10);
+        if (section === 'characteristics') {
+            data.translations = {};
+            row.querySelectorAll('[data-language]').forEach(function(group) {
+                data.translations[group.dataset.language] = {
+                    name: group.querySelector('.editor-name').value,
+                    value: group.querySelector('.editor-value').value,
+                };
+            });
+        } else {
+            data.url = row.querySelector('.editor-url').value;
+            data.alt_text = row.querySelector('.editor-alt').value;
+        }
+        return data;
+    }
+
+    function collectChanges() {
+        const changes = {};
+        if (productChanged) {
+            changes.product = {
+                product_type: productFields.querySelector('[name=product_type]').value || null,
+                price_per_sqm: productFields.querySelector('[name=price_per_sqm]').value,
+                in_stock: productFields.querySelector('[name=in_stock]').checked,
+                tags: productFields.querySelector('[name=tags]').value,
+            };
+        }
+        editor.querySelectorAll('.editor-section').forEach(function(details) {
+            const section = details.dataset.section;
+            const save = [];
+            const remove = [];
+            details.querySelectorAll('.editor-row').forEach(function(row) {
+                if (row.classList.contains('deleted')) {
+                    // Новые строки просто не отправляются
+                    if (row.dataset.key) remove.push(section === 'translations' ? row.dataset.key : parseInt(row.dataset.key, 10));
+                } else if (row.classList.contains('changed')) {
+                    save.push(collectRow(section, row));
+                }
+            });
+            if (save.length || remove.length) changes[section] = { save: save, delete: remove };
+        });
+        return changes;
+    }
+
+    // --- Сохранение одним запросом ---
+
+    saveBtn.addEventListener('click', function() {
+        const changes = collectChanges();
+        if (!Object.keys(changes).length) {
+            setStatus('Нет изменений');
+            return;
+        }
+        saveBtn.disabled = true;
+        setStatus('Сохранение…');
+        fetch(editor.dataset.saveUrl, {
+            method: 'POST',
+            body: JSON.stringify(changes),
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': csrfToken,
+                'X-Requested-With': 'XMLHttpRequest'
+            }
+        })
+            .then(response => response.json())
+            .then(function(data) {
+                if (!data.success) {
+                    setStatus(data.error || 'Ошибка', true);
+                    return;
+                }
+                productChanged = false;
+                setStatus('Сохранено');
+                // Открытые разделы перечитываются: у новых строк появились id
+                editor.querySelectorAll('.editor-section').forEach(function(details) {
+                    details.dataset.loaded = '';
+                    if (details.open) loadSection(details);
+                });
+            })
+            .catch(() => setStatus('Ошибка сети', true))
+            .finally(() => { saveBtn.disabled = false; });
+    });
+});